@@ -0,0 +1,210 @@
+# 文件名: backtest.py
+# 估值规则回测: 用历史估值快照 (data/valuation/snapshots.csv) 逐日套用 watchlist.json 中的规则，
+# 模拟 "进入买入区间建仓、进入卖出区间清仓"，统计交易次数、持有天数与收益
+# 信号、持仓、收益都是 [日期, 规则] 矩阵上的数组运算，没有逐日的 Python 循环
+#   python backtest.py                                  # 全部规则
+#   python backtest.py --code 600519 --start 2018-01-01
+#   python backtest.py --data history.csv --trades      # 使用外部历史数据 (列同快照文件)，并列出每笔交易
+#
+# 约定: 信号按当天快照计算，并以当天快照的价格成交；收益只算价格涨跌，不含分红
+import argparse
+import numpy as np
+import rule_engine
+import watchlist
+import valuation_history
+
+# 建仓 / 清仓对应的状态 (rule_engine.ICONS 下标)；其余状态维持原持仓
+ENTRY_STATUS = (rule_engine.FIRE, rule_engine.OK)
+EXIT_STATUS = (rule_engine.RISK, rule_engine.HIGH)
+
+def ffill(a):
+    """
+    沿第 0 维 (日期) 用最近一个有效值填充 NaN，开头的 NaN 保留
+    """
+    a = np.asarray(a, dtype=np.float64)
+    if len(a) == 0:
+        return a.copy()
+    shape = (-1,) + (1,) * (a.ndim - 1)
+    idx = np.where(np.isnan(a), 0, np.arange(len(a)).reshape(shape))
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return np.take_along_axis(a, idx, axis=0)
+
+def load_panel(codes, path=None, start=None, end=None):
+    """
+    读取快照为 (dates, values): dates 为升序日期字符串，values 为 [日期数, 股票数, 指标数] 矩阵
+    (股票顺序同 codes，列顺序同 rule_engine.METRICS)；停牌等缺失的日子沿用上一次的值
+    同一天同一只股票有多条时以最后一条为准
+    """
+    row = {str(code): i for i, code in enumerate(codes)}
+    day_list, code_rows, vals = [], [], []
+    for date_str, code, v in valuation_history.read_snapshots(path):
+        i = row.get(code)
+        if i is None or (start and date_str < start) or (end and date_str > end):
+            continue
+        day_list.append(date_str)
+        code_rows.append(i)
+        vals.append(v)
+    dates, day_idx = np.unique(np.array(day_list, dtype=str), return_inverse=True)
+    values = np.full((len(dates), len(codes), len(rule_engine.METRICS)), np.nan)
+    if vals:
+        values[day_idx, np.array(code_rows, dtype=np.intp)] = np.array(vals, dtype=np.float64)
+    return dates.tolist(), ffill(values)
+
+def hold_positions(status):
+    """
+    由每日状态得到持仓: 建仓/清仓信号之间维持上一个信号 (信号向后填充)，返回 bool 矩阵
+    """
+    event = np.full(status.shape, -1, dtype=np.int8)
+    event[np.isin(status, ENTRY_STATUS)] = 1
+    event[np.isin(status, EXIT_STATUS)] = 0
+    if len(event) == 0:
+        return event.astype(bool)
+    shape = (-1,) + (1,) * (event.ndim - 1)
+    idx = np.where(event < 0, 0, np.arange(len(event)).reshape(shape))
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return np.take_along_axis(event, idx, axis=0) == 1
+
+class BacktestResult:
+    """
+    回测结果，规则顺序同 ruleset.rules:
+    - status / position: [日期数, 规则数] 的每日状态与持仓
+    - trades: 每笔交易的 rule / entry / exit (日期下标) / days (持有自然日) / ret / open (是否尚未清仓)
+    - 每条规则的统计: n_trades, win_rate, avg_days, total_ret, hold_ret (同期持有不动), exposure, max_drawdown
+    """
+    def __init__(self, ruleset, dates, status, position, prices):
+        self.ruleset = ruleset
+        self.dates = dates
+        self.status = status
+        self.position = position
+        n_days, n_rules = position.shape
+
+        # 交易: 持仓由 0 变 1 为建仓，由 1 变 0 为清仓；两端补 0 使每笔建仓都有对应的清仓
+        padded = np.zeros((n_days + 2, n_rules), dtype=np.int8)
+        padded[1:-1] = position
+        step = np.diff(padded, axis=0)
+        # 转置后按 (规则, 日期) 顺序取出，同一规则的建仓与清仓一一对应
+        rule_in, entry = np.nonzero(step.T == 1)
+        _, exit_ = np.nonzero(step.T == -1)
+        is_open = exit_ >= n_days
+        exit_ = np.minimum(exit_, n_days - 1)
+        day_numbers = np.array(dates, dtype="datetime64[D]").astype(np.int64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            trade_ret = prices[exit_, rule_in] / prices[entry, rule_in] - 1
+        self.trades = {
+            "rule": rule_in,
+            "entry": entry,
+            "exit": exit_,
+            "days": day_numbers[exit_] - day_numbers[entry],
+            "ret": trade_ret,
+            "open": is_open,
+        }
+
+        closed = ~is_open
+        self.n_trades = np.bincount(rule_in, minlength=n_rules)
+        wins = np.bincount(rule_in[closed], weights=trade_ret[closed] > 0, minlength=n_rules)
+        n_closed = np.bincount(rule_in[closed], minlength=n_rules)
+        total_days = np.bincount(rule_in, weights=self.trades["days"], minlength=n_rules)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.win_rate = np.where(n_closed > 0, wins / n_closed, np.nan)
+            self.avg_days = np.where(self.n_trades > 0, total_days / self.n_trades, np.nan)
+
+            # 每日收益: 前一天收盘时持仓才计入当天涨跌；价格缺失的日子记 0
+            daily = np.nan_to_num(prices[1:] / prices[:-1] - 1)
+        strategy = position[:-1] * daily
+        equity = np.cumprod(1 + strategy, axis=0)
+        if len(equity):
+            self.total_ret = equity[-1] - 1
+            self.max_drawdown = (equity / np.maximum.accumulate(equity, axis=0) - 1).min(axis=0)
+        else:
+            self.total_ret = self.max_drawdown = np.zeros(n_rules)
+
+        # 同期持有不动: 第一个有效价格到最后一个有效价格
+        valid = ~np.isnan(prices)
+        n_valid = valid.sum(axis=0)
+        self.hold_ret = np.full(n_rules, np.nan)
+        self.exposure = np.full(n_rules, np.nan)
+        if n_days:
+            cols = np.arange(n_rules)
+            first = np.argmax(valid, axis=0)
+            last = n_days - 1 - np.argmax(valid[::-1], axis=0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.hold_ret = np.where(n_valid > 0, prices[last, cols] / prices[first, cols] - 1, np.nan)
+                self.exposure = np.where(n_valid > 0, position.sum(axis=0) / n_valid, np.nan)
+
+    def rule_trades(self, r):
+        """
+        第 r 条规则的交易 (按时间顺序)，每笔为 dict
+        """
+        sel = np.nonzero(self.trades["rule"] == r)[0]
+        return [{
+            "entry": self.dates[self.trades["entry"][k]],
+            "exit": self.dates[self.trades["exit"][k]],
+            "days": int(self.trades["days"][k]),
+            "ret": float(self.trades["ret"][k]),
+            "open": bool(self.trades["open"][k]),
+        } for k in sel]
+
+def backtest(ruleset, dates, values):
+    """
+    对 [日期数, 股票数, 指标数] 的历史估值一次算出所有规则的每日状态、持仓与收益
+    ruleset 的股票顺序需与 values 的第 1 维一致
+    """
+    _, _, status = ruleset.evaluate(values)
+    position = hold_positions(status)
+    prices = values[:, ruleset.target_idx, rule_engine.METRIC_INDEX["price"]]
+    return BacktestResult(ruleset, dates, status, position, prices)
+
+def run_backtest(index=None, path=None, start=None, end=None, codes=None):
+    """
+    读取快照并回测股票池 (codes 指定时只回测这些股票)
+    """
+    index = index or watchlist.load()
+    targets = index.targets
+    if codes:
+        wanted = {str(c) for c in codes}
+        targets = [t for t in targets if str(t["code"]) in wanted]
+    ruleset = rule_engine.RuleSet(targets) if codes else index.ruleset
+    dates, values = load_panel(ruleset.codes, path, start, end)
+    return backtest(ruleset, dates, values)
+
+def _pct(x):
+    return "-" if x != x else f"{x * 100:+.1f}%"
+
+def report_lines(result, show_trades=False):
+    """
+    每条规则一行: 交易次数 / 胜率 / 平均持有天数 / 策略收益 / 持有不动收益 / 持仓占比 / 最大回撤
+    """
+    if not result.dates:
+        return ["没有可用的历史快照"]
+    ruleset = result.ruleset
+    lines = [f"回测区间 {result.dates[0]} ~ {result.dates[-1]} ({len(result.dates)} 个交易日)"]
+    for r, rule in enumerate(ruleset.rules):
+        target = ruleset.targets[ruleset.target_idx[r]]
+        head = f"{target['name']}({target['code']}) {rule.get('desc', rule['metric'])}"
+        if ruleset.kind[r] in (rule_engine.KIND_SELL_ONLY, rule_engine.KIND_INCOMPLETE):
+            lines.append(f"• {head}: 无买入阈值，不回测")
+            continue
+        win = "-" if result.win_rate[r] != result.win_rate[r] else f"{result.win_rate[r] * 100:.0f}%"
+        days = "-" if result.avg_days[r] != result.avg_days[r] else f"{result.avg_days[r]:.0f}天"
+        lines.append(
+            f"• {head}: {result.n_trades[r]} 笔 | 胜率 {win} | 平均持有 {days} | "
+            f"收益 {_pct(result.total_ret[r])} (持有不动 {_pct(result.hold_ret[r])}) | "
+            f"持仓 {result.exposure[r] * 100:.0f}% | 最大回撤 {_pct(result.max_drawdown[r])}"
+        )
+        if show_trades:
+            for t in result.rule_trades(r):
+                tail = " (持有中)" if t["open"] else ""
+                lines.append(f"    {t['entry']} → {t['exit']} {t['days']}天 {_pct(t['ret'])}{tail}")
+    return lines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="估值规则回测")
+    parser.add_argument("--data", help="历史快照 CSV (默认 data/valuation/snapshots.csv)")
+    parser.add_argument("--start", help="开始日期 YYYY-MM-DD")
+    parser.add_argument("--end", help="结束日期 YYYY-MM-DD")
+    parser.add_argument("--code", action="append", help="只回测指定股票 (可多次指定)")
+    parser.add_argument("--trades", action="store_true", help="列出每笔交易")
+    args = parser.parse_args()
+
+    result = run_backtest(path=args.data, start=args.start, end=args.end, codes=args.code)
+    print("\n".join(report_lines(result, args.trades)))
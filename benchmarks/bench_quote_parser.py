@@ -0,0 +1,84 @@
+# 文件名: benchmarks/bench_quote_parser.py
+# 腾讯行情解析吞吐量 (条/秒): quote_parser.parse_tencent 对比原先的整体解码 + 完整拆分
+#   python benchmarks/bench_quote_parser.py --records 100000
+#   python benchmarks/bench_quote_parser.py --payload 录制的响应.bin
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from quote_parser import QuoteColumns, parse_tencent
+import fixtures
+
+def legacy_parse(raw):
+    """
+    原 get_realtime_data 中的解析方式: 整体 GBK 解码，每条记录完整拆分
+    """
+    def parse_val(val):
+        try:
+            return float(val)
+        except:
+            return 0.0
+
+    data_map = {}
+    text = raw.decode('gbk', errors='ignore')
+    for part in text.split(';'):
+        if not part.strip() or '="' not in part:
+            continue
+        name_part, data_part = part.split('="')
+        fields = data_part.strip('"').split('~')
+        if len(fields) < 30: continue
+        if "hk" in name_part:
+            if len(fields) > 58:
+                values = (fields[3], fields[57], fields[58], fields[47])
+            else:
+                values = (0, 0, 0, 0)
+        elif len(fields) > 64:
+            values = (fields[3], fields[39], fields[46], fields[64])
+        else:
+            values = (0, 0, 0, 0)
+        data_map[fields[2]] = dict(zip(('price', 'pe_ttm', 'pb', 'dv_ratio'), map(parse_val, values)))
+    return data_map
+
+def bench(fn, raw, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(raw)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="腾讯行情解析吞吐量")
+    parser.add_argument("--records", type=int, default=50000, help="合成记录数 (A 股:港股 = 4:1)")
+    parser.add_argument("--payload", help="改用录制的原始响应文件 (GBK 字节)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload, "rb") as f:
+            raw = f.read()
+    else:
+        n_h = args.records // 5
+        raw = fixtures.tencent_payload(args.records - n_h, n_h)
+
+    out = QuoteColumns()
+    n = len(parse_tencent(raw, out))
+    assert out.to_data_map() == legacy_parse(raw), "解析结果与原方式不一致"
+
+    def reuse(raw):
+        out.reset()
+        parse_tencent(raw, out)
+
+    t_new = bench(reuse, raw, args.repeat)
+    t_old = bench(legacy_parse, raw, args.repeat)
+    print(f"记录数: {n}，响应大小: {len(raw) / 1e6:.1f} MB")
+    print(f"parse_tencent : {n / t_new:>12,.0f} 条/秒 ({t_new * 1e3:.1f} ms)")
+    print(f"原解析方式    : {n / t_old:>12,.0f} 条/秒 ({t_old * 1e3:.1f} ms)")
+    print(f"加速比        : {t_old / t_new:.2f}x")
+
+if __name__ == "__main__":
+    main()
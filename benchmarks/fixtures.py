@@ -0,0 +1,155 @@
+# 文件名: benchmarks/fixtures.py
+# 离线行情样本: 按接口真实格式 (GBK 编码、字段位置一致) 生成，
+# 以少量样例记录为模板，按需扩充到任意数量的代码
+import random
+import json
+
+# 腾讯 A 股记录模板 (94 个字段，价格/PE/PB/股息率 位于 3/39/46/64)
+TENCENT_A_TEMPLATE = (
+    "1~贵州茅台~600519~1452.30~1448.00~1449.50~23456~11234~12222~"
+    "1452.20~3~1452.10~5~1452.00~12~1451.90~2~1451.80~1~"
+    "1452.30~4~1452.40~7~1452.50~10~1452.60~3~1452.80~2~~"
+    "20241018150003~4.30~0.30~1459.00~1441.00~1452.30/23456/3402345678~23456~340235~0.19~21.45~~"
+    "1459.00~1441.00~1.24~18243.57~18243.57~7.63~1592.80~1303.20~0.97~-12~1451.02~20.98~22.37~~~"
+    "1.01~340234.5678~0.0000~0~ ~GP-A~-5.40~1.12~3.16~30.11~24.73~1910.00~1244.00~0.68~-1.84~-3.77~"
+    "1256197800~1256197800~-28.04~-4.13~1256197800~-8.96~-2.73~~~~~~~~~~~~~~~"
+).split("~")
+
+# 腾讯港股 (r_hk) 记录模板 (79 个字段，价格/PE/PB/股息率 位于 3/57/58/47)
+TENCENT_H_TEMPLATE = (
+    "100~腾讯控股~00700~415.600~410.000~411.000~18234567.0~0~0~415.600~0~0~0~0~0~0~0~0~0~"
+    "415.600~0~0~0~0~0~0~0~0~0~18234567.0~2024/10/18 16:08:12~5.600~1.37~418.000~409.800~"
+    "415.600~18234567.0~7557001234.560~0~19.42~~0~0~2.00~38321.4567~38321.4567~TENCENT~0.82~"
+    "542.000~260.200~0.21~12.34~0~0~0~0~0~19.42~3.52~0.21~100~-3.28~11.45~GP~28.12~21.33~"
+    "-2.45~5.62~13.05~9222.8~9222.8~0.000~~~~~~~"
+).split("~")
+
+SECTOR_TEMPLATE = "{key},{name},{count},{avg_price},{change},{pct},{volume},{amount},{leader_code},{leader_pct},{leader_price},{leader_change},{leader_name}"
+
+SINA_TYPES = {
+    "us": "gb_x{i}",
+    "hk": "rt_hk{i:05d}",
+    "fx": "fx_s{i:06d}",
+    "future": "hf_F{i}",
+}
+
+def a_code(i):
+    code = f"{600000 + i % 400000:06d}" if i % 2 == 0 else f"{i % 400000:06d}"
+    return code
+
+def tencent_record(api_code, r):
+    """
+    单只股票的腾讯行情记录 (str)，api_code 如 sh600519 / sz000858 / r_hk00700
+    """
+    if api_code.startswith("r_hk"):
+        f = list(TENCENT_H_TEMPLATE)
+        f[2] = api_code[4:]
+        f[3] = f"{r.uniform(0.1, 600):.3f}"
+        f[57] = f"{r.uniform(-20, 80):.2f}"
+        f[58] = f"{r.uniform(0.2, 10):.2f}"
+        f[47] = f"{r.uniform(0, 12):.2f}"
+    else:
+        f = list(TENCENT_A_TEMPLATE)
+        f[2] = api_code[2:]
+        f[3] = f"{r.uniform(2, 2000):.2f}"
+        f[39] = f"{r.uniform(-50, 120):.2f}"
+        f[46] = f"{r.uniform(0.3, 15):.2f}"
+        f[64] = f"{r.uniform(0, 9):.2f}"
+    return f'v_{api_code}="' + "~".join(f) + '";\n'
+
+def tencent_payload(n_a, n_h=0, seed=0):
+    """
+    生成 n_a 条 A 股 + n_h 条港股的腾讯行情响应 (GBK 字节)
+    """
+    r = random.Random(seed)
+    out = []
+    for i in range(n_a):
+        code = a_code(i)
+        prefix = "sh" if code.startswith("6") else "sz"
+        out.append(tencent_record(prefix + code, r))
+    for i in range(n_h):
+        out.append(tencent_record(f"r_hk{i % 100000:05d}", r))
+    return "".join(out).encode("gbk")
+
+def tencent_targets(n_a, n_h=0):
+    """
+    与 tencent_payload 对应的股票池 (watchlist.json 展开后的 targets 格式)
+    """
+    rules = [
+        {"metric": "pe_ttm", "buy": 15, "sell": 30, "reverse": False, "desc": "PE-TTM"},
+        {"metric": "pb", "buy": None, "sell": 5.5, "reverse": False, "desc": "PB(卖出)"},
+        {"metric": "dv_ratio", "buy": 5.0, "sell": None, "reverse": True, "desc": "股息率"},
+    ]
+    targets = [{"code": a_code(i), "name": f"A{i}", "type": "A", "rules": rules} for i in range(n_a)]
+    targets += [{"code": f"{i % 100000:05d}", "name": f"H{i}", "type": "H", "rules": rules} for i in range(n_h)]
+    return targets
+
+def sina_codes(n):
+    """
+    n 个 Sina 代码，循环覆盖 us/hk/fx/future 四类，返回 {名称: {"code", "type"}}
+    """
+    types = list(SINA_TYPES)
+    targets = {}
+    for i in range(n):
+        stype = types[i % len(types)]
+        targets[f"{stype}{i}"] = {"code": SINA_TYPES[stype].format(i=i), "type": stype}
+    return targets
+
+def sina_type(code):
+    """
+    由 Sina 代码前缀推断类型 (gb_ 美股 / rt_hk 港股 / fx_s 外汇 / sh sz A 股 / hf_ 期货)
+    """
+    if code.startswith("gb_"):
+        return "us"
+    if code.startswith("rt_hk"):
+        return "hk"
+    if code.startswith("fx_"):
+        return "fx"
+    if code.startswith(("sh", "sz")):
+        return "a"
+    return "future"
+
+def sina_record(code, stype, r):
+    """
+    单个品种的 hq.sinajs.cn 记录 (str)，字段位置与 quote_parser.SINA_FIELDS 一致
+    """
+    f = [f"{r.uniform(1, 20000):.4f}" for _ in range(30)]
+    if stype == "us":
+        f[0] = "纳斯达克"
+        f[2] = f"{r.uniform(-3, 3):.2f}"
+    elif stype == "hk":
+        f[0] = "HSI"
+        f[1] = "恒生指数"
+        f[8] = f"{r.uniform(-3, 3):.2f}"
+    elif stype == "fx":
+        f[9] = "美元人民币"
+    elif stype == "future":
+        f[13] = "纽约黄金"
+    elif stype == "a":
+        f[0] = "贵州茅台"
+    return f'var hq_str_{code}="' + ",".join(f) + '";\n'
+
+def sina_payload(targets, seed=0):
+    """
+    生成 hq.sinajs.cn 响应 (GBK 字节)
+    """
+    r = random.Random(seed)
+    return "".join(sina_record(config["code"], config["type"], r) for config in targets.values()).encode("gbk")
+
+def sector_payload(n, seed=0):
+    """
+    生成 newSinaHy.php 响应 (GBK 字节): var S_Finance_bankuai_sinaindustry = {...}
+    """
+    r = random.Random(seed)
+    data = {}
+    for i in range(n):
+        key = f"new_hy{i:03d}"
+        data[key] = SECTOR_TEMPLATE.format(
+            key=key, name=f"行业{i}", count=r.randint(5, 90), avg_price=f"{r.uniform(3, 80):.3f}",
+            change=f"{r.uniform(-2, 2):.3f}", pct=f"{r.uniform(-6, 6):.2f}",
+            volume=r.randint(10**7, 10**10), amount=r.randint(10**8, 10**11),
+            leader_code=f"sh{600000 + i:06d}", leader_pct=f"{r.uniform(-10, 10):.2f}",
+            leader_price=f"{r.uniform(3, 80):.2f}", leader_change=f"{r.uniform(-2, 2):.2f}",
+            leader_name=f"龙头{i}",
+        )
+    return ("var S_Finance_bankuai_sinaindustry = " + json.dumps(data, ensure_ascii=False)).encode("gbk")
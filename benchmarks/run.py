@@ -0,0 +1,350 @@
+# 文件名: benchmarks/run.py
+# 离线基准测试: 用合成的接口响应 (格式与线上一致) 分别测量各处理环节，不联网
+#   python benchmarks/run.py                              # 默认规模
+#   python benchmarks/run.py --scale 10 --output new.json # 放大 10 倍并保存结果
+#   python benchmarks/run.py --compare old.json           # 与之前的结果对比，变慢超过阈值时退出码为 1
+import os
+import sys
+import io
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import statistics
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures
+
+# 默认规模 (--scale 按倍数放大)
+SIZES = {
+    "sina_instruments": 1000,   # 早报 Sina 品种数
+    "tencent_a": 4000,          # 午间 A 股数
+    "tencent_h": 1000,          # 午间港股数
+    "sectors": 100,             # 行业板块数
+    "history_days": 60,         # 复盘汇总的交易日数
+    "rotation_days": 2500,      # 板块轮动矩阵的交易日数 (约 10 年)
+    "backtest_days": 2500,      # 回测的交易日数 (约 10 年)
+    "backtest_symbols": 30,     # 回测的股票数
+}
+
+def stage_sina_hq(sizes):
+    """
+    main.get_sina_data: 多源对冲调度 + 行情网关分批 + 单次扫描解析 + 早报文本渲染 (请求由预生成的响应代替，不走缓存)
+    """
+    import main
+    import quote_gateway
+    targets = fixtures.sina_codes(sizes["sina_instruments"])
+    records = quote_gateway.split_records(quote_gateway.SOURCES["sina"]["record"], fixtures.sina_payload(targets))
+    gateway = quote_gateway.get_gateway("sina")
+    gateway.ttl = 0
+    gateway.request = lambda batch: b"".join(records[c] for c in batch if c in records)
+    return len(targets), lambda: main.get_sina_data(targets)
+
+def stage_tencent_quotes(sizes):
+    """
+    noon_valuation.get_realtime_data: 行情网关分批并发 + 记录切分拼接 + 腾讯行情解析 (请求由预生成的响应代替，不走缓存)
+    """
+    import noon_valuation
+    import quote_gateway
+    import watchlist
+    index = watchlist.from_targets(fixtures.tencent_targets(sizes["tencent_a"], sizes["tencent_h"]))
+    payload = fixtures.tencent_payload(sizes["tencent_a"], sizes["tencent_h"])
+    # 按代码切分出每条记录，供各批次拼接
+    records = quote_gateway.split_records(quote_gateway.SOURCES["tencent"]["record"], payload)
+    gateway = quote_gateway.get_gateway("tencent")
+    gateway.ttl = 0
+    gateway.request = lambda batch: b"".join(records[c] for c in batch if c in records)
+    return len(index), lambda: noon_valuation.get_realtime_data(index)
+
+def stage_watchlist_load(sizes, workdir):
+    """
+    watchlist.load: 源文件未变化时从磁盘缓存读取编译好的索引 (进程内缓存清空，模拟新进程)
+    """
+    import watchlist
+    targets = fixtures.tencent_targets(sizes["tencent_a"], sizes["tencent_h"])
+    path = os.path.join(workdir, "watchlist.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"groups": [{"name": "bench", "targets": targets}]}, f, ensure_ascii=False)
+    cache_path = os.path.join(workdir, "watchlist_index.pkl")
+
+    def load():
+        watchlist._LOADED.clear()
+        return watchlist.load(path, cache_path)
+    return len(targets), load
+
+def stage_rule_eval(sizes):
+    """
+    rule_engine: 所有 股票×规则 的分位与状态
+    """
+    import numpy as np
+    import rule_engine
+    targets = fixtures.tencent_targets(sizes["tencent_a"], sizes["tencent_h"])
+    ruleset = rule_engine.compile_rules(targets)
+    values = np.random.default_rng(0).uniform(0, 40, size=(len(targets), len(rule_engine.METRICS)))
+    return len(ruleset), lambda: ruleset.evaluate(values)
+
+def stage_noon_report(sizes, workdir):
+    """
+    noon_valuation.generate_report: 规则计算 + 快照记录与历史分位 + 报告文本渲染 (行情已就绪)
+    """
+    import noon_valuation
+    import watchlist
+    import valuation_history
+    valuation_history.SNAPSHOT_PATH = os.path.join(workdir, "valuation", "snapshots.csv")
+    valuation_history.STATE_PATH = os.path.join(workdir, "valuation", "quantiles.pkl")
+    import tick_recorder
+    tick_recorder.TICK_DIR = os.path.join(workdir, "ticks")
+    from quote_parser import parse_tencent
+    index = watchlist.from_targets(fixtures.tencent_targets(sizes["tencent_a"], sizes["tencent_h"]))
+    values = index.values_from_quotes(parse_tencent(fixtures.tencent_payload(sizes["tencent_a"], sizes["tencent_h"])))
+    noon_valuation.fetch_quotes = lambda index: b""
+    noon_valuation.parse_quotes = lambda index, raw: values
+    return len(index), lambda: noon_valuation.generate_report(index)
+
+def stage_tick_append(sizes, workdir):
+    """
+    tick_recorder.TickRecorder.append: 一轮全股票池行情写入内存映射文件
+    """
+    import numpy as np
+    import tick_recorder
+    n = sizes["tencent_a"] + sizes["tencent_h"]
+    codes = [f"{i:06d}" for i in range(n)]
+    recorder = tick_recorder.TickRecorder(codes, "2024-01-02", os.path.join(workdir, "ticks_bench"))
+    values = np.random.default_rng(0).uniform(0, 40, size=(n, len(tick_recorder.VALUE_FIELDS)))
+    return n, lambda: recorder.append(values)
+
+def stage_sector_json(sizes):
+    """
+    evening_push.parse_sector_payload: GBK 解码 + JSON 解析 + 清洗
+    """
+    import evening_push
+    raw = fixtures.sector_payload(sizes["sectors"])
+    return sizes["sectors"], lambda: evening_push.parse_sector_payload(raw, "2024-01-02")
+
+def stage_history_write(sizes, workdir):
+    """
+    history_store.write_day: 写入 (覆盖) 当日分区
+    """
+    import evening_push
+    import history_store
+    df = evening_push.parse_sector_payload(fixtures.sector_payload(sizes["sectors"]), "2024-01-02")
+    base_dir = os.path.join(workdir, "history_sector")
+    return len(df), lambda: history_store.write_day(df, "2024-01-02", base_dir)
+
+def stage_history_read(sizes, workdir):
+    """
+    history_store.read_history: 一次扫描读取全部分区 (名称为分类列、数值为 float32)
+    """
+    import evening_push
+    import history_store
+    base_dir = os.path.join(workdir, "history_read")
+    for i in range(sizes["history_days"]):
+        df = evening_push.parse_sector_payload(fixtures.sector_payload(sizes["sectors"], seed=i), f"2024-{i // 28 + 1:02d}-{i % 28 + 1:02d}")
+        history_store.write_day(df, df["date"][0], base_dir)
+    return sizes["history_days"] * sizes["sectors"], lambda: history_store.read_history(base_dir=base_dir)
+
+def stage_sector_summary(sizes):
+    """
+    evening_push.summarize_days: 多日领涨/热门/龙头摘要
+    """
+    import pandas as pd
+    import evening_push
+    frames = [
+        evening_push.parse_sector_payload(fixtures.sector_payload(sizes["sectors"], seed=i), f"day{i:05d}")
+        for i in range(sizes["history_days"])
+    ]
+    df = pd.concat(frames, ignore_index=True)
+    return len(df), lambda: evening_push.summarize_days(df)
+
+def stage_sector_momentum(sizes):
+    """
+    sector_momentum.update_day: 并入当日板块 (状态已有 history_days 天，同日重跑替换)
+    """
+    import evening_push
+    import sector_momentum
+    state = sector_momentum.new_state()
+    for i in range(sizes["history_days"]):
+        df = evening_push.parse_sector_payload(fixtures.sector_payload(sizes["sectors"], seed=i), f"day{i:05d}")
+        sector_momentum.update_day(state, f"day{i:05d}", df)
+    today = f"day{sizes['history_days'] - 1:05d}"
+    return sizes["sectors"], lambda: sector_momentum.update_day(state, today, df)
+
+def stage_sector_rotation(sizes):
+    """
+    sector_rotation.analyze: 日期×板块矩阵 (rotation_days 天) 的周汇总、分位档、z 值与转移矩阵
+    """
+    import numpy as np
+    import sector_rotation
+    n_days, n = sizes["rotation_days"], sizes["sectors"]
+    rng = np.random.default_rng(0)
+    dates = (np.datetime64("2015-01-05") + np.arange(n_days * 7 // 5)).astype(str)
+    dates = [d for d in dates if np.is_busday(d)][:n_days]
+    cache = sector_rotation.RotationMatrix()
+    names = [f"行业{i}" for i in range(n)]
+    for d in dates:
+        cache.append_day(d, names, rng.normal(0, 1.5, n))
+    return n_days * n, lambda: sector_rotation.analyze(cache)
+
+def stage_backtest(sizes):
+    """
+    backtest.backtest: 全部 日期×规则 的状态、持仓、交易与收益 (历史估值为随机游走)
+    """
+    import numpy as np
+    import backtest
+    import rule_engine
+    n_days, n = sizes["backtest_days"], sizes["backtest_symbols"]
+    ruleset = rule_engine.RuleSet(fixtures.tencent_targets(n))
+    rng = np.random.default_rng(0)
+    price = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(n_days, n)), axis=0))
+    values = np.stack([price, price / rng.uniform(0.8, 1.5, n), price / 8, 60 / price], axis=-1)
+    dates = (np.datetime64("2014-01-01") + np.arange(n_days)).astype(str).tolist()
+    return n_days * len(ruleset), lambda: backtest.backtest(ruleset, dates, values)
+
+def stage_sweep(sizes):
+    """
+    sweep.evaluate_grid: 单只股票一个指标的全部 buy/sell 组合 (当前进程内，不含进程池开销)
+    """
+    import numpy as np
+    import sweep
+    n_days = sizes["backtest_days"]
+    rng = np.random.default_rng(0)
+    price = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, n_days)))
+    values = np.stack([price, price / 1.2, price / 8, 60 / price], axis=-1)
+    dates = np.datetime64("2014-01-01") + np.arange(n_days)
+    buys, sells = sweep.grid_for(values[:, 1], False)
+    return n_days * len(buys), lambda: sweep.evaluate_grid(dates, values, "pe_ttm", False, buys, sells)
+
+STAGES = [
+    ("sina_hq", stage_sina_hq),
+    ("tencent_quotes", stage_tencent_quotes),
+    ("watchlist_load", stage_watchlist_load),
+    ("rule_eval", stage_rule_eval),
+    ("noon_report", stage_noon_report),
+    ("tick_append", stage_tick_append),
+    ("sector_json", stage_sector_json),
+    ("history_write", stage_history_write),
+    ("history_read", stage_history_read),
+    ("sector_summary", stage_sector_summary),
+    ("sector_momentum", stage_sector_momentum),
+    ("sector_rotation", stage_sector_rotation),
+    ("backtest", stage_backtest),
+    ("sweep", stage_sweep),
+]
+
+# 需要临时目录的环节
+WORKDIR_STAGES = {"watchlist_load", "noon_report", "tick_append", "history_write", "history_read"}
+
+def time_stage(fn, repeat):
+    # 被测函数中的 print 不计入输出
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()  # 预热
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    return times
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+def run(scale, repeat, only=None):
+    sizes = {k: max(1, int(v * scale)) for k, v in SIZES.items()}
+    workdir = tempfile.mkdtemp(prefix="westockbot_bench_")
+    results = {}
+    try:
+        for name, factory in STAGES:
+            if only and name not in only:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                if name in WORKDIR_STAGES:
+                    size, fn = factory(sizes, workdir)
+                else:
+                    size, fn = factory(sizes)
+            times = time_stage(fn, repeat)
+            median = statistics.median(times)
+            results[name] = {
+                "size": size,
+                "best_s": min(times),
+                "median_s": median,
+                "per_item_us": median / size * 1e6,
+                "items_per_s": size / median if median > 0 else None,
+            }
+            print(f"{name:<16} {size:>8} 条  中位 {median * 1e3:>9.2f} ms  {median / size * 1e6:>8.2f} us/条",
+                  file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "scale": scale,
+            "repeat": repeat,
+            "sizes": sizes,
+        },
+        "stages": results,
+    }
+
+def compare(current, baseline, threshold):
+    """
+    规模相同时对比最快一次的耗时 (受机器抖动影响最小)，规模不同时退而对比每条耗时；
+    返回变慢超过阈值的环节
+    """
+    regressions = []
+    print(f"对比基准 {baseline['meta'].get('commit')} -> {current['meta'].get('commit')}", file=sys.stderr)
+    for name, cur in current["stages"].items():
+        base = baseline["stages"].get(name)
+        if not base:
+            continue
+        key, unit, note = "best_s", "s", ""
+        if base["size"] != cur["size"]:
+            key, unit, note = "per_item_us", "us/条", " (规模不同)"
+        ratio = cur[key] / base[key] if base[key] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ⚠️ 变慢"
+            regressions.append(name)
+        print(f"{name:<16} {base[key]:>10.4g} -> {cur[key]:>10.4g} {unit}  x{ratio:.2f}{note}{flag}",
+              file=sys.stderr)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="WeStockBot 离线基准测试")
+    parser.add_argument("--scale", type=float, default=1.0, help="规模倍数")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--stage", action="append", help="只测指定环节 (可多次指定)")
+    parser.add_argument("--output", help="结果写入 JSON 文件 (默认输出到标准输出)")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的变慢比例")
+    args = parser.parse_args()
+
+    result = run(args.scale, args.repeat, args.stage)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
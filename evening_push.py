@@ -5,115 +5,216 @@ import datetime
 import os
 import json
 import re
+import time
+import history_store
+import sector_momentum
+import sector_rotation
+import run_metrics
+import run_state
+import quote_gateway
+from wechat_push import push_to_wechat
 
-# 1. 获取 Key
-KEYS_STR = os.getenv("SERVERCHAN_KEY", "")
+# 复盘报告: 展示天数 / 领涨板块数 / 热门板块数 / 龙头数
+REPORT_DAYS = 5
+TOP_GAINERS = 5
+TOP_AMOUNTS = 3
+TOP_LEADERS = 3
+SUMMARY_CACHE_PATH = os.path.join("data", "summary_cache.json")
+# 行业板块接口地址，可用环境变量指向本地替身服务 (见 loadtest/)
+SECTOR_URL = os.getenv("WESTOCK_SINA_SECTOR_URL", "http://vip.stock.finance.sina.com.cn/q/view/newSinaHy.php")
 
-def get_market_analysis():
+def summarize_days(df, top_gainers=TOP_GAINERS, top_amounts=TOP_AMOUNTS, top_leaders=TOP_LEADERS):
+    """
+    一次分组计算所有日期的摘要，返回 {date: 摘要文本}
+    每个排序只做一次，再按日期取前 N 行，避免逐日过滤和 iterrows
+    """
+    if df.empty:
+        return {}
+    
+    # 领涨 Top N (按涨幅)
+    by_pct = df.sort_values(['date', 'pct'], ascending=[True, False]).groupby('date', sort=False)
+    gainers = by_pct.head(top_gainers)
+    # 名称可能是分类列 (history_store 读出的数据)，拼接前转为字符串
+    gainers_str = (gainers['name'].astype(str) + '(' + gainers['pct'].astype(str) + '%)').groupby(gainers['date']).agg(', '.join)
+    
+    # 龙头: 取领涨前几个板块的龙头
+    leaders = by_pct.head(top_leaders)
+    leaders_str = (leaders['leader'].astype(str) + ' ' + leaders['leader_pct'].astype(str) + '%').groupby(leaders['date']).agg(', '.join)
+    
+    # 热门 Top N (按成交额)
+    amounts = df.sort_values(['date', 'amount'], ascending=[True, False]).groupby('date', sort=False).head(top_amounts)
+    amounts_str = (amounts['name'].astype(str) + '(' + amounts['amount'].map('{:.0f}'.format) + '亿)').groupby(amounts['date']).agg(', '.join)
+    
+    blocks = {}
+    for date_str in gainers_str.index:
+        blocks[date_str] = "\n".join([
+            f"📅 **{date_str}**",
+            f"🔥 领涨: {gainers_str[date_str]}",
+            f"💰 热门: {amounts_str.get(date_str, '')}",
+            f"👑 龙头: {leaders_str.get(date_str, '')}",
+        ])
+    return blocks
+
+def summary_params():
+    return f"{TOP_GAINERS},{TOP_AMOUNTS},{TOP_LEADERS}"
+
+def load_summary_cache():
+    """
+    读取往日摘要缓存；参数变化时缓存作废
+    """
+    if not os.path.exists(SUMMARY_CACHE_PATH):
+        return {}
+    try:
+        with open(SUMMARY_CACHE_PATH, encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("params") != summary_params():
+            return {}
+        return cache.get("blocks", {})
+    except Exception as e:
+        print(f"⚠️ 摘要缓存读取失败，将重新计算: {e}")
+        return {}
+
+def save_summary_cache(blocks):
+    os.makedirs(os.path.dirname(SUMMARY_CACHE_PATH), exist_ok=True)
+    with open(SUMMARY_CACHE_PATH, "w", encoding="utf-8") as f:
+        json.dump({"params": summary_params(), "blocks": blocks}, f, ensure_ascii=False, indent=1)
+
+def parse_sector_payload(raw, date_str):
+    """
+    解析 Sina 行业板块响应，返回当日各板块的 DataFrame；找不到 JSON 时返回 None
+    """
+    # Sina 接口通常是 GBK 编码
+    text = raw.decode('gbk', errors='ignore')
+    
+    # 解析 JSON: var S_Finance_bankuai_sinaindustry = {...}
+    # 提取 {...} 部分
+    start_idx = text.find('{')
+    end_idx = text.rfind('}')
+    if start_idx == -1 or end_idx == -1:
+        return None
+        
+    json_str = text[start_idx:end_idx+1]
+    data_dict = json.loads(json_str)
+    
+    records = []
+    
+    # Format: "code,Name,Count,AvgPrice,ChangeAmt,ChangePct,Volume,Amount,LeaderCode,LeaderPct,LeaderPrice,LeaderChange,LeaderName"
+    for key, val_str in data_dict.items():
+        parts = val_str.split(',')
+        if len(parts) < 13:
+            run_metrics.count("records_dropped")
+            continue
+        
+        name = parts[1]
+        pct = float(parts[5])
+        amount = float(parts[7]) / 1e8 # 转为亿元
+        leader_name = parts[12]
+        leader_pct = float(parts[9])
+        
+        records.append({
+            "date": date_str,
+            "name": name,
+            "pct": pct,
+            "amount": amount,
+            "leader": leader_name,
+            "leader_pct": leader_pct
+        })
+        
+    run_metrics.count("records_parsed", len(records))
+    # 转为 DataFrame
+    return pd.DataFrame(records)
+
+def fetch_sectors():
+    """
+    拉取行业板块数据 (原始字节)；板块接口只有 Sina 一个源，慢响应超过阈值时再发一次对冲请求，取先到的结果
+    """
+    def call():
+        start = time.perf_counter()
+        try:
+            resp = requests.get(SECTOR_URL, timeout=10)
+            resp.raise_for_status()
+        except Exception:
+            run_metrics.http("sina_sector", time.perf_counter() - start, ok=False)
+            raise
+        run_metrics.http("sina_sector", time.perf_counter() - start, len(resp.content))
+        return {"sectors": resp.content}, True
+
+    calls = [("sina_sector", {"sectors"}, call)] * 2
+    result, _ = quote_gateway.hedged(calls, ["sectors"], quote_gateway.hedge_after("sina_sector"))
+    return result["sectors"]
+
+def get_market_analysis(dedup=False):
+    """
+    dedup=True 时板块数据与上次成功推送时完全相同则返回 (None, None)，不写历史
+    """
     print("🌙 正在生成【A股复盘】(Sina版)...")
     summary_lines = []
     
-    # 定义 CSV 路径 (使用新文件以区分旧数据源)
-    data_dir = "data"
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
-    csv_path = os.path.join(data_dir, "history_sector_sina.csv")
+    # 首次运行时把旧的 CSV 一次性迁移为按日分区
+    if not history_store.list_dates() and os.path.exists(history_store.LEGACY_CSV):
+        history_store.migrate_csv()
     
     try:
         # 1. 获取今日数据 (Sina 行业板块)
-        url = "http://vip.stock.finance.sina.com.cn/q/view/newSinaHy.php"
-        resp = requests.get(url, timeout=10)
-        # Sina 接口通常是 GBK 编码
-        text = resp.content.decode('gbk', errors='ignore')
+        with run_metrics.stage("fetch"):
+            raw = fetch_sectors()
+        today_str = datetime.datetime.now().strftime("%Y-%m-%d")
+        if dedup and run_state.is_duplicate("evening", run_state.payload_hash(raw)):
+            print("⏭️ 板块数据与上次推送时相同，跳过")
+            return None, None
         
-        # 解析 JSON: var S_Finance_bankuai_sinaindustry = {...}
-        # 提取 {...} 部分
-        start_idx = text.find('{')
-        end_idx = text.rfind('}')
-        if start_idx == -1 or end_idx == -1:
+        # 2. 解析并清洗数据
+        with run_metrics.stage("parse"):
+            df_new = parse_sector_payload(raw, today_str)
+        if df_new is None:
+            run_state.discard("evening")
             return "分析失败", "数据解析错误: 无法找到JSON数据"
-            
-        json_str = text[start_idx:end_idx+1]
-        data_dict = json.loads(json_str)
         
-        today_str = datetime.datetime.now().strftime("%Y-%m-%d")
-        today_records = []
+        # 3. 写入今日分区 (同一天重复运行只覆盖当天文件)
+        with run_metrics.stage("write"):
+            path = history_store.write_day(df_new, today_str)
+        run_metrics.count("rows_written", len(df_new))
+        print(f"✅ 数据已更新至 {path}")
         
-        # 2. 清洗数据
-        # Format: "code,Name,Count,AvgPrice,ChangeAmt,ChangePct,Volume,Amount,LeaderCode,LeaderPct,LeaderPrice,LeaderChange,LeaderName"
-        for key, val_str in data_dict.items():
-            parts = val_str.split(',')
-            if len(parts) < 13: continue
-            
-            name = parts[1]
-            pct = float(parts[5])
-            amount = float(parts[7]) / 1e8 # 转为亿元
-            leader_name = parts[12]
-            leader_pct = float(parts[9])
-            
-            today_records.append({
-                "date": today_str,
-                "name": name,
-                "pct": pct,
-                "amount": amount,
-                "leader": leader_name,
-                "leader_pct": leader_pct
-            })
-            
-        # 转为 DataFrame
-        df_new = pd.DataFrame(today_records)
+        # 较早的逐日分区并为周/月汇总 (没有需要合并的周期时只列一下目录)
+        with run_metrics.stage("compact"):
+            weeks, months = history_store.compact()
+        if weeks or months:
+            print(f"🗜️ 历史数据已压缩: 新增 {weeks} 个周汇总、{months} 个月汇总")
         
-        # 3. 读取并更新 CSV
-        if os.path.exists(csv_path):
-            df_hist = pd.read_csv(csv_path)
-            # 删除今天已有的数据
-            df_hist = df_hist[df_hist['date'] != today_str]
-        else:
-            df_hist = pd.DataFrame(columns=["date", "name", "pct", "amount", "leader", "leader_pct"])
-            
-        # 合并
-        df_final = pd.concat([df_hist, df_new], ignore_index=True)
+        # 4. 滚动动量: 状态只补齐缺失的往日，再并入今日 (同日重跑替换今日)
+        with run_metrics.stage("momentum"):
+            state = sector_momentum.sync(sector_momentum.load_state(), before=today_str)
+            sector_momentum.update_day(state, today_str, df_new)
+            sector_momentum.save_state(state)
+        momentum_lines = sector_momentum.report_lines(state)
+        if momentum_lines:
+            summary_lines.extend(momentum_lines)
+            summary_lines.append("")
         
-        # 保存回 CSV
-        df_final.to_csv(csv_path, index=False)
-        print(f"✅ 数据已更新至 {csv_path}")
+        # 5. 板块轮动: 日期×板块矩阵只追加今日一行，再按 N 周一期做截面分析
+        with run_metrics.stage("rotation"):
+            matrix = sector_rotation.sync(sector_rotation.load_cache(), before=today_str)
+            sector_rotation.append_frame(matrix, today_str, df_new)
+            sector_rotation.save_cache(matrix)
+            rotation_lines = sector_rotation.report_lines(matrix)
+        if rotation_lines:
+            summary_lines.extend(rotation_lines)
+            summary_lines.append("")
         
-        # 4. 生成最近 5 个交易日的报告
-        all_dates = sorted(df_final['date'].unique(), reverse=True)
-        recent_dates = all_dates[:5] 
+        # 6. 生成最近 N 个交易日的报告: 往日的摘要直接取缓存，只重算今日及缺失的日期
+        recent_dates = history_store.list_dates()[-REPORT_DAYS:]
+        cache = load_summary_cache()
+        missing = [d for d in recent_dates if d == today_str or d not in cache]
+        with run_metrics.stage("summarize"):
+            if missing:
+                cache.update(summarize_days(history_store.read_dates(missing)))
+        save_summary_cache({d: cache[d] for d in recent_dates if d in cache})
         
-        for date_str in recent_dates:
-            day_data = df_final[df_final['date'] == date_str]
-            
-            # 找出领涨 Top 5
-            top_gainers = day_data.sort_values(by='pct', ascending=False).head(5)
-            # 找出成交额 Top 3 (热度)
-            top_amounts = day_data.sort_values(by='amount', ascending=False).head(3)
-            
-            summary_lines.append(f"📅 **{date_str}**")
-            
-            # 领涨板块 + 龙头
-            line_gainers = []
-            for _, row in top_gainers.iterrows():
-                # 格式: 行业(2.5%) 
-                # 简化显示，避免过长
-                line_gainers.append(f"{row['name']}({row['pct']}%)")
-            summary_lines.append(f"🔥 领涨: {', '.join(line_gainers)}")
-            
-            # 热门板块 (成交额)
-            line_amounts = []
-            for _, row in top_amounts.iterrows():
-                line_amounts.append(f"{row['name']}({row['amount']:.0f}亿)")
-            summary_lines.append(f"💰 热门: {', '.join(line_amounts)}")
-            
-            # 龙头股展示 (取 Top 3 领涨板块的龙头)
-            top3_gainers = top_gainers.head(3)
-            leaders = []
-            for _, row in top3_gainers.iterrows():
-                leaders.append(f"{row['leader']} {row['leader_pct']}%")
-            summary_lines.append(f"👑 龙头: {', '.join(leaders)}")
-            
-            summary_lines.append("")
+        for date_str in reversed(recent_dates):
+            if date_str in cache:
+                summary_lines.append(cache[date_str])
+                summary_lines.append("")
             
         # 生成标题
         title = f"A股复盘: {today_str} (Sina版)"
@@ -123,24 +224,27 @@ def get_market_analysis():
     except Exception as e:
         import traceback
         traceback.print_exc()
+        # 失败的分析不能记为上次成功的数据，否则同样的数据重跑会被当作重复跳过
+        run_state.discard("evening")
         return "分析失败", f"数据解析错误: {str(e)}"
 
-def push_to_wechat(title, content):
-    if not KEYS_STR: 
-        print("⚠️ 未配置 Key")
+def run():
+    # 休市日板块数据不更新，不写历史也不推送
+    if not run_state.should_run_today("evening"):
         return
-    keys = KEYS_STR.split(",")
-    for key in keys:
-        key = key.strip()
-        if not key: continue
-        url = f"https://sctapi.ftqq.com/{key}.send"
-        requests.post(url, data={"title": title, "desp": content})
-        print(f"✅ 推送给 ...{key[-4:]}")
+    run_metrics.start_run("evening")
+    title, content = get_market_analysis(dedup=True)
+    if title is not None:
+        print("----------------")
+        print(title)
+        print(content)
+        print("----------------")
+        with run_metrics.stage("push"):
+            results = push_to_wechat(title, content)
+        if any(r["ok"] for r in results.values()):
+            run_state.commit("evening")
+    quote_gateway.save_stats()
+    run_metrics.finish()
 
 if __name__ == "__main__":
-    title, content = get_market_analysis()
-    print("----------------")
-    print(title)
-    print(content)
-    print("----------------")
-    push_to_wechat(title, content)
+    run()
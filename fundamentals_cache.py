@@ -0,0 +1,344 @@
+# 文件名: fundamentals_cache.py
+# 本地基本面缓存: 以 (股票代码, 报告期) 为键保存财务指标，
+# 只刷新应已披露的最新年报缺失的股票，年报披露截止日 (次年 4 月 30 日) 之间不重复联网
+# (选股因子只用年报口径，季报不单独追)
+#
+# 存储 (Parquet，代码/指标名字典编码):
+#   data/fundamentals/statements.parquet  长表: code, period(20240930), item, value
+#   data/fundamentals/codes.parquet       每只股票: latest_period, checked_at, accessed_at
+#
+# 缓存的指标按 FACTOR_ITEMS 换算为 Z 值选股的因子输入 (factor_inputs，见 z_screener.py)
+import pandas as pd
+import numpy as np
+import datetime
+import time
+import os
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+CACHE_DIR = os.path.join("data", "fundamentals")
+STATEMENTS_FILE = "statements.parquet"
+CODES_FILE = "codes.parquet"
+
+KEEP_YEARS = 6              # 只保留最近 6 年的报告期 (5 年 ROE 中位数够用)
+ACCESS_TTL_DAYS = 90        # 超过 90 天未被使用的股票整体淘汰 (退市/移出股票池)
+RECHECK_HOURS = 24          # 截止日已过仍缺年报的股票，最多每 24 小时重查一次
+ANNUAL_DEADLINE = (4, 30)   # 年报披露截止日 (次年 月, 日)
+MAX_ROWS = 5_000_000        # 行数上限，超出后按最久未使用淘汰
+FETCH_WORKERS = 4
+
+STATEMENT_COLUMNS = ["code", "period", "item", "value"]
+CODE_COLUMNS = ["code", "latest_period", "checked_at", "accessed_at"]
+
+# 因子输入 -> 缓存中的指标名称 (新浪关键指标 / 三大报表科目)；有多个名称时按顺序取第一个有值的
+FACTOR_ITEMS = {
+    "revenue":        ("营业总收入", "营业收入"),
+    "net_profit":     ("归母净利润", "归属于母公司所有者的净利润", "净利润"),
+    "ocf":            ("经营现金流量净额", "经营活动产生的现金流量净额"),
+    "capex":          ("购建固定资产、无形资产和其他长期资产支付的现金", "购建固定资产、无形资产和其他长期资产所支付的现金"),
+    "gross_margin":   ("毛利率",),
+    "asset_turnover": ("总资产周转率",),
+    "roe":            ("净资产收益率(ROE)", "净资产收益率"),
+    "roa":            ("总资产报酬率(ROA)", "总资产净利率"),
+    "profit_growth":  ("归属母公司净利润增长率", "净利润增长率"),
+    "cash":           ("货币资金",),
+    "total_assets":   ("资产总计", "资产合计"),
+    "equity":         ("股东权益合计(净资产)", "所有者权益(或股东权益)合计", "归属于母公司股东权益合计"),
+    "short_debt":     ("短期借款",),
+    "current_debt":   ("一年内到期的非流动负债",),
+    "long_debt":      ("长期借款",),
+    "bonds":          ("应付债券",),
+    "total_profit":   ("利润总额",),
+    "income_tax":     ("所得税费用", "所得税"),
+    "finance_cost":   ("财务费用",),
+}
+# 关键指标中以百分数给出的比率，换算为小数
+PERCENT_INPUTS = ("gross_margin", "roe", "roa", "profit_growth")
+# 有息负债 = 各借款科目之和
+DEBT_INPUTS = ("short_debt", "current_debt", "long_debt", "bonds")
+ROE_YEARS = 5
+# 三大报表 (关键指标之外只取 FACTOR_ITEMS 用到的科目)
+REPORT_SHEETS = ("资产负债表", "利润表", "现金流量表")
+# factor_inputs 返回的列 (与 z_screener.COLUMNS 同名)
+FACTOR_COLUMNS = [
+    "fcf", "net_profit", "capex", "revenue", "gross_margin", "asset_turnover", "roe_median_5y",
+    "cash", "interest_debt_ratio", "roa", "profit_growth", "net_cash", "ebit", "tax_rate",
+    "interest_debt", "equity",
+]
+
+def expected_annual_period(today=None):
+    """
+    披露截止日已过、理应已经发布的最新年报期，返回 20241231 形式的整数
+    (如 2026-10-18 -> 20251231，2026-04-15 -> 20241231)
+    """
+    today = today or datetime.date.today()
+    year = today.year - 1
+    if today <= datetime.date(today.year, *ANNUAL_DEADLINE):
+        year -= 1
+    return year * 10000 + 1231
+
+def sina_symbol(code):
+    """
+    6 位代码 -> 新浪报表接口的代码 (sh600519 / sz000001 / bj430047)
+    """
+    if code.startswith(("6", "9")):
+        return "sh" + code
+    if code.startswith(("4", "8")):
+        return "bj" + code
+    return "sz" + code
+
+def akshare_fetcher(code):
+    """
+    默认数据源: 新浪财经-关键指标 (行为指标、列为报告期) + 三大报表中因子用到的科目，转为长表
+    """
+    import akshare as ak
+    wide = ak.stock_financial_abstract(symbol=code)
+    period_cols = [c for c in wide.columns if str(c).isdigit()]
+    long = wide.melt(id_vars=["指标"], value_vars=period_cols, var_name="period", value_name="value")
+    long = long.rename(columns={"指标": "item"})
+    frames = [long]
+
+    # 关键指标里没有的科目 (资本开支、货币资金、借款、所得税等) 从报表中补
+    wanted = {name for names in FACTOR_ITEMS.values() for name in names} - set(long["item"])
+    for sheet in REPORT_SHEETS:
+        report = ak.stock_financial_report_sina(stock=sina_symbol(code), symbol=sheet)
+        items = [c for c in report.columns if c in wanted]
+        if items:
+            frames.append(report.melt(id_vars=["报告日"], value_vars=items, var_name="item", value_name="value")
+                          .rename(columns={"报告日": "period"}))
+            wanted -= set(items)
+
+    long = pd.concat(frames, ignore_index=True)
+    long["value"] = pd.to_numeric(long["value"], errors="coerce")
+    long = long.dropna(subset=["value"])
+    long["period"] = long["period"].astype(int)
+    return long[["period", "item", "value"]]
+
+class FundamentalsCache:
+    def __init__(self, cache_dir=CACHE_DIR, fetcher=akshare_fetcher, keep_years=KEEP_YEARS,
+                 access_ttl_days=ACCESS_TTL_DAYS, recheck_hours=RECHECK_HOURS, max_rows=MAX_ROWS):
+        self.cache_dir = cache_dir
+        self.fetcher = fetcher
+        self.keep_years = keep_years
+        self.access_ttl = access_ttl_days * 86400
+        self.recheck = recheck_hours * 3600
+        self.max_rows = max_rows
+        self.fetch_count = 0
+        self.statements = self._read(STATEMENTS_FILE, STATEMENT_COLUMNS)
+        codes = self._read(CODES_FILE, CODE_COLUMNS)
+        self.codes = {row.code: {"latest_period": int(row.latest_period), "checked_at": float(row.checked_at),
+                                 "accessed_at": float(row.accessed_at)}
+                      for row in codes.itertuples(index=False)}
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _read(self, name, columns):
+        path = self._path(name)
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+        return pd.DataFrame(columns=columns)
+
+    def stale_codes(self, codes, today=None, now=None):
+        """
+        需要联网刷新的股票: 从未缓存，或缓存中没有理应已发布的年报且距上次检查已超过重查间隔
+        已有更新的季报/年报的股票不联网
+        """
+        expected = expected_annual_period(today)
+        now = now or time.time()
+        stale = []
+        for code in codes:
+            meta = self.codes.get(code)
+            if meta is None:
+                stale.append(code)
+            elif meta["latest_period"] < expected and now - meta["checked_at"] >= self.recheck:
+                stale.append(code)
+        return stale
+
+    def refresh(self, codes, today=None, workers=FETCH_WORKERS):
+        """
+        只拉取过期的股票，合并进缓存，返回实际联网的股票数
+        """
+        now = time.time()
+        stale = self.stale_codes(codes, today, now)
+        if not stale:
+            return 0
+
+        print(f"📡 基本面缓存: {len(stale)}/{len(codes)} 只需要刷新...")
+        fetched = {}
+        with ThreadPoolExecutor(max_workers=min(workers, len(stale))) as pool:
+            futures = {pool.submit(self.fetcher, code): code for code in stale}
+            for future in as_completed(futures):
+                code = futures[future]
+                try:
+                    fetched[code] = future.result()
+                except Exception as e:
+                    print(f"❌ 基本面拉取失败 ({code}): {e}")
+                # 失败也记录检查时间，避免同一天反复重试
+                meta = self.codes.setdefault(code, {"latest_period": 0, "checked_at": 0.0, "accessed_at": now})
+                meta["checked_at"] = now
+        self.fetch_count += len(stale)
+
+        frames = []
+        for code, df in fetched.items():
+            if df is None or df.empty:
+                continue
+            df = df.assign(code=code)[STATEMENT_COLUMNS]
+            frames.append(df)
+            self.codes[code]["latest_period"] = int(df["period"].max())
+        if frames:
+            new = pd.concat(frames, ignore_index=True)
+            # 数据源每次返回该股票的全部报告期，直接整体替换这些股票的旧行
+            old = self.statements[~self.statements["code"].isin(list(fetched))]
+            self.statements = pd.concat([old, new], ignore_index=True)
+        return len(stale)
+
+    def get(self, codes=None, items=None):
+        """
+        读取长表，同时刷新这些股票的访问时间 (用于淘汰)
+        """
+        df = self.statements
+        if codes is not None:
+            codes = list(codes)
+            df = df[df["code"].isin(codes)]
+            now = time.time()
+            for code in codes:
+                if code in self.codes:
+                    self.codes[code]["accessed_at"] = now
+        if items is not None:
+            df = df[df["item"].isin(list(items))]
+        return df
+
+    def latest(self, codes=None, items=None):
+        """
+        每只股票最新报告期的宽表: 行为 code，列为指标
+        """
+        df = self.get(codes, items)
+        if df.empty:
+            return pd.DataFrame()
+        last = df.groupby("code", observed=True)["period"].transform("max")
+        df = df[df["period"] == last]
+        return df.pivot_table(index="code", columns="item", values="value", aggfunc="last", observed=True)
+
+    def annual_median(self, item, years=5, codes=None):
+        """
+        最近 N 个年报 (1231) 某指标的中位数，如 5 年 ROE 中位数
+        """
+        df = self.get(codes, [item])
+        df = df[df["period"] % 10000 == 1231]
+        df = df.sort_values("period").groupby("code", observed=True).tail(years)
+        return df.groupby("code", observed=True)["value"].median()
+
+    def factor_inputs(self, codes=None):
+        """
+        按 FACTOR_ITEMS 把缓存的指标换算为 Z 值选股的因子输入，返回以 code 为索引、列为 FACTOR_COLUMNS 的宽表
+        均按年报口径: 取每只股票最近一期年报，ROE 取最近 ROE_YEARS 个年报的中位数
+        """
+        names = {name: field for field, aliases in FACTOR_ITEMS.items() for name in aliases}
+        df = self.get(codes, names)
+        df = df[df["period"] % 10000 == 1231]
+        if df.empty:
+            return pd.DataFrame(columns=FACTOR_COLUMNS)
+        wide = df.pivot_table(index=["code", "period"], columns="item", values="value", aggfunc="last", observed=True)
+
+        # (股票, 年报) x 因子输入: 同一输入的多个名称按顺序补齐
+        raw = pd.DataFrame(index=wide.index)
+        for field, aliases in FACTOR_ITEMS.items():
+            col = pd.Series(np.nan, index=wide.index)
+            for name in aliases:
+                if name in wide.columns:
+                    col = col.fillna(wide[name])
+            raw[field] = col
+        for field in PERCENT_INPUTS:
+            raw[field] = raw[field] / 100
+
+        raw = raw.sort_index()
+        roe_median = raw["roe"].groupby(level="code").apply(lambda s: s.dropna().tail(ROE_YEARS).median())
+        last = raw.groupby(level="code").tail(1).droplevel("period")
+
+        out = pd.DataFrame(index=last.index)
+        out["fcf"] = last["ocf"] - last["capex"]
+        for field in ("net_profit", "capex", "revenue", "gross_margin", "asset_turnover",
+                      "cash", "roa", "profit_growth", "equity"):
+            out[field] = last[field]
+        out["roe_median_5y"] = roe_median
+        # 有息负债: 各借款科目都缺失时为 NaN，缺部分科目按 0 计
+        out["interest_debt"] = last[list(DEBT_INPUTS)].sum(axis=1, min_count=1)
+        out["interest_debt_ratio"] = out["interest_debt"] / last["total_assets"]
+        out["net_cash"] = last["cash"] - out["interest_debt"].fillna(0)
+        # EBIT 近似为 利润总额 + 财务费用
+        out["ebit"] = last["total_profit"] + last["finance_cost"].fillna(0)
+        out["tax_rate"] = last["income_tax"] / last["total_profit"]
+        return out[FACTOR_COLUMNS]
+
+    def evict(self, now=None, today=None):
+        """
+        TTL 淘汰: 过旧的报告期、长期未使用的股票；容量淘汰: 超出行数上限时按最久未使用淘汰
+        """
+        now = now or time.time()
+        today = today or datetime.date.today()
+        min_period = (today.year - self.keep_years) * 10000
+        df = self.statements
+        df = df[df["period"] >= min_period]
+
+        expired = {code for code, meta in self.codes.items() if now - meta["accessed_at"] > self.access_ttl}
+        if len(df) > self.max_rows:
+            counts = df.groupby("code", observed=True).size()
+            by_access = sorted(self.codes.items(), key=lambda kv: kv[1]["accessed_at"])
+            total = len(df) - int(counts.reindex(list(expired)).fillna(0).sum())
+            for code, _ in by_access:
+                if total <= self.max_rows:
+                    break
+                if code not in expired:
+                    expired.add(code)
+                    total -= int(counts.get(code, 0))
+
+        if expired:
+            df = df[~df["code"].isin(list(expired))]
+            for code in expired:
+                self.codes.pop(code, None)
+        removed = len(self.statements) - len(df)
+        self.statements = df
+        return removed
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        df = self.statements.copy()
+        df["code"] = df["code"].astype("category")
+        df["item"] = df["item"].astype("category")
+        df["period"] = df["period"].astype(np.int32)
+        df["value"] = df["value"].astype(np.float64)
+        codes = pd.DataFrame(
+            [(code, m["latest_period"], m["checked_at"], m["accessed_at"]) for code, m in self.codes.items()],
+            columns=CODE_COLUMNS,
+        )
+        for name, frame in ((STATEMENTS_FILE, df), (CODES_FILE, codes)):
+            path = self._path(name)
+            frame.to_parquet(path + ".tmp", index=False)
+            os.replace(path + ".tmp", path)
+
+def all_a_codes():
+    import akshare as ak
+    return ak.stock_info_a_code_name()["code"].astype(str).tolist()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地基本面缓存")
+    sub = parser.add_subparsers(dest="cmd")
+    p_refresh = sub.add_parser("refresh", help="增量刷新 (默认全部 A 股)")
+    p_refresh.add_argument("codes", nargs="*")
+    sub.add_parser("stats", help="查看缓存状态")
+    args = parser.parse_args()
+
+    cache = FundamentalsCache()
+    if args.cmd == "refresh":
+        codes = args.codes or all_a_codes()
+        n = cache.refresh(codes)
+        cache.get(codes)
+        removed = cache.evict()
+        cache.save()
+        print(f"✅ 联网 {n} 只，淘汰 {removed} 行，缓存共 {len(cache.statements)} 行 / {len(cache.codes)} 只")
+    elif args.cmd == "stats":
+        print(f"缓存共 {len(cache.statements)} 行 / {len(cache.codes)} 只，期望最新年报期 {expected_annual_period()}")
+        print(f"需要刷新: {len(cache.stale_codes(list(cache.codes)))} 只")
+    else:
+        parser.print_help()
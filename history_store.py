@@ -0,0 +1,272 @@
+# 文件名: history_store.py
+# 行业板块历史数据存储: 每个交易日一个 Parquet 分区文件
+#   data/history_sector/2024-01-02.parquet
+# 同一天重复运行只覆盖当天的分区，读取时只加载需要的日期
+#
+# 长期历史按时间分层压缩 (compact): 最近 DAILY_KEEP 个交易日保留逐日分区，
+# 更早的并为周汇总，超过 WEEKLY_KEEP 周的再并为月汇总，每个周期一个文件
+#   data/history_sector/weekly/2023.parquet    # 周汇总，每年一个文件 (跨月的周在月初切开，保证周完整地落在某个月内)
+#   data/history_sector/monthly/2021.parquet   # 月汇总，每年一个文件
+# 板块名/龙头名存为分类 (字典编码)，数值列存为 float32
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import os
+import datetime
+import argparse
+from pandas.api.types import union_categoricals
+
+DATA_DIR = "data"
+HISTORY_DIR = os.path.join(DATA_DIR, "history_sector")
+LEGACY_CSV = os.path.join(DATA_DIR, "history_sector_sina.csv")
+COLUMNS = ["date", "name", "pct", "amount", "leader", "leader_pct"]
+SUFFIX = ".parquet"
+
+# 汇总行: date / end 为周期内第一个 / 最后一个交易日，days 为交易日数，
+# pct 为周期内复利累计涨幅，amount 为成交额合计，leader / leader_pct 取周期最后一个交易日
+AGG_COLUMNS = ["date", "end", "days", "name", "pct", "amount", "leader", "leader_pct"]
+CATEGORY_COLUMNS = ["name", "leader"]
+FLOAT_COLUMNS = ["pct", "amount", "leader_pct"]
+
+_NAME = pa.dictionary(pa.int32(), pa.string())
+DAY_SCHEMA = pa.schema([
+    ("date", pa.string()), ("name", _NAME), ("pct", pa.float32()),
+    ("amount", pa.float32()), ("leader", _NAME), ("leader_pct", pa.float32()),
+])
+AGG_SCHEMA = pa.schema([
+    ("date", pa.string()), ("end", pa.string()), ("days", pa.int32()), ("name", _NAME), ("pct", pa.float32()),
+    ("amount", pa.float32()), ("leader", _NAME), ("leader_pct", pa.float32()),
+])
+
+DAILY_KEEP = 120        # 保留逐日分区的交易日数 (约半年)
+WEEKLY_KEEP = 104       # 保留周汇总的周数 (约两年)
+TIERS = ("weekly", "monthly")
+
+def partition_path(date_str, base_dir=HISTORY_DIR):
+    return os.path.join(base_dir, f"{date_str}{SUFFIX}")
+
+def list_dates(base_dir=HISTORY_DIR):
+    """
+    已存储的日期 (升序)，只看文件名，不读取数据
+    """
+    if not os.path.isdir(base_dir):
+        return []
+    return sorted(f[:-len(SUFFIX)] for f in os.listdir(base_dir) if f.endswith(SUFFIX))
+
+def typed(df):
+    """
+    名称列转为分类，数值列转为 float32 (已是目标类型的列不复制)
+    """
+    df = df.copy(deep=False)
+    for col in CATEGORY_COLUMNS:
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col in FLOAT_COLUMNS:
+        if col in df and df[col].dtype != np.float32:
+            df[col] = df[col].astype(np.float32)
+    return df
+
+def _concat(frames, columns):
+    """
+    合并多个 DataFrame: 分类列按并集合并，避免 pd.concat 在类别不同时退化为 object
+    """
+    frames = [typed(f.reindex(columns=columns)) for f in frames if len(f)]
+    if not frames:
+        return typed(pd.DataFrame(columns=columns))
+    if len(frames) == 1:
+        return frames[0]
+    out = pd.concat([f.drop(columns=CATEGORY_COLUMNS) for f in frames], ignore_index=True)
+    for col in CATEGORY_COLUMNS:
+        out[col] = union_categoricals([f[col] for f in frames], ignore_order=True)
+    return out[columns]
+
+def _read(paths, schema):
+    """
+    一次扫描读取多个分区文件 (按 schema 转换类型，兼容旧的 object / float64 分区)
+    """
+    columns = schema.names
+    if not paths:
+        return typed(pd.DataFrame(columns=columns))
+    table = ds.dataset(paths, format="parquet", schema=schema).to_table()
+    return typed(table.to_pandas())
+
+def _write(df, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def write_day(df, date_str, base_dir=HISTORY_DIR):
+    """
+    写入(或覆盖)某一天的分区。先写临时文件再原子替换，中途失败不会留下半个文件
+    """
+    df = typed(df.reindex(columns=COLUMNS))
+    df["date"] = date_str
+    path = partition_path(date_str, base_dir)
+    _write(df, path)
+    return path
+
+def read_dates(dates, base_dir=HISTORY_DIR):
+    paths = [partition_path(d, base_dir) for d in dates]
+    return _read([p for p in paths if os.path.exists(p)], DAY_SCHEMA)
+
+def read_recent(n, base_dir=HISTORY_DIR):
+    """
+    读取最近 n 个交易日的数据
+    """
+    return read_dates(list_dates(base_dir)[-n:], base_dir)
+
+# ================= 分层压缩 =================
+
+def week_key(date_str):
+    """
+    周汇总的周期键: 该周周一，跨月时取当月 1 日
+    """
+    day = datetime.date.fromisoformat(date_str)
+    return max(day - datetime.timedelta(days=day.weekday()), day.replace(day=1)).isoformat()
+
+def month_key(date_str):
+    return date_str[:8] + "01"
+
+def tier_dir(tier, base_dir=HISTORY_DIR):
+    return os.path.join(base_dir, tier)
+
+def aggregate(df, key_of):
+    """
+    按 (周期, 板块) 汇总逐日数据或更细的汇总行，key_of 由周期内第一个交易日得到周期键
+    """
+    df = df.reindex(columns=AGG_COLUMNS)
+    df["end"] = df["end"].fillna(df["date"])
+    df["days"] = df["days"].fillna(1).astype(np.int32)
+    df["log"] = np.log1p(df["pct"].astype(np.float64) / 100)
+    df["period"] = df["date"].map({d: key_of(d) for d in df["date"].unique()})
+    df = df.sort_values(["period", "date"], kind="stable")
+    grouped = df.groupby(["period", "name"], observed=True, sort=True)
+    out = grouped.agg(
+        date=("date", "first"), end=("end", "last"), days=("days", "sum"), log=("log", "sum"),
+        amount=("amount", "sum"), leader=("leader", "last"), leader_pct=("leader_pct", "last"),
+    ).reset_index()
+    out["pct"] = np.expm1(out["log"]) * 100
+    return typed(out[AGG_COLUMNS])
+
+def _write_tier(df, tier, base_dir, years):
+    """
+    按年写入 tier 层 (每年一个文件)；years 中没有数据的年份删除文件
+    """
+    directory = tier_dir(tier, base_dir)
+    year_of = df["date"].str[:4]
+    for year in sorted(years):
+        path = partition_path(year, directory)
+        part = df[year_of == year]
+        if len(part):
+            _write(part.sort_values(["date", "name"]).reset_index(drop=True), path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+def _merge_tier(df, tier, key_of, base_dir):
+    """
+    把 df 汇总后并入 tier 层；已有的同一周期 (如补录了更早的日期) 一并重新汇总。返回新汇总的周期数
+    """
+    years = set(df["date"].str[:4])
+    existing = [partition_path(y, tier_dir(tier, base_dir)) for y in sorted(years)]
+    old = _read([p for p in existing if os.path.exists(p)], AGG_SCHEMA)
+    periods = len({key_of(d) for d in df["date"].unique()})
+    _write_tier(aggregate(_concat([old, df], AGG_COLUMNS), key_of), tier, base_dir, years)
+    return periods
+
+def read_tier(tier, base_dir=HISTORY_DIR):
+    directory = tier_dir(tier, base_dir)
+    return _read([partition_path(y, directory) for y in list_dates(directory)], AGG_SCHEMA)
+
+def compact(base_dir=HISTORY_DIR, daily_keep=DAILY_KEEP, weekly_keep=WEEKLY_KEEP):
+    """
+    早于最近 daily_keep 个交易日的逐日分区并为周汇总，早于最近 weekly_keep 周的周汇总并为月汇总；
+    只合并已完整滑出保留范围的周期。返回 (新增周数, 新增月数)
+    """
+    weeks = months = 0
+    dates = list_dates(base_dir)
+    if len(dates) > daily_keep:
+        boundary = week_key(dates[-daily_keep])
+        old = [d for d in dates[:-daily_keep] if week_key(d) != boundary]
+        if old:
+            weeks = _merge_tier(_read([partition_path(d, base_dir) for d in old], DAY_SCHEMA),
+                                "weekly", week_key, base_dir)
+            for d in old:
+                os.remove(partition_path(d, base_dir))
+
+    weekly = read_tier("weekly", base_dir)
+    periods = sorted({week_key(d) for d in weekly["date"].unique()})
+    if len(periods) > weekly_keep:
+        # 周不跨月，周内第一个交易日所在的月即该周所属的月
+        boundary = month_key(periods[-weekly_keep])
+        rolled = weekly["date"].str[:8] + "01" < boundary
+        if rolled.any():
+            months = _merge_tier(weekly[rolled], "monthly", month_key, base_dir)
+            _write_tier(weekly[~rolled], "weekly", base_dir, set(weekly.loc[rolled, "date"].str[:4]))
+    return weeks, months
+
+def read_history(start=None, end=None, base_dir=HISTORY_DIR):
+    """
+    读取全部历史 (月汇总 + 周汇总 + 逐日)，列同 AGG_COLUMNS，逐日数据 days 为 1；
+    start / end 按周期内第一个交易日过滤
+    """
+    agg = _read([partition_path(y, tier_dir(tier, base_dir)) for tier in reversed(TIERS)
+                 for y in list_dates(tier_dir(tier, base_dir))], AGG_SCHEMA)
+    if start is not None:
+        agg = agg[agg["date"] >= start]
+    if end is not None:
+        agg = agg[agg["date"] <= end]
+    dates = [d for d in list_dates(base_dir) if (start is None or d >= start) and (end is None or d <= end)]
+    daily = _read([partition_path(d, base_dir) for d in dates], DAY_SCHEMA)
+    daily["end"] = daily["date"]
+    daily["days"] = np.int32(1)
+    df = _concat([agg, daily], AGG_COLUMNS)
+    df["days"] = df["days"].astype(np.int32)
+    return df
+
+def migrate_csv(csv_path=LEGACY_CSV, base_dir=HISTORY_DIR, overwrite=False):
+    """
+    一次性迁移: 把旧的 history_sector_sina.csv 按日期拆成分区文件
+    默认不覆盖已存在的分区 (以新存储为准)
+    """
+    if not os.path.exists(csv_path):
+        print(f"⚠️ 未找到 {csv_path}，无需迁移")
+        return 0
+    df = pd.read_csv(csv_path, dtype={"name": "category", "leader": "category", "pct": np.float32,
+                                      "amount": np.float32, "leader_pct": np.float32})
+    existing = set(list_dates(base_dir))
+    count = 0
+    for date_str, day_df in df.groupby("date", sort=True):
+        if date_str in existing and not overwrite:
+            continue
+        write_day(day_df, date_str, base_dir)
+        count += 1
+    print(f"✅ 已从 {csv_path} 迁移 {count} 个交易日至 {base_dir}")
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="行业板块历史数据存储")
+    sub = parser.add_subparsers(dest="cmd")
+    p_migrate = sub.add_parser("migrate", help="从旧 CSV 迁移到按日分区")
+    p_migrate.add_argument("--csv", default=LEGACY_CSV)
+    p_migrate.add_argument("--dir", default=HISTORY_DIR)
+    p_migrate.add_argument("--overwrite", action="store_true")
+    sub.add_parser("dates", help="列出已存储的日期")
+    p_compact = sub.add_parser("compact", help="较早的逐日分区并为周/月汇总")
+    p_compact.add_argument("--dir", default=HISTORY_DIR)
+    p_compact.add_argument("--daily-keep", type=int, default=DAILY_KEEP, help="保留逐日分区的交易日数")
+    p_compact.add_argument("--weekly-keep", type=int, default=WEEKLY_KEEP, help="保留周汇总的周数")
+    args = parser.parse_args()
+
+    if args.cmd == "migrate":
+        migrate_csv(args.csv, args.dir, args.overwrite)
+    elif args.cmd == "compact":
+        weeks, months = compact(args.dir, args.daily_keep, args.weekly_keep)
+        print(f"✅ 新增 {weeks} 个周汇总、{months} 个月汇总；现有逐日 {len(list_dates(args.dir))} 天、"
+              f"周汇总 {len(read_tier('weekly', args.dir))} 行、月汇总 {len(read_tier('monthly', args.dir))} 行")
+    elif args.cmd == "dates":
+        for d in list_dates():
+            print(d)
+    else:
+        parser.print_help()
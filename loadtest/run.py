@@ -0,0 +1,219 @@
+# 文件名: loadtest/run.py
+# 端到端压测: 启动本地行情替身服务 (loadtest/server.py)，把各接口地址指向它，
+# 按 N 倍于当前股票池的规模完整运行 早报 / 午间估值 / 复盘 的拉取、解析、写入与推送，
+# 输出每次运行的吞吐与 HTTP 延迟、运行耗时的分位数 (来自 run_metrics 记录)
+#   python loadtest/run.py                                      # 10x / 100x / 1000x，全部任务
+#   python loadtest/run.py --scale 10 --job noon --repeat 5
+#   python loadtest/run.py --latency 0.05 --jitter 0.3 --error-rate 0.02 --truncate-rate 0.01
+#   python loadtest/run.py --slow-rate 0.05 --slow 3 --only tencent       # 单个接口的长尾延迟 (验证对冲请求)
+#   python loadtest/run.py --output load.json                   # 结果另存为 JSON
+# 所有写入 (历史、快照、运行状态) 都在临时目录中进行，不影响仓库中的 data/
+import os
+import sys
+import io
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import contextlib
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import fixtures
+
+# 当前规模 (1x): 早报品种数、watchlist.json 股票数、行业板块数
+BASE_SIZES = {
+    "morning": 7,
+    "noon": 26,
+    "evening": 100,
+}
+SCALES = [10, 100, 1000]
+JOBS = list(BASE_SIZES)
+QUANTILES = (50, 90, 99)
+
+def start_server(args):
+    """
+    以子进程启动替身服务，返回 (进程, 基地址)
+    """
+    cmd = [sys.executable, os.path.join(HERE, "server.py"), "--port", "0",
+           "--latency", str(args.latency), "--jitter", str(args.jitter),
+           "--slow-rate", str(args.slow_rate), "--slow", str(args.slow), "--only", args.only,
+           "--error-rate", str(args.error_rate), "--truncate-rate", str(args.truncate_rate)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    port = proc.stdout.readline().strip()
+    if not port:
+        proc.kill()
+        raise RuntimeError("替身服务启动失败")
+    return proc, f"http://127.0.0.1:{port}"
+
+def point_at(base):
+    """
+    设置各接口地址的环境变量；需在导入 main / noon_valuation / evening_push / wechat_push 之前调用
+    """
+    os.environ["WESTOCK_SINA_HQ_URL"] = base + "/list={codes}"
+    os.environ["WESTOCK_TENCENT_URL"] = base + "/q={codes}"
+    os.environ["WESTOCK_SINA_SECTOR_URL"] = base + "/q/view/newSinaHy.php"
+    os.environ["WESTOCK_PUSH_URL"] = base + "/{key}.send"
+    os.environ["WESTOCK_METRICS"] = "1"
+
+def control(base, path, config=None):
+    data = None if config is None else json.dumps(config).encode()
+    with urllib.request.urlopen(base + path, data=data, timeout=10) as resp:
+        return json.loads(resp.read())
+
+def make_job(job, n, base):
+    """
+    返回 (条目数, 生成函数)；生成函数返回 (标题, 正文)
+    """
+    if job == "morning":
+        import main
+        targets = fixtures.sina_codes(n)
+        return len(targets), lambda: main.get_sina_data(targets)
+    if job == "noon":
+        import noon_valuation
+        import watchlist
+        index = watchlist.from_targets(fixtures.tencent_targets(n))
+        return len(index), lambda: noon_valuation.generate_report(index)
+    import evening_push
+    control(base, "/_config", {"sectors": n})
+    return n, evening_push.get_market_analysis
+
+def run_job(job, n, base, repeat, keys):
+    """
+    运行 repeat 次 (另有一次预热)，每次: 生成报告 + 推送给 keys 个 Key；返回 run_metrics 记录列表
+    """
+    import run_metrics
+    from wechat_push import push_to_wechat
+    size, generate = make_job(job, n, base)
+    runs = []
+    for i in range(repeat + 1):
+        # 每次用新的 Key，避免推送限速把等待时间算进来
+        keys_str = ",".join(f"SCTload{job}{n}x{i}k{k}" for k in range(keys))
+        run_metrics.start_run(job)
+        with contextlib.redirect_stdout(io.StringIO()):
+            title, content = generate()
+            if keys and title is not None:
+                with run_metrics.stage("push"):
+                    push_to_wechat(title, content, keys_str)
+        run = run_metrics.finish()
+        if i > 0:
+            run["size"] = size
+            runs.append(run)
+    return runs
+
+def summarize(runs):
+    """
+    一组运行 -> 吞吐与分位数: wall (每次运行)、各 HTTP 标签的单次请求延迟、推送延迟
+    """
+    from run_metrics import percentile
+    walls = [run["wall"] for run in runs]
+    http, failed = {}, {}
+    for run in runs:
+        for h in run["http"]:
+            http.setdefault(h["label"], []).append(h["latency"])
+            failed[h["label"]] = failed.get(h["label"], 0) + (not h["ok"])
+    pushes = [p["latency"] for run in runs for p in run["push"]]
+    size = runs[0]["size"]
+    median = percentile(walls, 50)
+
+    def dist(values):
+        out = {f"p{q}": percentile(values, q) for q in QUANTILES}
+        out["max"] = max(values) if values else float("nan")
+        out["n"] = len(values)
+        return out
+
+    counts = {}
+    for run in runs:
+        for key, value in run["counts"].items():
+            counts[key] = counts.get(key, 0) + value
+    return {
+        "size": size,
+        "runs": len(runs),
+        "items_per_s": size / median if median > 0 else None,
+        "wall_s": dist(walls),
+        "http_s": {label: dict(dist(values), failed=failed[label]) for label, values in http.items()},
+        "push_s": dist(pushes),
+        "counts": counts,
+    }
+
+def print_result(job, scale, result, file=sys.stderr):
+    w = result["wall_s"]
+    print(f"{job:<8} x{scale:<5} {result['size']:>7} 条  {result['items_per_s'] or 0:>10.0f} 条/s  "
+          f"运行 p50 {w['p50'] * 1e3:.1f} p90 {w['p90'] * 1e3:.1f} p99 {w['p99'] * 1e3:.1f} "
+          f"max {w['max'] * 1e3:.1f} ms", file=file)
+    for label, d in list(result["http_s"].items()) + [("push", result["push_s"])]:
+        if not d["n"]:
+            continue
+        fail = f"  失败 {d['failed']}" if d.get("failed") else ""
+        print(f"  {label:<12} {d['n']:>6} 次  p50 {d['p50'] * 1e3:.1f} p90 {d['p90'] * 1e3:.1f} "
+              f"p99 {d['p99'] * 1e3:.1f} max {d['max'] * 1e3:.1f} ms{fail}", file=file)
+
+def main():
+    parser = argparse.ArgumentParser(description="WeStockBot 端到端压测 (本地替身服务)")
+    parser.add_argument("--scale", type=int, action="append", help=f"规模倍数 (可多次指定，默认 {SCALES})")
+    parser.add_argument("--job", choices=JOBS, action="append", help="只测指定任务 (可多次指定)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--keys", type=int, default=1, help="每次推送的 Key 数 (0 不推送)")
+    parser.add_argument("--cache-ttl", type=float, default=0.0,
+                        help="行情网关缓存秒数 (默认 0: 每次运行都真正请求替身服务)")
+    parser.add_argument("--latency", type=float, default=0.0, help="替身服务固定延迟 (秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="替身服务额外随机延迟上限 (秒)")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="慢请求的比例")
+    parser.add_argument("--slow", type=float, default=0.0, help="慢请求额外延迟 (秒)")
+    parser.add_argument("--only", default="", help="只对这些接口注入故障 (逗号分隔)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 5xx 的比例")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="截断响应的比例")
+    parser.add_argument("--output", help="结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    scales = args.scale or SCALES
+    jobs = args.job or JOBS
+    proc, base = start_server(args)
+    workdir = tempfile.mkdtemp(prefix="westockbot_load_")
+    cwd = os.getcwd()
+    results = {}
+    try:
+        point_at(base)
+        os.environ["WESTOCK_QUOTE_TTL"] = str(args.cache_ttl)
+        os.environ["WESTOCK_METRICS_PATH"] = os.path.join(workdir, "runs.jsonl")
+        # 各任务的 data/ 路径都是相对路径
+        os.chdir(workdir)
+        for scale in scales:
+            for job in jobs:
+                runs = run_job(job, BASE_SIZES[job] * scale, base, args.repeat, args.keys)
+                result = summarize(runs)
+                results[f"{job}@{scale}x"] = result
+                print_result(job, scale, result)
+        server_stats = control(base, "/_stats")
+    finally:
+        os.chdir(cwd)
+        proc.terminate()
+        proc.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    out = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+            "keys": args.keys,
+            "cache_ttl": args.cache_ttl,
+            "faults": {"latency": args.latency, "jitter": args.jitter, "slow_rate": args.slow_rate,
+                       "slow": args.slow, "only": args.only,
+                       "error_rate": args.error_rate, "truncate_rate": args.truncate_rate},
+        },
+        "results": results,
+        "server": server_stats,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(out, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+if __name__ == "__main__":
+    main()
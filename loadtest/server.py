@@ -0,0 +1,240 @@
+# 文件名: loadtest/server.py
+# 本地行情替身服务: 按请求中的代码现场生成与线上字节兼容的响应 (GBK 编码、字段位置一致，见 benchmarks/fixtures.py)
+#   GET  /list=<代码,...>          hq.sinajs.cn          (var hq_str_xxx="...";)
+#   GET  /q=<代码,...>             qt.gtimg.cn           (v_xxx="...~...";)
+#   GET  /.../newSinaHy.php        新浪行业板块           (var S_Finance_bankuai_sinaindustry = {...})
+#   POST /<key>.send               Server酱 推送          ({"code": 0})
+#   GET  /_stats                   各接口请求数、故障数与字节数 (JSON)
+#   POST /_config                  运行中修改故障注入参数，body 为 JSON，如 {"error_rate": 0.1}
+#
+# 故障注入: 固定延迟 + 随机抖动、按比例的慢请求 (长尾)、按比例返回 5xx、
+# 按比例截断响应 (在任意字节处截断，Content-Length 与截断后一致)；均可按接口单独设置
+#   python loadtest/server.py --port 8900
+#   python loadtest/server.py --port 0 --latency 0.05 --jitter 0.2 --error-rate 0.02 --truncate-rate 0.01
+#   python loadtest/server.py --slow-rate 0.05 --slow 3 --only tencent   # 只让腾讯接口有 5% 的请求慢 3 秒
+# 启动后第一行输出实际监听的端口 (--port 0 时由系统分配)
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import fixtures
+
+SECTORS = 100               # 行业板块数 (可用 /_config 修改)
+ERROR_STATUS = 503          # 注入错误时返回的状态码
+MAX_REQUEST_LINE = 1 << 20  # 请求行上限 (标准库默认 64KB，放大规模后 Sina 的 URL 会超过)
+
+# 可在运行中修改的参数
+CONFIG_KEYS = ("latency", "jitter", "slow_rate", "slow", "error_rate", "error_status", "truncate_rate", "sectors", "only")
+
+class StandIn:
+    """
+    服务状态: 故障注入参数、随机数、统计与板块响应缓存 (所有处理线程共享)
+    """
+    def __init__(self, latency=0.0, jitter=0.0, slow_rate=0.0, slow=0.0, error_rate=0.0, truncate_rate=0.0,
+                 sectors=SECTORS, only="", seed=0):
+        self.config = {
+            "latency": latency,
+            "jitter": jitter,
+            "slow_rate": slow_rate,
+            "slow": slow,
+            "error_rate": error_rate,
+            "error_status": ERROR_STATUS,
+            "truncate_rate": truncate_rate,
+            "sectors": sectors,
+            "only": only,       # 逗号分隔的接口名 (sina_hq / tencent / sina_sector / push)，为空时故障注入作用于所有接口
+        }
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.stats = {}
+        self._sector_cache = {}
+
+    def update(self, values):
+        with self.lock:
+            for key in CONFIG_KEYS:
+                if key in values:
+                    self.config[key] = type(self.config[key])(values[key])
+            return dict(self.config)
+
+    def draw(self, endpoint):
+        """
+        本次请求的 (延迟秒数, 是否返回错误, 截断比例 或 None)
+        """
+        with self.lock:
+            c = self.config
+            if c["only"] and endpoint not in c["only"].split(","):
+                return 0.0, False, None
+            delay = c["latency"] + self.random.uniform(0, c["jitter"]) if c["jitter"] else c["latency"]
+            if self.random.random() < c["slow_rate"]:
+                delay += c["slow"]
+            fail = self.random.random() < c["error_rate"]
+            cut = self.random.random() if self.random.random() < c["truncate_rate"] else None
+        return delay, fail, cut
+
+    def record(self, endpoint, status, nbytes, truncated=False):
+        with self.lock:
+            s = self.stats.setdefault(endpoint, {"requests": 0, "errors": 0, "truncated": 0, "bytes": 0})
+            s["requests"] += 1
+            s["errors"] += status >= 400
+            s["truncated"] += truncated
+            s["bytes"] += nbytes
+
+    def sector_payload(self):
+        n = self.config["sectors"]
+        payload = self._sector_cache.get(n)
+        if payload is None:
+            payload = fixtures.sector_payload(n)
+            with self.lock:
+                self._sector_cache = {n: payload}
+        return payload
+
+# ================= 响应生成 =================
+# 每个代码的数值由代码本身决定 (同一代码每次请求结果相同)，与请求中的其他代码无关
+
+def _codes(path, prefix):
+    return [c for c in unquote(path[len(prefix):]).split(",") if c]
+
+def sina_body(codes):
+    out = []
+    for code in codes:
+        out.append(fixtures.sina_record(code, fixtures.sina_type(code), random.Random(code)))
+    return "".join(out).encode("gbk")
+
+def tencent_body(codes):
+    out = []
+    for code in codes:
+        if code.startswith(("sh", "sz", "r_hk", "hk", "us")):
+            out.append(fixtures.tencent_record(code, random.Random(code)))
+        else:
+            # 与线上一致: 无法识别的代码返回 v_pv_none_match
+            out.append('v_pv_none_match="1";\n')
+    return "".join(out).encode("gbk")
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive，与客户端的连接池配合
+    server_version = "StandIn/1.0"
+    disable_nagle_algorithm = True  # 响应头与正文分两次写出，不关 Nagle 会叠加客户端的延迟确认 (约 40ms)
+
+    def handle_one_request(self):
+        # 同标准库实现，只放大请求行长度上限
+        try:
+            self.raw_requestline = self.rfile.readline(MAX_REQUEST_LINE + 1)
+            if len(self.raw_requestline) > MAX_REQUEST_LINE:
+                self.requestline = self.request_version = self.command = ""
+                self.send_error(414)
+                return
+            if not self.raw_requestline:
+                self.close_connection = True
+                return
+            if not self.parse_request():
+                return
+            method = getattr(self, "do_" + self.command, None)
+            if method is None:
+                self.send_error(501, f"Unsupported method ({self.command!r})")
+                return
+            method()
+            self.wfile.flush()
+        except socket.timeout as e:
+            self.log_error("Request timed out: %r", e)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="text/plain; charset=GBK"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve(self, endpoint, make_body, content_type="application/javascript; charset=GBK"):
+        standin = self.server.standin
+        delay, fail, cut = standin.draw(endpoint)
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            status = standin.config["error_status"]
+            body = f"{status} injected".encode()
+            standin.record(endpoint, status, len(body))
+            self._send(status, body)
+            return
+        body = make_body()
+        if cut is not None:
+            body = body[:int(len(body) * cut)]
+        standin.record(endpoint, 200, len(body), cut is not None)
+        self._send(200, body, content_type)
+
+    def do_GET(self):
+        path = self.path
+        if path.startswith("/list="):
+            self._serve("sina_hq", lambda: sina_body(_codes(path, "/list=")))
+        elif path.startswith("/q="):
+            self._serve("tencent", lambda: tencent_body(_codes(path, "/q=")))
+        elif path.split("?")[0].endswith("newSinaHy.php"):
+            self._serve("sina_sector", self.server.standin.sector_payload)
+        elif path == "/_stats":
+            standin = self.server.standin
+            with standin.lock:
+                body = json.dumps({"config": standin.config, "stats": standin.stats})
+            self._send(200, body.encode(), "application/json")
+        else:
+            self._send(404, b"not found")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length) if length else b""
+        if self.path == "/_config":
+            try:
+                config = self.server.standin.update(json.loads(data or b"{}"))
+            except (ValueError, TypeError) as e:
+                self._send(400, str(e).encode())
+                return
+            self._send(200, json.dumps(config).encode(), "application/json")
+        elif self.path.endswith(".send"):
+            body = json.dumps({"code": 0, "message": "", "data": {}}).encode()
+            self._serve("push", lambda: body, "application/json")
+        else:
+            self._send(404, b"not found")
+
+def make_server(host="127.0.0.1", port=0, **config):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.request_queue_size = 256
+    server.standin = StandIn(**config)
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地行情替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900, help="0 表示由系统分配")
+    parser.add_argument("--latency", type=float, default=0.0, help="固定延迟 (秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外随机延迟上限 (秒)")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="慢请求的比例")
+    parser.add_argument("--slow", type=float, default=0.0, help="慢请求额外延迟 (秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 5xx 的比例")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="截断响应的比例")
+    parser.add_argument("--sectors", type=int, default=SECTORS, help="行业板块数")
+    parser.add_argument("--only", default="", help="只对这些接口注入故障 (逗号分隔，如 tencent,sina_hq)")
+    parser.add_argument("--seed", type=int, default=0, help="故障注入的随机种子")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                         slow_rate=args.slow_rate, slow=args.slow,
+                         error_rate=args.error_rate, truncate_rate=args.truncate_rate,
+                         sectors=args.sectors, only=args.only, seed=args.seed)
+    print(server.server_address[1], flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
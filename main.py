@@ -1,12 +1,13 @@
-import requests
-import re
 import datetime
-import os
+import run_metrics
+import run_state
+import quote_providers
+import quote_gateway
+from wechat_push import push_to_wechat
 
 # ================= 配置区域 =================
-# 读取 GitHub 的保密配置
-# 从环境变量获取 Key 字符串 (SCT_A,SCT_B,SCT_C)
-KEYS_STR = os.getenv("SERVERCHAN_KEY", "")
+# 推送 Key 由 wechat_push 从环境变量 SERVERCHAN_KEY 读取
+# 行情经由 quote_providers (多源对冲) 与 quote_gateway (分批、合并与缓存) 拉取，接口地址在 quote_gateway 中配置
 
 TARGETS = {
     "美股纳指": {"code": "gb_ixic", "type": "us"},
@@ -18,45 +19,35 @@ TARGETS = {
     "铜期货":   {"code": "hf_HG", "type": "future"},
 }
 
-def get_sina_data(targets):
-    codes = [item['code'] for item in targets.values()]
-    url = f"http://hq.sinajs.cn/list={','.join(codes)}"
-    headers = {"Referer": "https://finance.sina.com.cn/"}
+def get_sina_data(targets, dedup=False):
+    """
+    dedup=True 时，行情与上次成功推送时完全相同则不生成报告，返回 (None, None)
+    """
+    instruments = [quote_providers.from_sina(item['code'], item['type']) for item in targets.values()]
 
+    # Sina 为主，美股/港股指数超过延迟阈值时同时向腾讯请求，取先到的结果 (见 quote_providers.py)
     try:
-        resp = requests.get(url, headers=headers, timeout=5)
-        text = resp.text
+        with run_metrics.stage("fetch"):
+            quotes = quote_providers.fetch(instruments, quote_providers.PRICE_FIELDS)
     except Exception as e:
         return "获取失败", str(e)
+    run_metrics.count("records_parsed", len(quotes))
+
+    # 去重按解析后的数值比较，与实际由哪个行情源返回无关
+    if dedup and run_state.is_duplicate("morning", run_state.payload_hash(repr([quotes.get(i) for i in instruments]).encode())):
+        print("⏭️ 行情与上次推送时相同，跳过")
+        return None, None
 
     results = []
     main_title_info = ""
 
-    for name, config in targets.items():
-        pattern = f'var hq_str_{config["code"]}="(.*?)";'
-        match = re.search(pattern, text)
+    for (name, config), inst in zip(targets.items(), instruments):
+        quote = quotes.get(inst)
         
-        if match:
-            data_str = match.group(1)
-            parts = data_str.split(',')
+        if quote is not None:
             try:
-                price, change_pct = 0.0, 0.0
-                
-                # --- 解析逻辑 ---
-                if config['type'] == 'us':
-                    price = float(parts[1])
-                    change_pct = float(parts[2])
-                elif config['type'] == 'hk':
-                    price = float(parts[6])
-                    change_pct = float(parts[8])
-                elif config['type'] == 'future':
-                    price = float(parts[0])
-                    prev_close = float(parts[7])
-                    if prev_close > 0:
-                        change_pct = ((price - prev_close) / prev_close) * 100
-                elif config['type'] == 'fx':
-                    price = float(parts[1])
-                    change_pct = 0.0 
+                # --- 解析逻辑 (各行情源的字段位置见 quote_parser) ---
+                price, change_pct = quote["price"], quote["change_pct"]
 
                 # --- 图标逻辑 ---
                 if change_pct > 0:
@@ -81,8 +72,10 @@ def get_sina_data(targets):
                     
             except:
                 line = f"⚪ **{name}**: 解析出错"
+                run_metrics.count("records_dropped")
         else:
             line = f"⚪ **{name}**: 无数据"
+            run_metrics.count("records_dropped")
             
         results.append(line)
 
@@ -94,29 +87,21 @@ def get_sina_data(targets):
     
     return title, content
 
-def push_to_wechat(title, content):
-    if not KEYS_STR:
-        print("⚠️ 未配置 Key")
-        return
-    
-    # 【核心修改】分割 Key 并循环发送
-    keys = KEYS_STR.split(",")
-    for key in keys:
-        key = key.strip() # 去除可能误填的空格
-        if not key: continue
-        
-        url = f"https://sctapi.ftqq.com/{key}.send"
-        data = {"title": title, "desp": content}
-        try:
-            requests.post(url, data=data)
-            print(f"✅ 已推送给: ...{key[-4:]}")
-        except Exception as e:
-            print(f"❌ 推送失败 ({key[-4:]}): {e}")
+def run():
+    run_metrics.start_run("morning")
+    title, content = get_sina_data(TARGETS, dedup=True)
+    if title is not None:
+        print("--- 预览 ---")
+        print(title)
+        print(content)
+        print("-----------")
+        with run_metrics.stage("push"):
+            results = push_to_wechat(title, content)
+        # 推送成功后才记下本次内容，失败时下次运行仍会重试
+        if any(r["ok"] for r in results.values()):
+            run_state.commit("morning")
+    quote_gateway.save_stats()
+    run_metrics.finish()
 
 if __name__ == "__main__":
-    title, content = get_sina_data(TARGETS)
-    print("--- 预览 ---")
-    print(title)
-    print(content)
-    print("-----------")
-    push_to_wechat(title, content)
+    run()
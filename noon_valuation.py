@@ -1,431 +1,172 @@
-import pandas as pd
+# requests / numpy 等较重的依赖在用到时才导入，保证启动快
 import datetime
-import requests
-import os
-import re
+import time
+import argparse
+import run_metrics
+import watchlist
+import valuation_history
+import run_state
+import quote_gateway
+from wechat_push import push_to_wechat
+from quote_parser import QuoteColumns, parse_tencent
 
 # ================= 配置区域 =================
-KEYS_STR = os.getenv("SERVERCHAN_KEY", "")
+# 行情经由 quote_gateway 拉取: 分批大小自适应、并发请求合并、短时缓存，接口地址也在那里配置
+# 估值字段只有腾讯提供，单个请求超过延迟阈值时网关会向腾讯再发一次相同请求 (对冲)，取先到的响应
 
-# 股票池与估值规则配置
-# code: 股票代码 (A股直接写数字，港股加前缀 hk 或不加由逻辑判断，建议港股用 5位数字)
-# name: 名称
-# type: 'A' 或 'H'
-# rules: 列表，包含多个维度。
-#   - metric: 'pe_ttm' (市盈率TTM), 'pb' (市净率), 'dv_ratio' (股息率%)
-#   - buy: 买入阈值 (击球区)
-#   - sell: 卖出阈值 (出售区)
-#   - reverse: False (越小越好，如PE/PB), True (越大越好，如股息率)
+# 盯盘模式: 轮询间隔(秒) / 结束时间 / 最多推送次数
+WATCH_INTERVAL = 60
+WATCH_UNTIL = "15:00"
+WATCH_MAX_PUSHES = 20
 
-TARGETS = [
-    # =========================================
-    # 👑 皇冠明珠 (核心资产，定价权)
-    # =========================================
-    {
-        "code": "600519", "name": "贵州茅台", "type": "A",
-        "rules": [
-            # 股息率只有单向大小，buy=3.5 代表大于3.5是买点，sell设为 None 或一个极低值仅作参考
-            # 这里我们特殊处理：股息率不计算分位，只显示数值
-            {"metric": "pe_ttm", "buy": 25, "sell": 40, "reverse": False, "desc": "PE-TTM(极佳<20)"},
-            {"metric": "dv_ratio", "buy": 3.5, "sell": 1.5, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "000858", "name": "五粮液", "type": "A",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 16, "sell": 30, "reverse": False, "desc": "PE-TTM(极佳<13)"},
-            {"metric": "dv_ratio", "buy": 4.0, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "000333", "name": "美的集团", "type": "A",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 15, "sell": 22, "reverse": False, "desc": "PE-TTM(极佳<12)"},
-            {"metric": "dv_ratio", "buy": 5.0, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "600436", "name": "片仔癀", "type": "A",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 35, "sell": 65, "reverse": False, "desc": "PE-TTM(极佳<30)"},
-            {"metric": "dv_ratio", "buy": 2.5, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "600329", "name": "达仁堂", "type": "A",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 12, "sell": 28, "reverse": False, "desc": "PE-TTM(极佳<10)"},
-            {"metric": "dv_ratio", "buy": 3.0, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "300760", "name": "迈瑞医疗", "type": "A",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 22, "sell": 42, "reverse": False, "desc": "PE-TTM(极佳<18)"},
-            {"metric": "dv_ratio", "buy": 1.5, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "600660", "name": "福耀玻璃", "type": "A",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 16, "sell": 28, "reverse": False, "desc": "PE-TTM(极佳<13)"},
-            {"metric": "dv_ratio", "buy": 2.5, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "02328", "name": "中国财险(H)", "type": "H",
-        "rules": [
-            {"metric": "pb", "buy": 0.7, "sell": 1.2, "reverse": False, "desc": "PB"},
-            {"metric": "dv_ratio", "buy": 6.5, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "00700", "name": "腾讯控股(H)", "type": "H",
-        "rules": [
-            # 注: AkShare 返回的是标准 PE，非 Non-IFRS，需自行留意差异
-            {"metric": "pe_ttm", "buy": 18, "sell": 30, "reverse": False, "desc": "PE-TTM"}
-        ]
-    },
-    {
-        "code": "600900", "name": "长江电力", "type": "A",
-        "rules": [
-            # 股息率: >3.8买, <2.6卖
-            {"metric": "dv_ratio", "buy": 3.8, "sell": 2.6, "reverse": True, "desc": "股息率"}
-            # CSV 中提到股价 < 25，这里暂只监控股息率，可人工辅助看价格
-        ]
-    },
+# 每次拉取的行情写入当日记录文件 (见 tick_recorder.py)
+RECORD_TICKS = True
 
-    # =========================================
-    # 💰 现金奶牛 (高股息，低估值)
-    # =========================================
-    {
-        "code": "00883", "name": "中国海油(H)", "type": "H",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 7, "sell": None, "reverse": False, "desc": "PE-TTM"},
-            {"metric": "dv_ratio", "buy": 7.0, "sell": 5.5, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "03988", "name": "中国银行(H)", "type": "H",
-        "rules": [
-            {"metric": "pb", "buy": 0.4, "sell": 0.65, "reverse": False, "desc": "PB"},
-            {"metric": "dv_ratio", "buy": 8.0, "sell": 5.0, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "00939", "name": "建设银行(H)", "type": "H",
-        "rules": [
-            {"metric": "pb", "buy": 0.48, "sell": 0.70, "reverse": False, "desc": "PB"},
-            {"metric": "dv_ratio", "buy": 7.0, "sell": 4.5, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "00941", "name": "中国移动(H)", "type": "H",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 11, "sell": None, "reverse": False, "desc": "PE-TTM"},
-            {"metric": "dv_ratio", "buy": 6.5, "sell": 4.5, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "00874", "name": "白云山(H)", "type": "H",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 10, "sell": 15, "reverse": False, "desc": "PE-TTM"},
-            {"metric": "dv_ratio", "buy": 4.5, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "000651", "name": "格力电器", "type": "A",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 8, "sell": 12, "reverse": False, "desc": "PE-TTM"},
-            {"metric": "dv_ratio", "buy": 7.0, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "603288", "name": "海天味业", "type": "A",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 22, "sell": 42, "reverse": False, "desc": "PE-TTM(极佳<18)"}
-        ]
-    },
-    {
-        "code": "002027", "name": "分众传媒", "type": "A",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 14, "sell": 23, "reverse": False, "desc": "PE-TTM(极佳<11)"}
-        ]
-    },
+_QUOTES = QuoteColumns()
+_RECORDER = None
 
-    # =========================================
-    # 🦁 周期猎物 (底部埋伏，顶部逃顶)
-    # =========================================
-    {
-        "code": "01919", "name": "中远海控(H)", "type": "H",
-        "rules": [
-            {"metric": "pb", "buy": 0.7, "sell": 1.3, "reverse": False, "desc": "PB(运价底部)"},
-            {"metric": "dv_ratio", "buy": 8.0, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "601668", "name": "中国建筑", "type": "A",
-        "rules": [
-            {"metric": "pb", "buy": 0.55, "sell": 0.8, "reverse": False, "desc": "PB"},
-            {"metric": "pe_ttm", "buy": 5, "sell": None, "reverse": False, "desc": "PE-TTM"}
-        ]
-    },
-    {
-        "code": "01099", "name": "国药控股(H)", "type": "H",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 8, "sell": 14, "reverse": False, "desc": "PE-TTM"},
-            {"metric": "dv_ratio", "buy": 5.5, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "06030", "name": "中信证券(H)", "type": "H",
-        "rules": [
-            {"metric": "pb", "buy": 0.9, "sell": 1.7, "reverse": False, "desc": "PB(牛熊周期)"}
-        ]
-    },
-    {
-        "code": "600019", "name": "宝钢股份", "type": "A",
-        "rules": [
-            {"metric": "pb", "buy": 0.55, "sell": 0.9, "reverse": False, "desc": "PB"},
-            {"metric": "dv_ratio", "buy": 6.0, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    },
-    {
-        "code": "002714", "name": "牧原股份", "type": "A",
-        "rules": [
-            # 注: 周期股亏损时 PE 无意义或为负。这里配置仅作参考。
-            # CSV: PE < 10 (全行业巨亏), PE > 25 (暴利)
-            {"metric": "pe_ttm", "buy": 10, "sell": 25, "reverse": False, "desc": "PE-TTM(需结合周期)"}
-        ]
-    },
-    {
-        "code": "601088", "name": "中国神华", "type": "A",
-        "rules": [
-            # CSV 规则提到 H 股 PE < 8，这里监控 A 股股息和 PE
-            {"metric": "dv_ratio", "buy": 8.0, "sell": None, "reverse": True, "desc": "股息率"},
-            {"metric": "pe_ttm", "buy": None, "sell": 12, "reverse": False, "desc": "PE-TTM(卖出)"}
-        ]
-    },
-    {
-        "code": "601899", "name": "紫金矿业", "type": "A",
-        "rules": [
-            {"metric": "pe_ttm", "buy": 15, "sell": 30, "reverse": False, "desc": "PE-TTM"},
-            {"metric": "pb", "buy": None, "sell": 5.5, "reverse": False, "desc": "PB(卖出)"},
-            {"metric": "dv_ratio", "buy": 5.0, "sell": None, "reverse": True, "desc": "股息率"}
-        ]
-    }
-]
+# 股票池与估值规则在 watchlist.json 中配置 (见 watchlist.py)
 
-def get_realtime_data(targets):
-    data_map = {}
-    codes = []
-    
-    print(f"📡 正在精准拉取 {len(targets)} 只目标股票数据 (Tencent API)...")
+def fetch_quotes(index):
+    """
+    拉取股票池行情的原始响应 (bytes)，拉取失败时为空
+    """
+    print(f"📡 正在精准拉取 {len(index)} 只目标股票数据 (Tencent API)...")
     
-    # 1. 构造请求代码列表
-    for t in targets:
-        raw_code = t['code']
-        stype = t['type']
-        api_code = ""
-        if stype == 'A':
-            # 简单判断沪深: 6开头为沪市(sh), 其他为深市(sz)
-            if str(raw_code).startswith('6'):
-                api_code = f"sh{raw_code}"
-            else:
-                api_code = f"sz{raw_code}"
-        elif stype == 'H':
-            # 腾讯港股接口通常使用 r_hk 前缀获取更详细数据
-            api_code = f"r_hk{raw_code}"
-            
-        if api_code:
-            codes.append(api_code)
+    # 1. 请求代码列表 (编译索引时已算好)
+    codes = index.request_codes()
 
-    # 2. 分批请求 (避免 URL 过长)
-    chunk_size = 20
-    for i in range(0, len(codes), chunk_size):
-        chunk = codes[i:i+chunk_size]
-        url = f"http://qt.gtimg.cn/q={','.join(chunk)}"
-        
+    # 2. 经由行情网关拉取: 自适应分批并发、与其他请求合并、短时缓存，慢请求对冲，单批失败单独重试
+    #    返回的响应按代码顺序拼接，哈希与批次划分、完成先后无关
+    with run_metrics.stage("quotes"):
         try:
-            resp = requests.get(url, timeout=10)
-            # 腾讯接口通常返回 GBK 编码
-            text = resp.content.decode('gbk', errors='ignore')
-            
-            parts = text.split(';')
-            for part in parts:
-                if not part.strip() or '="' not in part:
-                    continue
-                
-                name_part, data_part = part.split('="')
-                data_str = data_part.strip('"')
-                fields = data_str.split('~')
-                
-                # 数据校验
-                if len(fields) < 30: continue
-                
-                # 解析代码和类型
-                # 腾讯接口返回的数据中，第3个字段(index 2)通常是代码
-                code_in_resp = fields[2]
-                
-                # 判断是 A 股还是 H 股 (根据 name_part 判断)
-                is_h_share = "hk" in name_part
-                
-                price = 0.0
-                pe = 0.0
-                pb = 0.0
-                dv = 0.0
-                
-                def parse_val(val):
-                    try:
-                        return float(val)
-                    except:
-                        return 0.0
-
-                if is_h_share:
-                    # H股映射:
-                    # Price: 3
-                    # PE-TTM: 57
-                    # PB: 58
-                    # DivYield: 47
-                    if len(fields) > 58:
-                        price = parse_val(fields[3])
-                        pe = parse_val(fields[57])
-                        pb = parse_val(fields[58])
-                        dv = parse_val(fields[47])
-                else:
-                    # A股映射:
-                    # Price: 3
-                    # PE-TTM: 39 (动态PE/TTM)
-                    # PB: 46
-                    # DivYield: 64 (滚动股息率TTM)
-                    if len(fields) > 64:
-                        price = parse_val(fields[3])
-                        pe = parse_val(fields[39])
-                        pb = parse_val(fields[46])
-                        dv = parse_val(fields[64])
-                
-                data_map[code_in_resp] = {
-                    'price': price,
-                    'pe_ttm': pe,
-                    'pb': pb,
-                    'dv_ratio': dv
-                }
-                
+            return quote_gateway.fetch("tencent", codes) if codes else b""
         except Exception as e:
-            print(f"❌ 数据拉取异常: {e}")
-            
-    return data_map
+            print(f"❌ 数据拉取异常 ({len(codes)} 只): {e}")
+            return b""
+
+def parse_quotes(index, raw):
+    """
+    解析原始响应，返回 [股票数, 指标数] 矩阵 (列顺序同 rule_engine.METRICS)，未取到的股票整行为 NaN
+    """
+    quotes = _QUOTES
+    quotes.reset()
+    # 腾讯接口返回 GBK 编码，交给 quote_parser 直接解析原始字节
+    with run_metrics.stage("parse"):
+        parse_tencent(raw, quotes)
+    run_metrics.count("records_parsed", len(quotes))
+    run_metrics.count("records_dropped", len(index.request_codes()) - len(quotes))
+    # 3. 按 代码 -> 行号 直接落入矩阵
+    return index.values_from_quotes(quotes)
 
-def calculate_percentile(current, buy, sell, reverse=False):
+def get_realtime_data(index):
     """
-    计算分位值 (0% = 买入点, 100% = 卖出点)
+    拉取并解析股票池行情 (盯盘模式每轮调用)
     """
-    if current is None or buy is None or sell is None:
-        return None
+    return parse_quotes(index, fetch_quotes(index))
+
+def record_ticks(index, values):
+    """
+    把一轮行情追加到当日的行情记录文件；跨日或股票池变化时换一个记录器
+    """
+    global _RECORDER
+    if not RECORD_TICKS:
+        return
+    import tick_recorder
+    today = datetime.date.today().isoformat()
+    if _RECORDER is None or _RECORDER.date_str != today or _RECORDER.codes != index.codes:
+        if _RECORDER is not None:
+            _RECORDER.close()
+        _RECORDER = tick_recorder.TickRecorder(index.codes, today)
+    with run_metrics.stage("ticks"):
+        run_metrics.count("ticks_written", _RECORDER.append(values))
+
+def render_rule(rule, icon, current_val, pct, hist=""):
+    """
+    渲染单条规则 (状态与分位已由规则引擎算好)；hist 为自身历史分位文本，有则附在行尾
+    """
+    line = _render_threshold(rule, icon, current_val, pct)
+    if hist:
+        line += f" | 历史 {hist}"
+    return line
+
+def _render_threshold(rule, icon, current_val, pct):
+    desc = rule['desc']
+    buy = rule['buy']
+    sell = rule['sell']
+    reverse = rule['reverse']
     
-    try:
-        current = float(current)
-        buy = float(buy)
-        sell = float(sell)
-        
-        if reverse:
-            # 反向指标 (如股息率)：越大越好
-            # 0% 分位对应 Buy (高股息), 100% 分位对应 Sell (低股息)
-            if buy == sell: return 0
-            pct = (buy - current) / (buy - sell) * 100
-        else:
-            # 正向指标 (如PE)：越小越好
-            # 0% 分位对应 Buy (低PE), 100% 分位对应 Sell (高PE)
-            if sell == buy: return 0
-            pct = (current - buy) / (sell - buy) * 100
-            
-        return pct
-    except:
-        return None
+    # 格式化当前值
+    val_str = f"{current_val}"
+    if rule['metric'] == 'dv_ratio': val_str += "%"
+    
+    # 情况 1: 完整区间 -> 显示分位
+    if buy is not None and sell is not None:
+        if pct == pct:
+            range_str = f"{buy}-{sell}"
+            return f"• {icon} {desc}: {range_str} | 当前 **{pct:.0f}%** 分位 ({val_str})"
+        return f"• ⚪ {desc}: 计算出错 ({val_str})"
+    
+    # 情况 2: 只有买入阈值 (缺卖出)
+    if buy is not None:
+        op = ">" if reverse else "<"
+        return f"• {icon} {desc}: {op}{buy} | 当前 {val_str}"
+    
+    # 情况 3: 只有卖出阈值 (缺买入)
+    if sell is not None:
+        op = "<" if reverse else ">"
+        return f"• {icon} {desc}: {op}{sell} | 当前 {val_str}"
+    
+    # 情况 4: 兜底 (不应该出现)
+    return f"• ⚪ {desc}: 规则不完整 ({val_str})"
 
-def generate_report():
-    data_map = get_realtime_data(TARGETS)
+def generate_report(index=None, dedup=False):
+    """
+    dedup=True 时行情与上次成功推送完全相同则返回 (None, None)，不记录、不写历史
+    """
+    import numpy as np
+    import rule_engine
+    index = index or watchlist.load()
+    raw = fetch_quotes(index)
+    # 与上次推送时的原始响应相同则不解析
+    if dedup and run_state.is_duplicate("noon", run_state.payload_hash(raw)):
+        print("⏭️ 行情与上次推送时相同，跳过")
+        return None, None
+    values = parse_quotes(index, raw)
+    record_ticks(index, values)
     lines = []
     
     # 添加图例说明
     lines.append("图例: 🔥极低估值 | ✅低估 | ⚖️合理 | ⚠️风险 | 🔴高估")
     lines.append("-" * 30)
     
-    for item in TARGETS:
-        code = item['code']
-        name = item['name']
-        real_data = data_map.get(code)
-        
-        if not real_data:
+    # 所有 股票×规则 一次向量化计算
+    with run_metrics.stage("evaluate"):
+        ruleset = index.ruleset
+        current, pcts, status = ruleset.evaluate(values)
+        current = current.tolist()
+        pcts = pcts.tolist()
+        status = status.tolist()
+        missing = np.isnan(values).all(axis=1).tolist()
+        prices = values[:, rule_engine.METRIC_INDEX["price"]].tolist()
+    
+    # 记录今日快照，并查询各指标在自身 3/5/10 年历史中的分位
+    with run_metrics.stage("history"):
+        history = valuation_history.record(datetime.date.today().isoformat(), index.codes, values)
+    
+    for i, name in enumerate(index.names):
+        if missing[i]:
             lines.append(f"⚪ **{name}**: 数据缺失")
             continue
             
-        item_lines = [f"**{name}** (¥{real_data['price']})"]
+        item_lines = [f"**{name}** (¥{prices[i]})"]
         
-        for rule in item['rules']:
-            metric_key = rule['metric']
-            desc = rule['desc']
-            buy = rule['buy']
-            sell = rule['sell']
-            reverse = rule['reverse']
-            
-            current_val = real_data.get(metric_key)
-            
-            # 格式化当前值
-            val_str = f"{current_val}"
-            if metric_key == 'dv_ratio': val_str += "%"
-            
-            # 情况 1: 完整区间 -> 计算分位
-            if buy is not None and sell is not None:
-                pct = calculate_percentile(current_val, buy, sell, reverse)
-                if pct is not None:
-                    # 判断状态图标
-                    if pct < 0: icon = "🔥" # 极度低估 (击球区)
-                    elif pct < 20: icon = "✅" # 低估
-                    elif pct > 80: icon = "⚠️" # 风险
-                    elif pct > 100: icon = "🔴" # 高估
-                    else: icon = "⚖️" # 合理
-                    
-                    range_str = f"{buy}-{sell}"
-                    item_lines.append(f"• {icon} {desc}: {range_str} | 当前 **{pct:.0f}%** 分位 ({val_str})")
-                else:
-                    item_lines.append(f"• ⚪ {desc}: 计算出错 ({val_str})")
-                continue
-
-            # 情况 2: 只有买入阈值 (缺卖出)
-            if buy is not None and sell is None:
-                # 判断是否满足买入
-                # Reverse(股息): 越大越好 -> Current >= Buy
-                # Normal(PE): 越小越好 -> Current <= Buy
-                try:
-                    is_buy = (reverse and float(current_val) >= float(buy)) or \
-                             (not reverse and float(current_val) <= float(buy))
-                except:
-                    is_buy = False
-                    
-                icon = "✅" if is_buy else "🔸"
-                op = ">" if reverse else "<"
-                item_lines.append(f"• {icon} {desc}: {op}{buy} | 当前 {val_str}")
-                continue
-
-            # 情况 3: 只有卖出阈值 (缺买入)
-            if sell is not None and buy is None:
-                # 判断是否满足卖出
-                # Reverse(股息): 越大越好 -> Current <= Sell (股息太低，卖出)
-                # Normal(PE): 越小越好 -> Current >= Sell (PE太高，卖出)
-                try:
-                    is_sell = (reverse and float(current_val) <= float(sell)) or \
-                              (not reverse and float(current_val) >= float(sell))
-                except:
-                    is_sell = False
-                    
-                icon = "⚠️" if is_sell else "⚖️"
-                op = "<" if reverse else ">"
-                item_lines.append(f"• {icon} {desc}: {op}{sell} | 当前 {val_str}")
-                continue
-
-            # 情况 4: 兜底 (不应该出现)
-            item_lines.append(f"• ⚪ {desc}: 规则不完整 ({val_str})")
+        for r in range(ruleset.rule_start[i], ruleset.rule_start[i + 1]):
+            rule = ruleset.rules[r]
+            icon = rule_engine.ICONS[status[r]]
+            hist = valuation_history.format_percentiles(
+                history.percentiles(index.codes[i], rule['metric'], current[r]))
+            item_lines.append(render_rule(rule, icon, current[r], pcts[r], hist))
         
         lines.append("\n".join(item_lines))
         lines.append("") # 空行分隔
@@ -434,22 +175,100 @@ def generate_report():
     content = "\n".join(lines)
     return title, content
 
-def push_to_wechat(title, content):
-    if not KEYS_STR: 
-        print("⚠️ 未配置 Key")
+def parse_until(until):
+    hour, minute = map(int, until.split(":"))
+    return datetime.datetime.now().replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+def watch(interval=WATCH_INTERVAL, until=WATCH_UNTIL, max_pushes=WATCH_MAX_PUSHES, index=None):
+    """
+    盘中盯盘: 按固定间隔轮询行情，在内存中保存每条规则的上一次状态，
+    只有状态跨档 (如 ✅→🔥、⚖️→⚠️) 时才推送。每轮只重算行情有变化的股票
+    """
+    import numpy as np
+    import rule_engine
+    index = index or watchlist.load()
+    ruleset = index.ruleset
+    values = np.full((len(index), len(rule_engine.METRICS)), np.nan)
+    status = np.full(len(ruleset), -1, dtype=np.int8)  # -1: 尚无状态
+    end_time = parse_until(until)
+    pushes = 0
+    ticks = 0
+    
+    print(f"👀 盯盘模式: 每 {interval}s 轮询，至 {until} 结束，最多推送 {max_pushes} 次")
+    while datetime.datetime.now() < end_time:
+        tick_start = time.monotonic()
+        ticks += 1
+        new_values = get_realtime_data(index)
+        record_ticks(index, new_values)
+        
+        # 有新数据且与上一轮不同的股票；本轮拉取失败的股票保留上次的行情
+        has_data = ~np.isnan(new_values).all(axis=1)
+        same = (new_values == values) | (np.isnan(new_values) & np.isnan(values))
+        changed = np.flatnonzero(has_data & ~same.all(axis=1))
+        
+        if changed.size:
+            values[changed] = new_values[changed]
+            rules = ruleset.rules_of(changed)
+            current, _, new_status = ruleset.evaluate(values, rules)
+            old_status = status[rules]
+            status[rules] = new_status
+            
+            # 跨档: 首轮只建立基准，不推送
+            crossed = np.flatnonzero((old_status >= 0) & (old_status != new_status))
+            if crossed.size:
+                lines = []
+                for k in crossed:
+                    r = rules[k]
+                    name = index.names[ruleset.target_idx[r]]
+                    rule = ruleset.rules[r]
+                    old_icon = rule_engine.ICONS[old_status[k]]
+                    new_icon = rule_engine.ICONS[new_status[k]]
+                    lines.append(f"• **{name}** {rule['desc']}: {old_icon}→{new_icon} (当前 {current[k]})")
+                title = f"估值异动: {len(lines)} 项 " + datetime.datetime.now().strftime("%H:%M")
+                content = "\n\n".join(lines)
+                print(title)
+                print(content)
+                if pushes < max_pushes:
+                    push_to_wechat(title, content)
+                    pushes += 1
+                else:
+                    print("⚠️ 已达推送上限，本次只打印")
+        
+        elapsed = time.monotonic() - tick_start
+        print(f"⏱️ 第 {ticks} 轮: {changed.size} 只有变化，耗时 {elapsed:.2f}s")
+        time.sleep(max(0.0, interval - elapsed))
+    
+    print(f"🏁 盯盘结束: 共 {ticks} 轮，推送 {pushes} 次")
+
+def add_arguments(parser):
+    parser.add_argument("--watch", action="store_true", help="盘中盯盘模式，状态跨档时推送")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="轮询间隔 (秒)")
+    parser.add_argument("--until", default=WATCH_UNTIL, help="盯盘结束时间 HH:MM")
+    parser.add_argument("--max-pushes", type=int, default=WATCH_MAX_PUSHES, help="盯盘期间最多推送次数")
+
+def run(args):
+    # 休市日不拉取、不记录、不推送
+    if not run_state.should_run_today("noon"):
         return
-    keys = KEYS_STR.split(",")
-    for key in keys:
-        key = key.strip()
-        if not key: continue
-        url = f"https://sctapi.ftqq.com/{key}.send"
-        requests.post(url, data={"title": title, "desp": content})
-        print(f"✅ 推送给 ...{key[-4:]}")
+    if args.watch:
+        run_metrics.start_run("noon_watch")
+        watch(args.interval, args.until, args.max_pushes)
+    else:
+        run_metrics.start_run("noon")
+        title, content = generate_report(dedup=True)
+        if title is not None:
+            print("----------------")
+            print(title)
+            print(content)
+            print("----------------")
+            with run_metrics.stage("push"):
+                results = push_to_wechat(title, content)
+            if any(r["ok"] for r in results.values()):
+                run_state.commit("noon")
+    quote_gateway.save_stats()
+    run_metrics.finish()
 
 if __name__ == "__main__":
-    title, content = generate_report()
-    print("----------------")
-    print(title)
-    print(content)
-    print("----------------")
-    push_to_wechat(title, content)
+    parser = argparse.ArgumentParser(description="午间估值雷达")
+    add_arguments(parser)
+    run(parser.parse_args())
@@ -0,0 +1,562 @@
+# 文件名: quote_gateway.py
+# 行情网关: 各任务统一从这里拉取 Sina / 腾讯行情，返回与原接口字节兼容的响应 (各代码的记录按请求顺序拼接)
+#   - 分批: 每批代码数按 URL 长度上限与响应耗时自适应 (耗时低于目标时逐步加大，超时或失败时减半)
+#   - 合并: 并发请求中重叠的代码只拉取一次，后到的请求等待先到的结果
+#   - 缓存: 每个代码的记录在内存中保留 CACHE_TTL 秒，期间重复请求直接返回
+#   - 对冲: 单个请求超过该接口延迟 p90 仍未返回时再发一个相同请求，取先成功的响应 (出错只按退避重试，不对冲)；
+#     各接口的延迟直方图每次运行结束时衰减后写入 data/quote_latency.json (不入库，CI 中由 Actions 缓存在定时任务之间延续)
+#
+# 默认在进程内运行；也可以作为本地常驻服务，让多个任务 / 进程共用一份合并与缓存:
+#   python quote_gateway.py serve --port 8901
+#   WESTOCK_QUOTE_GATEWAY=http://127.0.0.1:8901 python westockbot.py noon
+#   python quote_gateway.py fetch tencent sh600519 r_hk00700    # 调试: 打印拼接后的响应
+#   python quote_gateway.py stats                                # 各接口的延迟分位与对冲阈值
+# 常驻服务不可用时自动退回进程内拉取
+import os
+import re
+import sys
+import json
+import time
+import bisect
+import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import run_metrics
+
+# 行情接口地址，可用环境变量指向本地替身服务 (见 loadtest/)
+SINA_HQ_URL = os.getenv("WESTOCK_SINA_HQ_URL", "http://hq.sinajs.cn/list={codes}")
+TENCENT_URL = os.getenv("WESTOCK_TENCENT_URL", "http://qt.gtimg.cn/q={codes}")
+# 常驻网关地址 (为空时在进程内拉取)
+GATEWAY_URL = os.getenv("WESTOCK_QUOTE_GATEWAY", "")
+
+CACHE_TTL = float(os.getenv("WESTOCK_QUOTE_TTL", "3"))   # 单个代码记录的缓存秒数 (0 不缓存)
+MAX_URL_LEN = 2000       # 单个请求 URL 的长度上限
+MIN_BATCH = 5            # 自适应批大小的下限 / 上限 / 每次加大的步长
+MAX_BATCH = 500
+BATCH_STEP = 5
+TARGET_LATENCY = 0.5     # 单批响应耗时目标 (秒)，超过时批大小减半
+MAX_WORKERS = 8          # 并发批数 (同时也是连接池大小)
+RETRIES = 2              # 单批失败后的重试次数
+RETRY_BACKOFF = 0.5      # 重试退避基数 (秒)
+
+STATS_PATH = os.path.join("data", "quote_latency.json")
+HEDGE_QUANTILE = 90      # 对冲阈值取该接口延迟的分位 (约 10% 的请求会多发一次)
+HEDGE_AFTER = 1.0        # 样本不足时的对冲阈值 (秒)
+MIN_HEDGE_AFTER = 0.05   # 对冲阈值上下限 (秒)
+MAX_HEDGE_AFTER = 3.0
+MIN_SAMPLES = 10         # 直方图样本数达到后才用于定阈值
+DECAY = 0.95             # 每次运行结束写入前的衰减系数，近期的延迟占主导
+HEDGE_WORKERS = 8        # 跨行情源对冲的并发数 (见 quote_providers.py)
+
+# 延迟直方图分桶上界: 1ms 起每 2 倍分 4 个桶，约到 65s
+BUCKET_BOUNDS = [0.001 * 2 ** (k / 4) for k in range(65)]
+
+# 各接口: 地址、请求头、超时、起始批大小、run_metrics 标签，以及从响应中切出单个代码记录的正则
+SOURCES = {
+    "sina": {
+        "url": SINA_HQ_URL,
+        "headers": {"Referer": "https://finance.sina.com.cn/"},
+        "timeout": 5,
+        "batch": 50,
+        "label": "sina_hq",
+        "record": re.compile(rb'var hq_str_([^=\s]+)="[^"]*";\s*'),
+    },
+    "tencent": {
+        "url": TENCENT_URL,
+        "headers": {},
+        "timeout": 10,
+        "batch": 20,
+        "label": "tencent",
+        "record": re.compile(rb'v_([^=\s]+)="[^"]*";\s*'),
+    },
+}
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+_GATEWAYS = {}
+_LOCK = threading.Lock()
+
+def get_session():
+    """
+    进程内共享的 HTTP 会话 (keep-alive 连接池，大小与并发数一致，每批最多同时有一个对冲请求)
+    """
+    global _SESSION
+    # 各批的请求线程同时首次调用时只建一个会话
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=2 * MAX_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSION = session
+        return _SESSION
+
+def split_records(pattern, raw):
+    """
+    把响应切成 {代码: 完整记录(bytes)}；被截断等不完整的记录不会匹配
+    """
+    return {m.group(1).decode("ascii", errors="ignore"): m.group(0) for m in pattern.finditer(raw)}
+
+# ================= 延迟统计 =================
+
+class LatencyHistogram:
+    """
+    对数分桶的延迟直方图 (计数为浮点数，便于衰减)
+    """
+    def __init__(self, counts=None):
+        self.counts = list(counts or [0.0] * len(BUCKET_BOUNDS))
+
+    def add(self, latency):
+        self.counts[min(bisect.bisect_left(BUCKET_BOUNDS, latency), len(BUCKET_BOUNDS) - 1)] += 1
+
+    def total(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        """
+        q 取 0-100，返回所在桶的上界 (没有样本时为 None)
+        """
+        total = self.total()
+        if total <= 0:
+            return None
+        target = total * q / 100
+        acc = 0.0
+        for bound, count in zip(BUCKET_BOUNDS, self.counts):
+            acc += count
+            if acc >= target:
+                return bound
+        return BUCKET_BOUNDS[-1]
+
+    def decay(self, factor):
+        self.counts = [c * factor for c in self.counts]
+
+_HISTOGRAMS = None
+
+def histograms():
+    """
+    {名称: LatencyHistogram}，首次使用时从 STATS_PATH 读入上次运行留下的统计
+    """
+    global _HISTOGRAMS
+    with _LOCK:
+        if _HISTOGRAMS is None:
+            _HISTOGRAMS = {}
+            try:
+                with open(STATS_PATH, encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (OSError, ValueError):
+                saved = {}
+            for name, counts in saved.get("histograms", {}).items():
+                if len(counts) == len(BUCKET_BOUNDS):
+                    _HISTOGRAMS[name] = LatencyHistogram(counts)
+        return _HISTOGRAMS
+
+def record_latency(name, latency):
+    hists = histograms()
+    with _LOCK:
+        hists.setdefault(name, LatencyHistogram()).add(latency)
+
+def latency_quantile(name, q):
+    """
+    样本不足 MIN_SAMPLES 时返回 None
+    """
+    hist = histograms().get(name)
+    if hist is None or hist.total() < MIN_SAMPLES:
+        return None
+    return hist.quantile(q)
+
+def hedge_after(name):
+    """
+    对冲阈值 (秒): 延迟的 HEDGE_QUANTILE 分位，限制在 [MIN_HEDGE_AFTER, MAX_HEDGE_AFTER]
+    """
+    latency = latency_quantile(name, HEDGE_QUANTILE)
+    if latency is None:
+        return HEDGE_AFTER
+    return min(max(latency, MIN_HEDGE_AFTER), MAX_HEDGE_AFTER)
+
+def save_stats(path=None):
+    """
+    衰减后写入延迟直方图 (各任务运行结束时调用；本次运行没有请求过行情时不写)
+    """
+    if _HISTOGRAMS is None:
+        return
+    path = path or STATS_PATH
+    with _LOCK:
+        for hist in _HISTOGRAMS.values():
+            hist.decay(DECAY)
+        data = {"histograms": {name: [round(c, 4) for c in hist.counts] for name, hist in sorted(_HISTOGRAMS.items())}}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def status_lines():
+    lines = []
+    for name, hist in sorted(histograms().items()):
+        total = hist.total()
+        qs = " ".join(f"p{q} {hist.quantile(q) * 1e3:.0f}ms" for q in (50, 90, 99)) if total else "-"
+        lines.append(f"{name:<16} 样本 {total:>8.1f}  {qs}  对冲阈值 {hedge_after(name) * 1e3:.0f}ms")
+    return lines or ["尚无延迟记录"]
+
+# ================= 对冲请求 =================
+
+_POOLS = {}
+
+def _pool(name, workers):
+    with _LOCK:
+        pool = _POOLS.get(name)
+        if pool is None:
+            pool = _POOLS[name] = ThreadPoolExecutor(max_workers=workers)
+        return pool
+
+def _timed(name, fn):
+    start = time.perf_counter()
+    try:
+        value, ok = fn()
+        err = None
+    except Exception as e:
+        value, ok, err = {}, False, e
+    record_latency(name, time.perf_counter() - start)
+    return value, ok, err
+
+def hedged(calls, keys, threshold, pool=None, on_incomplete=True):
+    """
+    calls 为 [(名称, 覆盖的键集合, 函数)]，函数返回 ({键: 值}, 是否完整: 无失败且覆盖的键都取到了值)，耗时按名称记入延迟直方图
+    先调用第一个；threshold 秒内未返回时再调用下一个 (只对冲一次)
+    on_incomplete=True 时先返回的调用不完整 (失败或部分缺失) 也立即调用下一个；
+    为 False 时只在慢时对冲，失败交给调用方自己的重试 (避免接口大面积出错时请求量翻倍)
+    各键取最先返回的值；完整返回的调用所覆盖的键即视为已有结论，所有键都有结论时立即返回，不等较慢的调用
+    返回 ({键: 值}, 胜出的调用名称)；所有调用都抛出异常时抛出最后一个
+    """
+    pool = pool or _pool("hedge", HEDGE_WORKERS)
+    keys = set(keys)
+    result, settled = {}, set()
+    pending = {}
+    launched = 0
+    winner = None
+    last_err = None
+
+    def launch():
+        nonlocal launched
+        name, _, fn = calls[launched]
+        pending[pool.submit(_timed, name, fn)] = launched
+        launched += 1
+
+    launch()
+    start = time.perf_counter()
+    while pending:
+        timeout = None
+        if launched < len(calls):
+            timeout = max(0.0, threshold - (time.perf_counter() - start))
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            run_metrics.count("hedged")
+            launch()
+            continue
+        for future in done:
+            i = pending.pop(future)
+            value, ok, err = future.result()
+            if err is not None:
+                last_err = err
+            for key, val in value.items():
+                result.setdefault(key, val)
+            if ok:
+                settled |= calls[i][1]
+                if winner is None:
+                    winner = i
+        if keys <= settled:
+            break
+        if on_incomplete and launched < len(calls):
+            # 先发出的调用已返回但不完整 (失败或部分批次失败)，不必等到阈值
+            run_metrics.count("hedged")
+            launch()
+    if winner is None and not result and last_err is not None:
+        raise last_err
+    if winner:
+        run_metrics.count("hedge_won")
+    return result, None if winner is None else calls[winner][0]
+
+class Gateway:
+    """
+    单个接口的网关: 自适应分批、并发合并、短时缓存与对冲请求 (线程安全)
+    """
+    def __init__(self, source, ttl=None):
+        conf = SOURCES[source]
+        self.source = source
+        self.url = conf["url"]
+        self.headers = conf["headers"]
+        self.timeout = conf["timeout"]
+        self.label = conf["label"]
+        self.pattern = conf["record"]
+        self.ttl = CACHE_TTL if ttl is None else ttl
+        self.batch_size = conf["batch"]
+        self.lock = threading.Lock()
+        self.cache = {}        # 代码 -> (过期时刻, 记录)
+        self.inflight = {}     # 代码 -> 所在批次的 Future (正在拉取)
+        self.stats = {"requests": 0, "failed": 0, "codes": 0, "cache_hits": 0, "coalesced": 0}
+        self._pool = None
+
+    def plan(self, codes):
+        """
+        按当前批大小与 URL 长度上限切分代码
+        """
+        size = self.batch_size
+        base = len(self.url.format(codes=""))
+        batches, cur, length = [], [], base
+        for code in codes:
+            extra = len(code) + (1 if cur else 0)
+            if cur and (len(cur) >= size or length + extra > MAX_URL_LEN):
+                batches.append(cur)
+                cur, length, extra = [], base, len(code)
+            cur.append(code)
+            length += extra
+        if cur:
+            batches.append(cur)
+        return batches
+
+    def adapt(self, latency, ok):
+        with self.lock:
+            if ok and latency <= TARGET_LATENCY:
+                self.batch_size = min(self.batch_size + BATCH_STEP, MAX_BATCH)
+            else:
+                self.batch_size = max(MIN_BATCH, self.batch_size // 2)
+
+    def request(self, batch):
+        """
+        拉取一批代码的原始响应，失败时只重试这一批 (指数退避)，重试耗尽后抛出最后一次异常
+        """
+        url = self.url.format(codes=",".join(batch))
+        last_err = None
+        for attempt in range(RETRIES + 1):
+            try:
+                content, latency = self.get(url)
+                self.adapt(latency, True)
+                return content
+            except Exception as e:
+                self.adapt(0.0, False)
+                last_err = e
+                if attempt < RETRIES:
+                    time.sleep(RETRY_BACKOFF * (2 ** attempt))
+        raise last_err
+
+    def get(self, url):
+        """
+        GET 一次；超过该接口的对冲阈值仍未返回时再发一个相同的请求，取先成功的响应
+        出错不对冲，直接抛出由 request 按退避重试
+        返回 (响应内容, 该响应自身的耗时)：对冲胜出说明只是个别慢请求，批大小按胜出请求的耗时调整
+        """
+        def call():
+            start = time.perf_counter()
+            try:
+                resp = get_session().get(url, headers=self.headers, timeout=self.timeout)
+                resp.raise_for_status()
+            except Exception:
+                run_metrics.http(self.label, time.perf_counter() - start, ok=False)
+                raise
+            latency = time.perf_counter() - start
+            run_metrics.http(self.label, latency, len(resp.content))
+            return {"body": (resp.content, latency)}, True
+
+        calls = [(self.label, {"body"}, call)] * 2
+        result, _ = hedged(calls, ["body"], hedge_after(self.label), _pool("get", 2 * MAX_WORKERS), on_incomplete=False)
+        return result["body"]
+
+    def _run_batch(self, job):
+        """
+        拉取一批，把 ({代码: 记录}, 异常) 交给这一批的 Future (等待其中任一代码的请求共用)；返回异常 (成功时为 None)
+        """
+        batch, future = job
+        try:
+            records = split_records(self.pattern, self.request(batch))
+            err = None
+        except Exception as e:
+            records, err = {}, e
+        expires = time.monotonic() + self.ttl
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["failed"] += err is not None
+            if self.ttl > 0:
+                for code, record in records.items():
+                    self.cache[code] = (expires, record)
+            for code in batch:
+                if self.inflight.get(code) is future:
+                    del self.inflight[code]
+        future.set_result((records, err))
+        return err
+
+    def fetch_records(self, codes):
+        """
+        返回 ({代码: 记录}, 失败批数)，取不到的代码不出现在结果中
+        有代码需要拉取但所有批次都失败时抛出最后一次异常
+        """
+        codes = list(dict.fromkeys(codes))
+        now = time.monotonic()
+        found, waiting, mine = {}, {}, []
+        with self.lock:
+            for code in codes:
+                cached = self.cache.get(code)
+                if cached is not None and cached[0] > now:
+                    found[code] = cached[1]
+                elif code in self.inflight:
+                    waiting[code] = self.inflight[code]
+                else:
+                    mine.append(code)
+            # 本次要拉取的代码先登记为进行中，之后到达的请求直接等这些批次
+            jobs = [(batch, Future()) for batch in self.plan(mine)]
+            for batch, future in jobs:
+                for code in batch:
+                    self.inflight[code] = future
+            self.stats["codes"] += len(codes)
+            self.stats["cache_hits"] += len(found)
+            self.stats["coalesced"] += len(waiting)
+            if self._pool is None and jobs:
+                self._pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        run_metrics.count("quote_cache_hits", len(found))
+        run_metrics.count("quote_coalesced", len(waiting))
+
+        errors = list(self._pool.map(self._run_batch, jobs)) if jobs else []
+        for (batch, _), err in zip(jobs, errors):
+            if err is not None:
+                print(f"❌ 数据拉取异常 ({len(batch)} 只, {batch[0]}...): {err}")
+        for batch, future in jobs:
+            records, _ = future.result()
+            found.update((code, records[code]) for code in batch if code in records)
+        failed_waits = set()
+        for code, future in waiting.items():
+            records, err = future.result()
+            if err is not None:
+                failed_waits.add(id(future))
+            elif code in records:
+                found[code] = records[code]
+
+        failed = [err for err in errors if err is not None]
+        if failed and len(failed) == len(jobs) and not found:
+            raise failed[-1]
+        return found, len(failed) + len(failed_waits)
+
+    def fetch(self, codes):
+        """
+        返回各代码记录按 codes 顺序拼接的响应 (bytes)
+        """
+        found, _ = self.fetch_records(codes)
+        return b"".join(found[code] for code in dict.fromkeys(codes) if code in found)
+
+    def snapshot(self):
+        with self.lock:
+            now = time.monotonic()
+            return dict(self.stats, batch_size=self.batch_size,
+                        cached=sum(1 for expires, _ in self.cache.values() if expires > now))
+
+def get_gateway(source):
+    with _LOCK:
+        gateway = _GATEWAYS.get(source)
+        if gateway is None:
+            gateway = _GATEWAYS[source] = Gateway(source)
+        return gateway
+
+_REMOTE_DOWN = False
+
+def fetch_records(source, codes):
+    """
+    拉取行情 (source 为 sina / tencent)，返回 ({代码: 记录}, 失败批数)；配置了常驻网关时经由网关
+    """
+    global _REMOTE_DOWN
+    if GATEWAY_URL and not _REMOTE_DOWN:
+        import requests
+        start = time.perf_counter()
+        try:
+            resp = get_session().post(f"{GATEWAY_URL}/{source}", data=",".join(codes).encode(), timeout=60)
+        except requests.ConnectionError as e:
+            _REMOTE_DOWN = True
+            print(f"⚠️ 行情网关不可用 ({e})，改为直接拉取")
+        else:
+            run_metrics.http(f"gateway_{source}", time.perf_counter() - start, len(resp.content), resp.ok)
+            resp.raise_for_status()
+            failed = int(resp.headers.get("X-Failed-Batches") or 0)
+            return split_records(SOURCES[source]["record"], resp.content), failed
+    return get_gateway(source).fetch_records(codes)
+
+def fetch(source, codes):
+    """
+    拉取行情，返回各代码记录按 codes 顺序拼接的响应 (与原接口字节兼容)
+    """
+    found, _ = fetch_records(source, codes)
+    return b"".join(found[code] for code in dict.fromkeys(codes) if code in found)
+
+# ================= 常驻服务 =================
+#   POST /<source>   body 为逗号分隔的代码，返回拼接后的响应 (失败批数在 X-Failed-Batches 头中)；全部失败时返回 502
+#   GET  /_stats     各接口的请求数、缓存命中、合并数与当前批大小
+
+def serve(host="127.0.0.1", port=8901):
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type="text/plain; charset=GBK", failed=0):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("X-Failed-Batches", str(failed))
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/_stats":
+                stats = {source: gateway.snapshot() for source, gateway in _GATEWAYS.items()}
+                self._send(200, json.dumps(stats).encode(), "application/json")
+            else:
+                self._send(404, b"not found")
+
+        def do_POST(self):
+            source = self.path.strip("/")
+            length = int(self.headers.get("Content-Length") or 0)
+            codes = [c for c in self.rfile.read(length).decode("ascii", errors="ignore").split(",") if c]
+            if source not in SOURCES:
+                self._send(404, b"unknown source")
+                return
+            try:
+                found, failed = get_gateway(source).fetch_records(codes)
+            except Exception as e:
+                self._send(502, str(e).encode("utf-8", errors="ignore"))
+                return
+            self._send(200, b"".join(found[code] for code in dict.fromkeys(codes) if code in found),
+                       failed=failed)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    print(f"📡 行情网关已启动: http://{host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="行情网关")
+    sub = parser.add_subparsers(dest="cmd")
+    p_serve = sub.add_parser("serve", help="作为本地常驻服务运行")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8901)
+    p_fetch = sub.add_parser("fetch", help="拉取并打印响应")
+    p_fetch.add_argument("source", choices=list(SOURCES))
+    p_fetch.add_argument("codes", nargs="+")
+    sub.add_parser("stats", help="各接口的延迟分位与对冲阈值 (来自 data/quote_latency.json)")
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        serve(args.host, args.port)
+    elif args.cmd == "fetch":
+        sys.stdout.write(fetch(args.source, args.codes).decode("gbk", errors="ignore"))
+    elif args.cmd == "stats":
+        print("\n".join(status_lines()))
+    else:
+        parser.print_help()
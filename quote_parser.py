@@ -0,0 +1,266 @@
+# 文件名: quote_parser.py
+# 行情接口响应解析 (直接处理原始字节，不整体解码)
+import re
+from array import array
+
+# ================= Sina hq.sinajs.cn =================
+# 响应格式: var hq_str_<code>="f0,f1,f2,...";
+SINA_RE = re.compile(rb'var hq_str_([^=]+)="([^"]*)";')
+
+# 各类型的字段位置: (价格, 涨跌幅, 昨收)
+# 没有涨跌幅字段的类型用昨收自行计算；两者都没有则涨跌幅为 0
+SINA_FIELDS = {
+    "us":     (1, 2, None),
+    "hk":     (6, 8, None),
+    "future": (0, None, 7),
+    "fx":     (1, None, None),
+    "a":      (3, None, 2),
+}
+
+# 代码前缀 -> 类型 (其余视为期货 hf_)
+SINA_PREFIXES = (("gb_", "us"), ("rt_hk", "hk"), ("hk", "hk"), ("fx_", "fx"), ("sh", "a"), ("sz", "a"))
+
+def sina_type(code):
+    for prefix, stype in SINA_PREFIXES:
+        if code.startswith(prefix):
+            return stype
+    return "future"
+
+def parse_sina_hq(raw):
+    """
+    一次扫描整个响应，返回 {代码: 字段列表(bytes)}
+    """
+    if isinstance(raw, str):
+        raw = raw.encode("gbk", errors="ignore")
+    return {m.group(1).decode("ascii", errors="ignore"): m.group(2).split(b",")
+            for m in SINA_RE.finditer(raw)}
+
+def sina_quote(stype, parts):
+    """
+    按 SINA_FIELDS 取出 (价格, 涨跌幅%)，字段缺失或非数字时抛出异常
+    """
+    price_idx, pct_idx, prev_idx = SINA_FIELDS[stype]
+    price = float(parts[price_idx])
+    change_pct = 0.0
+    if pct_idx is not None:
+        change_pct = float(parts[pct_idx])
+    elif prev_idx is not None:
+        prev_close = float(parts[prev_idx])
+        if prev_close > 0:
+            change_pct = ((price - prev_close) / prev_close) * 100
+    return price, change_pct
+
+# ================= Tencent qt.gtimg.cn =================
+# 响应格式: v_sh600519="1~贵州茅台~600519~价格~...";  (GBK 编码，~ 分隔)
+# 只取 4 个数值: 价格 / PE-TTM / PB / 股息率，对应字段下标:
+TENCENT_FIELDS = {
+    "A": (3, 39, 46, 64),   # 股息率为滚动股息率 TTM
+    "H": (3, 57, 58, 47),
+}
+TENCENT_MIN_FIELDS = 30     # 字段数不足的记录视为无效
+METRIC_NAMES = ("price", "pe_ttm", "pb", "dv_ratio")
+
+class QuoteColumns:
+    """
+    列式行情结果: codes[i] 的各项指标位于各列第 i 位
+    reset() 后复用已分配的列，反复解析不重新分配内存
+    """
+    def __init__(self):
+        self.codes = []
+        self.index = {}
+        self.n = 0
+        self.columns = [array("d") for _ in METRIC_NAMES]
+
+    def reset(self):
+        self.codes.clear()
+        self.index.clear()
+        self.n = 0
+
+    def put(self, code, values):
+        i = self.index.get(code)
+        if i is None:
+            i = self.n
+            self.n += 1
+            self.index[code] = i
+            self.codes.append(code)
+        for col, val in zip(self.columns, values):
+            if i < len(col):
+                col[i] = val
+            else:
+                col.append(val)
+
+    def extend(self, codes, columns):
+        """
+        批量写入一批新记录 (columns 为按列排列的数值列表)，整列切片赋值
+        批内或已有的重复代码逐条覆盖，保持 "后出现的为准"
+        """
+        index = self.index
+        if len(set(codes)) != len(codes) or any(code in index for code in codes):
+            for row, code in enumerate(codes):
+                self.put(code, [vals[row] for vals in columns])
+            return
+        start, end = self.n, self.n + len(codes)
+        for col, vals in zip(self.columns, columns):
+            if len(col) < end:
+                col.extend(array("d", bytes(8 * (end - len(col)))))
+            col[start:end] = array("d", vals)
+        for i, code in enumerate(codes, start):
+            index[code] = i
+        self.codes.extend(codes)
+        self.n = end
+
+    def __len__(self):
+        return self.n
+
+    def get(self, code):
+        i = self.index.get(code)
+        if i is None:
+            return None
+        return {name: col[i] for name, col in zip(METRIC_NAMES, self.columns)}
+
+    def to_data_map(self):
+        cols = [col[:self.n].tolist() for col in self.columns]
+        return {code: dict(zip(METRIC_NAMES, vals)) for code, *vals in zip(self.codes, *cols)}
+
+    def as_arrays(self):
+        """
+        各列的 NumPy 视图 (不拷贝)，长度为 n
+        """
+        import numpy as np
+        return {name: np.frombuffer(col, dtype=np.float64)[:self.n] for name, col in zip(METRIC_NAMES, self.columns)}
+
+def _to_float(val):
+    try:
+        return float(val)
+    except ValueError:
+        return 0.0
+
+def parse_tencent(raw, out=None):
+    """
+    解析腾讯行情响应，结果写入 out (QuoteColumns，可复用)，以响应中的代码字段为键
+    不整体解码、不完整拆分: 先用变量名里的代码定位代码字段，跳过中文名称
+    (GBK 双字节中可能出现 0x7E，即 '~')，再只拆到所需的最大下标为止
+    结果先按列收集，最后整列写入 out
+    """
+    if out is None:
+        out = QuoteColumns()
+    if isinstance(raw, str):
+        raw = raw.encode("gbk", errors="ignore")
+
+    codes = []
+    columns = [[] for _ in METRIC_NAMES]
+    appends = [vals.append for vals in columns]
+    # 每种类型: (所需字段下标, 最大下标)
+    layouts = {stype: (idx, max(idx)) for stype, idx in TENCENT_FIELDS.items()}
+
+    for record in raw.split(b";"):
+        eq = record.find(b'="')
+        if eq == -1:
+            continue
+        name = record[:eq].strip()
+        body = record[eq + 2:].rstrip()
+        if body.endswith(b'"'):
+            body = body[:-1]
+
+        # 判断是 A 股还是 H 股 (根据变量名判断)
+        hk = name.rfind(b"hk")
+        idx, need = layouts["H" if hk != -1 else "A"]
+
+        # 变量名中的代码: v_sh600519 -> 600519, v_r_hk00700 -> 00700
+        var_code = name[hk + 2:] if hk != -1 else name[name.find(b"_") + 3:]
+        pos = body.find(b"~" + var_code + b"~") if var_code else -1
+        if pos != -1:
+            # 从代码字段 (下标 2) 开始拆分，最多拆到所需的最大下标: rest[i - 2]
+            rest = body[pos + 1:].split(b"~", need - 1)
+            n_fields = 2 + len(rest)
+            code = var_code.decode("ascii", errors="ignore")
+            offset = 2
+        else:
+            # 兜底: 整条记录解码后完整拆分 (与原解析方式一致)
+            rest = body.decode("gbk", errors="ignore").split("~")
+            n_fields = len(rest)
+            if n_fields < 3:
+                continue
+            code = rest[2]
+            offset = 0
+
+        # 数据校验
+        if n_fields < TENCENT_MIN_FIELDS:
+            continue
+        if n_fields > need:
+            try:
+                values = [float(rest[i - offset]) for i in idx]
+            except ValueError:
+                values = [_to_float(rest[i - offset]) for i in idx]
+        else:
+            values = (0.0, 0.0, 0.0, 0.0)
+
+        codes.append(code)
+        for append, val in zip(appends, values):
+            append(val)
+
+    out.extend(codes, columns)
+    return out
+
+# 各市场通用的涨跌幅字段 (A 股 / 港股 / 美股 / 指数相同)
+TENCENT_PCT_FIELD = 32
+
+def parse_tencent_quotes(raw):
+    """
+    按请求代码 (变量名 v_ 之后的部分) 返回 {代码: (价格, 涨跌幅%, PE-TTM, PB, 股息率)}
+    A 股 / 港股个股按 TENCENT_FIELDS 取估值，指数、美股等估值为 NaN；字段不足或非数字的记录跳过
+    与 parse_tencent 相同，先用代码定位代码字段再拆分，不受名称中 GBK 字节的影响
+    """
+    if isinstance(raw, str):
+        raw = raw.encode("gbk", errors="ignore")
+    nan = float("nan")
+    out = {}
+    for record in raw.split(b";"):
+        eq = record.find(b'="')
+        if eq == -1:
+            continue
+        name = record[:eq].strip()
+        if not name.startswith(b"v_"):
+            continue
+        key = name[2:]
+        body = record[eq + 2:].rstrip()
+        if body.endswith(b'"'):
+            body = body[:-1]
+        var_code = key[4:] if key.startswith(b"r_hk") else key[2:]
+        if key.startswith((b"sh", b"sz")):
+            idx = TENCENT_FIELDS["A"]
+        elif key.startswith((b"r_hk", b"hk")) and var_code.isdigit():
+            idx = TENCENT_FIELDS["H"]
+        else:
+            idx = TENCENT_FIELDS["A"][:1]
+        need = max(max(idx), TENCENT_PCT_FIELD)
+        pos = body.find(b"~" + var_code + b"~") if var_code else -1
+        if pos != -1:
+            fields = [b"", b""] + body[pos + 1:].split(b"~", need - 1)
+        else:
+            fields = body.split(b"~")
+        if len(fields) < TENCENT_MIN_FIELDS or len(fields) <= need:
+            continue
+        try:
+            price = float(fields[idx[0]])
+            pct = float(fields[TENCENT_PCT_FIELD])
+            valuation = [float(fields[i]) for i in idx[1:]]
+        except ValueError:
+            continue
+        valuation += [nan] * (3 - len(valuation))
+        out[key.decode("ascii", errors="ignore")] = (price, pct, *valuation)
+    return out
+
+def parse_sina_quotes(raw):
+    """
+    返回 {代码: (价格, 涨跌幅%, NaN, NaN, NaN)} (Sina 不提供估值)，类型由代码前缀判断，无法解析的记录跳过
+    """
+    nan = float("nan")
+    out = {}
+    for code, parts in parse_sina_hq(raw).items():
+        try:
+            price, change_pct = sina_quote(sina_type(code), parts)
+        except (ValueError, IndexError):
+            continue
+        out[code] = (price, change_pct, nan, nan, nan)
+    return out
@@ -0,0 +1,147 @@
+# 文件名: quote_providers.py
+# 多行情源对冲请求: 同一品种可由 Sina / 腾讯 两个行情源提供，先请求主源，
+# 超过延迟阈值仍未拿到完整结果时再向另一个源发出对冲请求，取先到的有效结果，避免单个慢源拖到超时
+#   - 品种统一表示为 (市场, 代码)，如 ("us", "IXIC") / ("sh", "600519") / ("hk", "00700")，各行情源自行换算请求代码
+#   - 主源为覆盖品种最多的源，覆盖相同时按各源整次拉取的延迟直方图选 p90 较低者，对冲阈值取主源的 p90
+#   - 只有能提供所需字段的源才参与 (估值只有腾讯有)；只有一个源时不跨源对冲
+#   - 单个 HTTP 请求的慢响应由行情网关在同一个源内对冲 (见 quote_gateway.py)，延迟直方图也记在那里
+#   python quote_providers.py --fetch us:IXIC hk:HSI fx:USDCNY
+import argparse
+import quote_gateway
+
+FIELDS = ("price", "change_pct", "pe_ttm", "pb", "dv_ratio")
+PRICE_FIELDS = ("price", "change_pct")
+
+# 腾讯的美股指数代码带点 (us.IXIC)，个股不带 (usAAPL)
+TENCENT_US_INDICES = {"IXIC", "INX", "DJI"}
+
+# ================= 行情源 =================
+# name 为整次拉取的延迟直方图名称 (与网关中单个请求的标签 sina_hq / tencent 区分)
+
+class SinaProvider:
+    name = "sina_quotes"
+    source = "sina"
+    fields = PRICE_FIELDS
+
+    def code_for(self, inst):
+        market, symbol = inst
+        if market in ("sh", "sz"):
+            return market + symbol
+        if market == "hk":
+            return "rt_hk" + symbol
+        if market == "us":
+            return "gb_" + symbol.lower()
+        if market == "fx":
+            return "fx_s" + symbol.lower()
+        if market == "future":
+            return "hf_" + symbol
+        return None
+
+    def parse(self, records):
+        from quote_parser import parse_sina_quotes
+        return parse_sina_quotes(b"".join(records.values()))
+
+class TencentProvider:
+    name = "tencent_quotes"
+    source = "tencent"
+    fields = FIELDS
+
+    def code_for(self, inst):
+        market, symbol = inst
+        if market in ("sh", "sz"):
+            return market + symbol
+        if market == "hk":
+            return ("r_hk" if symbol.isdigit() else "hk") + symbol
+        if market == "us":
+            return ("us." if symbol in TENCENT_US_INDICES else "us") + symbol
+        return None
+
+    def parse(self, records):
+        from quote_parser import parse_tencent_quotes
+        return parse_tencent_quotes(b"".join(records.values()))
+
+PROVIDERS = [SinaProvider(), TencentProvider()]
+
+def from_sina(code, stype):
+    """
+    Sina 代码 + 类型 (main.TARGETS 的写法) -> (市场, 代码)
+    """
+    if stype == "us":
+        return ("us", code[3:].upper())
+    if stype == "hk":
+        return ("hk", code[5:] if code.startswith("rt_hk") else code[2:])
+    if stype == "fx":
+        return ("fx", code[4:].upper())
+    if stype == "future":
+        return ("future", code[3:])
+    return (code[:2], code[2:])
+
+def _provider_call(provider, codes, fields):
+    """
+    通过行情网关拉取并解析，返回 ({请求代码: 字段 tuple}, 是否完整)
+    完整指没有失败批次且每个请求代码都取到了所需字段；不完整时其覆盖的品种不算已有结论，会向另一个源对冲
+    """
+    idx = [FIELDS.index(f) for f in fields]
+
+    def call():
+        records, failed = quote_gateway.fetch_records(provider.source, codes)
+        out = {}
+        for code, values in provider.parse(records).items():
+            vals = tuple([values[i] for i in idx])
+            # NaN != NaN: 所需字段缺失的品种不计入
+            if len([v for v in vals if v == v]) == len(vals):
+                out[code] = vals
+        return out, failed == 0 and set(codes) <= set(out)
+    return call
+
+def choose(instruments, fields):
+    """
+    返回 [(行情源, {请求代码: 品种})]: 主源在前 (覆盖品种最多，同等覆盖时按延迟 p90 较低者)，其余为对冲候选
+    """
+    candidates = []
+    for order, provider in enumerate(PROVIDERS):
+        if not set(fields) <= set(provider.fields):
+            continue
+        covered = {}
+        for inst in instruments:
+            code = provider.code_for(inst)
+            if code:
+                covered[code] = inst
+        if covered:
+            latency = quote_gateway.latency_quantile(provider.name, quote_gateway.HEDGE_QUANTILE)
+            candidates.append((-len(covered), float("inf") if latency is None else latency, order, provider, covered))
+    candidates.sort(key=lambda c: c[:3])
+    return [(c[3], c[4]) for c in candidates]
+
+def fetch(instruments, fields=PRICE_FIELDS):
+    """
+    拉取一组品种，返回 {(市场, 代码): {字段: 值}}；取不到或字段不全的品种不出现在结果中
+    """
+    instruments = list(dict.fromkeys(instruments))
+    plan = choose(instruments, fields)
+    if not plan:
+        return {}
+
+    # 各源的结果按请求代码返回，换算回品种后再合并
+    def keyed(provider, codes):
+        fn = _provider_call(provider, list(codes), fields)
+
+        def call():
+            values, ok = fn()
+            return {codes[code]: vals for code, vals in values.items() if code in codes}, ok
+        return call
+
+    calls = [(provider.name, set(codes.values()), keyed(provider, codes)) for provider, codes in plan[:2]]
+    quotes, _ = quote_gateway.hedged(calls, instruments, quote_gateway.hedge_after(calls[0][0]))
+    return {inst: dict(zip(fields, vals)) for inst, vals in quotes.items()}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多行情源对冲请求")
+    parser.add_argument("--fetch", nargs="+", required=True, metavar="市场:代码", help="拉取指定品种，如 us:IXIC sh:600519")
+    parser.add_argument("--fields", default=",".join(PRICE_FIELDS), help=f"所需字段 (可选 {','.join(FIELDS)})")
+    args = parser.parse_args()
+
+    instruments = [tuple(item.split(":", 1)) for item in args.fetch]
+    for inst, quote in fetch(instruments, tuple(args.fields.split(","))).items():
+        print(f"{inst[0]}:{inst[1]}", quote)
+    print("\n".join(quote_gateway.status_lines()))
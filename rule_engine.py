@@ -0,0 +1,121 @@
+# 文件名: rule_engine.py
+# 估值规则引擎: 把 TARGETS 中的规则一次性编译为 NumPy 数组，
+# 所有 股票×规则 的分位值与状态图标在一次向量化计算中得出
+import numpy as np
+
+# 指标列顺序 (values 矩阵的列)
+METRICS = ["price", "pe_ttm", "pb", "dv_ratio"]
+METRIC_INDEX = {m: i for i, m in enumerate(METRICS)}
+
+# 规则类型 (由 buy/sell 是否缺失决定)
+KIND_RANGE = 0      # 完整区间 -> 计算分位
+KIND_BUY_ONLY = 1   # 只有买入阈值
+KIND_SELL_ONLY = 2  # 只有卖出阈值
+KIND_INCOMPLETE = 3 # 规则不完整
+
+# 状态图标 (status 数组中存的是这里的下标)
+ICONS = ["🔥", "✅", "⚖️", "⚠️", "🔴", "🔸", "⚪"]
+FIRE, OK, FAIR, RISK, HIGH, WAIT, NONE = range(len(ICONS))
+
+class RuleSet:
+    """
+    编译后的规则集，规则按 targets 顺序平铺:
+    target 第 i 只股票的规则位于 [rule_start[i], rule_start[i+1])
+    """
+    def __init__(self, targets):
+        self.targets = targets
+        self.rules = []
+        target_idx, metric_idx, buy, sell, reverse = [], [], [], [], []
+        rule_start = [0]
+
+        for i, item in enumerate(targets):
+            for rule in item['rules']:
+                self.rules.append(rule)
+                target_idx.append(i)
+                metric_idx.append(METRIC_INDEX[rule['metric']])
+                buy.append(np.nan if rule['buy'] is None else float(rule['buy']))
+                sell.append(np.nan if rule['sell'] is None else float(rule['sell']))
+                reverse.append(bool(rule['reverse']))
+            rule_start.append(len(self.rules))
+
+        self.codes = [str(item['code']) for item in targets]
+        self.target_idx = np.array(target_idx, dtype=np.intp)
+        self.metric_idx = np.array(metric_idx, dtype=np.intp)
+        self.buy = np.array(buy, dtype=np.float64)
+        self.sell = np.array(sell, dtype=np.float64)
+        self.reverse = np.array(reverse, dtype=bool)
+        self.rule_start = np.array(rule_start, dtype=np.intp)
+
+        # 缺失侧掩码与规则类型
+        self.has_buy = ~np.isnan(self.buy)
+        self.has_sell = ~np.isnan(self.sell)
+        self.kind = np.full(len(self.rules), KIND_INCOMPLETE, dtype=np.int8)
+        self.kind[self.has_buy & self.has_sell] = KIND_RANGE
+        self.kind[self.has_buy & ~self.has_sell] = KIND_BUY_ONLY
+        self.kind[~self.has_buy & self.has_sell] = KIND_SELL_ONLY
+
+        # 分位公式的分母: 正向 (sell - buy)，反向 (buy - sell)
+        self.span = np.where(self.reverse, self.buy - self.sell, self.sell - self.buy)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def rules_of(self, rows):
+        """
+        一组股票 (targets 下标) 对应的全部规则下标
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        if rows.size == 0:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate([np.arange(self.rule_start[i], self.rule_start[i + 1]) for i in rows])
+
+    def evaluate(self, values, rules=None):
+        """
+        一次计算所有规则 (或 rules 指定的规则下标)，返回 (current, pct, status):
+        values 也可以带前导维度 (如 [日期数, 股票数, 指标数])，结果随之为 [日期数, 规则数]
+        - current: 每条规则对应的当前指标值
+        - pct: 分位值，仅完整区间规则有值，其余为 NaN (0% = 买入点，100% = 卖出点)
+        - status: ICONS 下标
+        """
+        sel = slice(None) if rules is None else rules
+        buy, sell, reverse = self.buy[sel], self.sell[sel], self.reverse[sel]
+        kind, span = self.kind[sel], self.span[sel]
+        current = values[..., self.target_idx[sel], self.metric_idx[sel]]
+
+        # 分位: 反向 (buy - current) / (buy - sell)，正向 (current - buy) / (sell - buy)
+        diff = np.where(reverse, buy - current, current - buy)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = np.where(span == 0, 0.0, diff / span * 100)
+        pct[..., kind != KIND_RANGE] = np.nan
+        pct[np.isnan(current)] = np.nan
+
+        with np.errstate(invalid='ignore'):
+            # 完整区间: 越过卖出点 (> 100) 先于风险区 (> 80) 判断，否则 🔴 永远不会出现
+            range_status = np.select(
+                [pct < 0, pct < 20, pct > 100, pct > 80],
+                [FIRE, OK, HIGH, RISK],
+                default=FAIR,
+            )
+            # 只有买入: 反向 current >= buy，正向 current <= buy
+            is_buy = np.where(reverse, current >= buy, current <= buy)
+            # 只有卖出: 反向 current <= sell，正向 current >= sell
+            is_sell = np.where(reverse, current <= sell, current >= sell)
+
+        status = np.full(current.shape, NONE, dtype=np.int8)
+        status = np.where(kind == KIND_RANGE, np.where(np.isnan(pct), NONE, range_status), status)
+        status = np.where(kind == KIND_BUY_ONLY, np.where(is_buy, OK, WAIT), status)
+        status = np.where(kind == KIND_SELL_ONLY, np.where(is_sell, RISK, FAIR), status)
+        return current, pct, status.astype(np.int8)
+
+_CACHE = {}
+
+def compile_rules(targets):
+    """
+    编译规则集，同一个 targets 对象只编译一次
+    """
+    key = id(targets)
+    cached = _CACHE.get(key)
+    if cached is None or cached.targets is not targets:
+        cached = RuleSet(targets)
+        _CACHE[key] = cached
+    return cached
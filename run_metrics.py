@@ -0,0 +1,192 @@
+# 文件名: run_metrics.py
+# 运行记录: 各环节耗时、每个 HTTP 请求的延迟与字节数、解析/丢弃条数、写入行数、每个推送对象的延迟，
+# 每次运行结束时追加一行 JSON 到 data/runs.jsonl
+#
+# 默认关闭 (所有调用都是空操作)，设置环境变量开启:
+#   WESTOCK_METRICS=1                 开启
+#   WESTOCK_METRICS_PATH=xxx.jsonl    自定义输出文件
+# 定时任务中已开启，data/runs.jsonl 不入库，由 Actions 缓存在各次运行之间累积
+#
+# 汇总历史运行的分位数:
+#   python run_metrics.py summary [--job noon] [--last 30]
+import os
+import sys
+import json
+import time
+import datetime
+import argparse
+import threading
+
+ENABLED = os.getenv("WESTOCK_METRICS", "") not in ("", "0", "false")
+RUNS_PATH = os.getenv("WESTOCK_METRICS_PATH", os.path.join("data", "runs.jsonl"))
+
+_RUN = None
+_LOCK = threading.Lock()
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    def __init__(self, run, name):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with _LOCK:
+            self.run["stages"][self.name] = self.run["stages"].get(self.name, 0.0) + elapsed
+        return False
+
+def start_run(job):
+    """
+    开始记录一次运行 (未开启时什么都不做)
+    """
+    global _RUN
+    if not ENABLED:
+        return
+    _RUN = {
+        "job": job,
+        "start": datetime.datetime.now().isoformat(timespec="seconds"),
+        "_t0": time.perf_counter(),
+        "stages": {},
+        "http": [],
+        "counts": {},
+        "push": [],
+    }
+
+def stage(name):
+    """
+    计时上下文: with run_metrics.stage("parse"): ...
+    同名环节多次进入时累加
+    """
+    if _RUN is None:
+        return _NULL_STAGE
+    return _Stage(_RUN, name)
+
+def http(label, latency, nbytes=0, ok=True):
+    if _RUN is None:
+        return
+    with _LOCK:
+        _RUN["http"].append({"label": label, "latency": round(latency, 6), "bytes": nbytes, "ok": ok})
+
+def count(key, n=1):
+    """
+    计数: records_parsed / records_dropped / rows_written 等
+    """
+    if _RUN is None:
+        return
+    with _LOCK:
+        _RUN["counts"][key] = _RUN["counts"].get(key, 0) + n
+
+def push(recipient, latency, ok):
+    if _RUN is None:
+        return
+    with _LOCK:
+        _RUN["push"].append({"to": recipient, "latency": round(latency, 6), "ok": ok})
+
+def finish(path=None):
+    """
+    结束记录并追加到 JSONL 文件，返回本次记录 (未开启时返回 None)
+    """
+    global _RUN
+    run = _RUN
+    if run is None:
+        return None
+    _RUN = None
+    run["wall"] = round(time.perf_counter() - run.pop("_t0"), 6)
+    run["stages"] = {k: round(v, 6) for k, v in run["stages"].items()}
+    run["bytes"] = sum(h["bytes"] for h in run["http"])
+    path = path or RUNS_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run, ensure_ascii=False) + "\n")
+    return run
+
+# ================= 汇总 =================
+
+def load_runs(path=RUNS_PATH, job=None, last=None):
+    runs = []
+    if not os.path.exists(path):
+        return runs
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue
+            if job is None or run.get("job") == job:
+                runs.append(run)
+    return runs[-last:] if last else runs
+
+def percentile(values, q):
+    """
+    线性插值分位数 (q 取 0-100)
+    """
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    k = (len(values) - 1) * q / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def summarize(runs):
+    """
+    把多次运行汇总为 {指标: [数值...]}
+    """
+    series = {}
+    def add(key, value):
+        series.setdefault(key, []).append(value)
+
+    for run in runs:
+        add("wall_s", run.get("wall", 0.0))
+        add("bytes", run.get("bytes", 0))
+        for name, value in run.get("stages", {}).items():
+            add(f"stage.{name}_s", value)
+        for name, value in run.get("counts", {}).items():
+            add(f"count.{name}", value)
+        for h in run.get("http", []):
+            add(f"http.{h['label']}_s", h["latency"])
+        for p in run.get("push", []):
+            add("push_s", p["latency"])
+        if run.get("push"):
+            add("push_failed", sum(1 for p in run["push"] if not p["ok"]))
+    return series
+
+def print_summary(runs, file=sys.stdout):
+    series = summarize(runs)
+    jobs = sorted({run.get("job") for run in runs})
+    print(f"共 {len(runs)} 次运行 ({', '.join(map(str, jobs))})", file=file)
+    print(f"{'指标':<32}{'次数':>6}{'p50':>12}{'p90':>12}{'p99':>12}{'max':>12}", file=file)
+    for key in sorted(series):
+        values = series[key]
+        print(f"{key:<32}{len(values):>6}"
+              f"{percentile(values, 50):>12.4g}{percentile(values, 90):>12.4g}"
+              f"{percentile(values, 99):>12.4g}{max(values):>12.4g}", file=file)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="运行记录汇总")
+    sub = parser.add_subparsers(dest="cmd")
+    p_summary = sub.add_parser("summary", help="汇总历史运行的分位数")
+    p_summary.add_argument("--job", help="只看某个任务 (morning/noon/evening/...)")
+    p_summary.add_argument("--last", type=int, help="只看最近 N 次")
+    p_summary.add_argument("--path", default=RUNS_PATH)
+    args = parser.parse_args()
+
+    if args.cmd == "summary":
+        print_summary(load_runs(args.path, args.job, args.last))
+    else:
+        parser.print_help()
@@ -0,0 +1,73 @@
+# 文件名: run_state.py
+# 定时任务的去重状态: 记录每个任务上一次成功推送时接口响应的内容哈希，
+# 本次拉到的数据与之相同 (休市、接口未更新) 时直接跳过解析、写入和推送
+#   data/run_state/<任务>.json
+# 设置环境变量 WESTOCK_FORCE=1 可忽略交易日历与去重，强制运行
+import os
+import json
+import hashlib
+import datetime
+
+STATE_DIR = os.path.join("data", "run_state")
+
+_PENDING = {}
+
+def forced():
+    return os.getenv("WESTOCK_FORCE", "") not in ("", "0", "false")
+
+def payload_hash(*parts):
+    """
+    一个或多个原始响应 (bytes) 依次计算 sha256
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part)
+    return h.hexdigest()
+
+def _path(job):
+    return os.path.join(STATE_DIR, f"{job}.json")
+
+def last_hash(job):
+    try:
+        with open(_path(job), encoding="utf-8") as f:
+            return json.load(f).get("hash")
+    except (OSError, ValueError):
+        return None
+
+def is_duplicate(job, digest):
+    """
+    与上次成功运行的内容相同时返回 True；否则记下待确认的哈希，等 commit(job) 时写入
+    """
+    if not forced() and digest == last_hash(job):
+        return True
+    _PENDING[job] = digest
+    return False
+
+def discard(job):
+    """
+    本次运行失败 (如解析出错)，丢弃待确认的哈希，下次同样的数据仍会重新处理
+    """
+    _PENDING.pop(job, None)
+
+def commit(job):
+    """
+    本次运行已成功完成 (如推送成功)，把待确认的哈希写入状态文件
+    """
+    digest = _PENDING.pop(job, None)
+    if digest is None:
+        return
+    os.makedirs(STATE_DIR, exist_ok=True)
+    tmp_path = _path(job) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"hash": digest, "at": datetime.datetime.now().isoformat(timespec="seconds")}, f)
+    os.replace(tmp_path, _path(job))
+
+def should_run_today(job):
+    """
+    A 股相关任务: 非交易日直接跳过 (WESTOCK_FORCE 时不跳过)
+    """
+    import trading_calendar
+    if forced() or trading_calendar.is_trading_day():
+        return True
+    print(f"📅 今日休市，跳过 {job} 任务")
+    return False
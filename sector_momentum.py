@@ -0,0 +1,209 @@
+# 文件名: sector_momentum.py
+# 行业板块滚动动量: N 日累计涨幅、成交额加权动量、动量排名变化、连涨/连跌天数
+# 每个板块只保存最近 N+1 天的明细和几个累加量，每天只用当天的数据增量更新，
+# 计算量与历史长度无关；同一天重复运行先撤销当天再重新计入
+#   python sector_momentum.py rebuild   # 由 history_store 中最近的数据重建状态
+import os
+import json
+import math
+import argparse
+import history_store
+
+MOMENTUM_DAYS = 5       # 滚动窗口 (交易日)
+TOP_MOMENTUM = 5        # 报告中的动量前几名
+TOP_RANK_MOVES = 3      # 报告中排名上升最快的几个
+STATE_PATH = os.path.join("data", "sector_momentum.json")
+
+def new_state(window=MOMENTUM_DAYS):
+    return {"window": window, "dates": [], "sectors": {}}
+
+def load_state(path=None):
+    path = path or STATE_PATH
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("window") != MOMENTUM_DAYS:
+            return None
+        return state
+    except Exception as e:
+        print(f"⚠️ 板块动量状态读取失败，将重建: {e}")
+        return None
+
+def save_state(state, path=None):
+    path = path or STATE_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+def _new_sector():
+    return {
+        "hist": [],             # 最近 N+1 天: [date, pct, amount]，多留一天用于撤销
+        "log_sum": 0.0,         # 窗口内 sum(log(1 + pct/100))，累计涨幅 = exp(log_sum) - 1
+        "amount_sum": 0.0,      # 窗口内成交额合计
+        "weighted_sum": 0.0,    # 窗口内 sum(pct * amount)
+        "streak": 0, "streak_prev": 0,      # 连涨为正、连跌为负
+        "rank": None, "rank_prev": None,    # 当日涨幅排名
+        "mom_rank": None, "mom_rank_prev": None,  # N 日累计涨幅排名
+    }
+
+def _apply(s, entry, sign):
+    _, pct, amount = entry
+    s["log_sum"] += sign * math.log1p(pct / 100)
+    s["amount_sum"] += sign * amount
+    s["weighted_sum"] += sign * pct * amount
+
+def _push(s, entry, window):
+    hist = s["hist"]
+    hist.append(entry)
+    _apply(s, entry, 1)
+    if len(hist) > window:
+        _apply(s, hist[-window - 1], -1)
+    if len(hist) > window + 1:
+        del hist[0]
+
+def _pop(s, window):
+    hist = s["hist"]
+    _apply(s, hist.pop(), -1)
+    if len(hist) >= window:
+        _apply(s, hist[-window], 1)
+
+def _rollback(state, date_str):
+    """
+    撤销 date_str (必须是最后一天) 对所有板块的影响
+    """
+    window = state["window"]
+    for s in state["sectors"].values():
+        if s["hist"] and s["hist"][-1][0] == date_str:
+            _pop(s, window)
+            s["streak"] = s["streak_prev"]
+            s["rank"] = s["rank_prev"]
+            s["mom_rank"] = s["mom_rank_prev"]
+    state["dates"].pop()
+
+def cumulative_pct(s):
+    return (math.exp(s["log_sum"]) - 1) * 100
+
+def weighted_momentum(s):
+    """
+    成交额加权的平均日涨幅 (%)
+    """
+    return s["weighted_sum"] / s["amount_sum"] if s["amount_sum"] > 0 else 0.0
+
+def update_day(state, date_str, df):
+    """
+    并入一天的板块数据 (df 需有 name / pct / amount 列)；
+    date_str 与最后一天相同则先撤销再重算，早于最后一天的数据忽略
+    """
+    dates = state["dates"]
+    if dates and date_str < dates[-1]:
+        return False
+    if dates and date_str == dates[-1]:
+        _rollback(state, date_str)
+
+    window = state["window"]
+    sectors = state["sectors"]
+    today = []
+    for name, pct, amount in zip(df["name"], df["pct"], df["amount"]):
+        pct, amount = float(pct), float(amount)
+        if pct != pct or amount != amount:
+            continue
+        s = sectors.get(name)
+        if s is None:
+            s = sectors[name] = _new_sector()
+        _push(s, [date_str, pct, amount], window)
+        s["streak_prev"] = s["streak"]
+        if pct > 0:
+            s["streak"] = s["streak"] + 1 if s["streak"] > 0 else 1
+        elif pct < 0:
+            s["streak"] = s["streak"] - 1 if s["streak"] < 0 else -1
+        else:
+            s["streak"] = 0
+        today.append((name, pct))
+
+    # 当日涨幅排名与 N 日累计涨幅排名 (只在当天有数据的板块中排)
+    by_pct = sorted(today, key=lambda x: -x[1])
+    by_mom = sorted(today, key=lambda x: -sectors[x[0]]["log_sum"])
+    for rank, (name, _) in enumerate(by_pct, 1):
+        s = sectors[name]
+        s["rank_prev"] = s["rank"]
+        s["rank"] = rank
+    for rank, (name, _) in enumerate(by_mom, 1):
+        s = sectors[name]
+        s["mom_rank_prev"] = s["mom_rank"]
+        s["mom_rank"] = rank
+
+    dates.append(date_str)
+    del dates[:-(window + 1)]
+    return True
+
+def sync(state=None, base_dir=None, before=None):
+    """
+    补齐状态: 只回放 history_store 中比状态更新的日期 (首次运行回放最近 N+1 天)；
+    before 指定时只回放早于该日期的数据 (当天的数据由调用方直接传入)
+    """
+    base_dir = base_dir or history_store.HISTORY_DIR
+    if state is None:
+        state = new_state()
+    all_dates = history_store.list_dates(base_dir)
+    last = state["dates"][-1] if state["dates"] else None
+    pending = [d for d in all_dates if (last is None or d > last) and (before is None or d < before)]
+    if last is None:
+        pending = pending[-(state["window"] + 1):]
+    for date_str in pending:
+        update_day(state, date_str, history_store.read_dates([date_str], base_dir))
+    return state
+
+def rank_change(s):
+    """
+    动量排名较前一日的变化 (正数为上升)
+    """
+    if s["mom_rank"] is None or s["mom_rank_prev"] is None:
+        return 0
+    return s["mom_rank_prev"] - s["mom_rank"]
+
+def report_lines(state, top=TOP_MOMENTUM, top_moves=TOP_RANK_MOVES):
+    """
+    报告文本: 动量前几名 (累计涨幅 / 加权动量 / 排名变化 / 连涨天数) 与排名上升最快的板块
+    """
+    if not state["dates"]:
+        return []
+    last = state["dates"][-1]
+    current = {name: s for name, s in state["sectors"].items() if s["hist"] and s["hist"][-1][0] == last}
+    if not current:
+        return []
+    window = min(state["window"], len(state["dates"]))
+
+    lines = [f"📈 **{window}日动量** (截至 {last})"]
+    leaders = sorted(current.items(), key=lambda x: x[1]["mom_rank"])[:top]
+    for name, s in leaders:
+        move = rank_change(s)
+        move_str = f"↑{move}" if move > 0 else (f"↓{-move}" if move < 0 else "-")
+        streak = s["streak"]
+        streak_str = f"连涨{streak}" if streak > 0 else (f"连跌{-streak}" if streak < 0 else "平")
+        lines.append(f"• {name}: {cumulative_pct(s):+.2f}% | 加权 {weighted_momentum(s):+.2f}% | 排名{move_str} | {streak_str}")
+
+    movers = sorted((x for x in current.items() if rank_change(x[1]) > 0), key=lambda x: -rank_change(x[1]))[:top_moves]
+    if movers:
+        lines.append("🚀 排名上升: " + ", ".join(f"{name}(↑{rank_change(s)})" for name, s in movers))
+    return lines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="行业板块滚动动量")
+    sub = parser.add_subparsers(dest="cmd")
+    sub.add_parser("rebuild", help="由 history_store 中最近的数据重建状态")
+    sub.add_parser("show", help="显示当前动量")
+    args = parser.parse_args()
+
+    if args.cmd == "rebuild":
+        state = sync(new_state())
+        save_state(state)
+        print(f"✅ 已重建: {len(state['sectors'])} 个板块，日期 {', '.join(state['dates'])}")
+    elif args.cmd == "show":
+        state = load_state() or sync()
+        print("\n".join(report_lines(state)))
+    else:
+        parser.print_help()
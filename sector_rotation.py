@@ -0,0 +1,280 @@
+# 文件名: sector_rotation.py
+# 行业板块轮动: 维护一个 日期×板块 的涨幅矩阵 (data/sector_rotation.npz)，每天只追加一行，
+# 按周汇总后以 N 周为一期，计算各期的截面排名、五分位、z 值与五分位转移矩阵:
+#   哪些板块由末位五分位升至首位 (由弱转强)、领先的板块能持续多久
+# 矩阵不入库 (每次整体重写，CI 中由 Actions 缓存延续)；缺失或落后时由 data/history_sector 分区重建 / 补齐
+#   python sector_rotation.py rebuild   # 由 history_store 重建矩阵
+#   python sector_rotation.py show [--weeks 4]
+import os
+import argparse
+import numpy as np
+import history_store
+
+ROTATION_WEEKS = 4      # 每期周数
+QUANTILES = 5           # 五分位
+TOP_MOVERS = 5          # 报告中由弱转强 / 由强转弱的板块数
+TOP_STREAKS = 3         # 报告中连续领先最久的板块数
+MIN_PERIODS = 6         # 期数不少于此才报告领先延续概率
+CACHE_PATH = os.path.join("data", "sector_rotation.npz")
+
+class RotationMatrix:
+    """
+    dates: 升序日期字符串；sectors: 板块名；pct: [日期数, 板块数] float32 日涨幅 (%)，当天无数据为 NaN
+    新板块追加为新列，往日补 NaN
+    """
+    def __init__(self, dates=None, sectors=None, pct=None):
+        self.dates = list(dates or [])
+        self.sectors = list(sectors or [])
+        self.col = {name: i for i, name in enumerate(self.sectors)}
+        self.pct = pct if pct is not None else np.full((0, 0), np.nan, dtype=np.float32)
+        self.rows = len(self.dates)
+
+    def _reserve(self, rows, cols):
+        # 按倍数预留行列，逐日追加时不必每次复制整个矩阵
+        cap_rows, cap_cols = self.pct.shape
+        if rows <= cap_rows and cols <= cap_cols:
+            return
+        grown = np.full((max(rows, cap_rows * 2, 64), max(cols, cap_cols)), np.nan, dtype=np.float32)
+        grown[:self.rows, :cap_cols] = self.pct[:self.rows]
+        self.pct = grown
+
+    def append_day(self, date_str, names, pcts):
+        """
+        追加一天 (与最后一天相同则替换该行，早于最后一天的忽略)，返回是否写入
+        """
+        if self.dates and date_str < self.dates[-1]:
+            return False
+        for name in names:
+            if name not in self.col:
+                self.col[name] = len(self.sectors)
+                self.sectors.append(name)
+        if self.dates and date_str == self.dates[-1]:
+            row = self.rows - 1
+        else:
+            row = self.rows
+            self._reserve(row + 1, len(self.sectors))
+            self.dates.append(date_str)
+            self.rows += 1
+        self._reserve(self.rows, len(self.sectors))
+        self.pct[row] = np.nan
+        cols = np.fromiter((self.col[n] for n in names), dtype=np.intp, count=len(names))
+        self.pct[row, cols] = np.asarray(pcts, dtype=np.float32)
+        return True
+
+    def matrix(self):
+        return self.pct[:self.rows, :len(self.sectors)]
+
+def load_cache(path=None):
+    path = path or CACHE_PATH
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            return RotationMatrix(data["dates"].tolist(), data["sectors"].tolist(), data["pct"].astype(np.float32))
+    except Exception as e:
+        print(f"⚠️ 板块轮动矩阵读取失败，将重建: {e}")
+        return None
+
+def save_cache(cache, path=None):
+    path = path or CACHE_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, dates=np.array(cache.dates, dtype=str), sectors=np.array(cache.sectors, dtype=str),
+                            pct=cache.matrix())
+    os.replace(tmp_path, path)
+
+def append_frame(cache, date_str, df):
+    """
+    并入一天的板块数据 (df 需有 name / pct 列)
+    """
+    df = df[df["pct"].notna()]
+    return cache.append_day(date_str, df["name"].astype(str).tolist(), df["pct"].to_numpy())
+
+def rebuild(base_dir=None):
+    """
+    由 history_store 重建: 逐日分区各一行，周汇总各记为一行 (周收益不变)；
+    月汇总无法拆成周，不参与
+    """
+    base_dir = base_dir or history_store.HISTORY_DIR
+    cache = RotationMatrix()
+    weekly = history_store.read_tier("weekly", base_dir)
+    daily = history_store.read_dates(history_store.list_dates(base_dir), base_dir)
+    for frame in (weekly, daily):
+        for date_str, day in frame.groupby("date", sort=True):
+            append_frame(cache, date_str, day)
+    return cache
+
+def sync(cache=None, base_dir=None, before=None):
+    """
+    补齐矩阵: 只追加 history_store 中比矩阵更新的逐日分区 (矩阵为空时整体重建)；
+    before 指定时只追加早于该日期的数据 (当天的数据由调用方直接传入)
+    """
+    base_dir = base_dir or history_store.HISTORY_DIR
+    if cache is None or not cache.dates:
+        cache = rebuild(base_dir)
+        if before is not None:
+            _truncate(cache, before)
+        return cache
+    last = cache.dates[-1]
+    pending = [d for d in history_store.list_dates(base_dir) if d > last and (before is None or d < before)]
+    if pending:
+        for date_str, day in history_store.read_dates(pending, base_dir).groupby("date", sort=True):
+            append_frame(cache, date_str, day)
+    return cache
+
+def _truncate(cache, before):
+    keep = sum(1 for d in cache.dates if d < before)
+    del cache.dates[keep:]
+    cache.pct[keep:cache.rows] = np.nan
+    cache.rows = keep
+
+# ================= 截面统计 =================
+
+def weekly_returns(dates, pct):
+    """
+    日涨幅 -> 周涨幅 (复利，%)；整周无数据的板块为 NaN。返回 (每周第一个交易日, [周数, 板块数])
+    """
+    if len(dates) == 0:
+        return [], np.empty((0, pct.shape[1]))
+    day = np.array(dates, dtype="datetime64[D]").astype(np.int64)
+    week = (day + 3) // 7   # 1970-01-01 是周四，+3 后按周一切分
+    starts = np.flatnonzero(np.r_[True, week[1:] != week[:-1]])
+    valid = ~np.isnan(pct)
+    log = np.where(valid, np.log1p(np.where(valid, pct, 0).astype(np.float64) / 100), 0.0)
+    week_log = np.add.reduceat(log, starts, axis=0)
+    week_valid = np.add.reduceat(valid, starts, axis=0) > 0
+    return [dates[i] for i in starts], np.where(week_valid, np.expm1(week_log) * 100, np.nan)
+
+def period_returns(weekly, weeks=ROTATION_WEEKS):
+    """
+    从最近一周往前，每 weeks 周为一期，返回 [期数, 板块数] 的累计涨幅 (%)，按时间升序；
+    一期内全无数据的板块为 NaN，最早不足一期的周舍弃
+    """
+    n = len(weekly) // weeks
+    if n == 0:
+        return np.empty((0, weekly.shape[1]))
+    block = weekly[len(weekly) - n * weeks:].reshape(n, weeks, -1)
+    valid = ~np.isnan(block)
+    log = np.where(valid, np.log1p(np.where(valid, block, 0) / 100), 0.0).sum(axis=1)
+    return np.where(valid.any(axis=1), np.expm1(log) * 100, np.nan)
+
+def cross_rank(x):
+    """
+    每行的截面排名 (0 为最低)，NaN 不参与；返回 (rank, 每行有效数)，NaN 位置的 rank 为 -1
+    """
+    valid = ~np.isnan(x)
+    order = np.argsort(np.where(valid, x, np.inf), axis=1, kind="stable")
+    rank = np.empty(x.shape, dtype=np.int64)
+    np.put_along_axis(rank, order, np.arange(x.shape[1])[None, :], axis=1)
+    return np.where(valid, rank, -1), valid.sum(axis=1)
+
+def quintiles(x, q=QUANTILES):
+    """
+    每行的截面分位档 (0 为末位，q-1 为首位)，NaN 为 -1
+    """
+    rank, count = cross_rank(x)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bucket = rank * q // np.maximum(count, 1)[:, None]
+    return np.where(rank >= 0, bucket, -1)
+
+def zscores(x):
+    """
+    每行的截面 z 值
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(x, axis=1, keepdims=True)
+        std = np.nanstd(x, axis=1, keepdims=True)
+        return np.where(std > 0, (x - mean) / std, 0.0)
+
+def transition_matrix(buckets, q=QUANTILES):
+    """
+    相邻两期的分位档转移: 返回 (计数 [q, q], 行归一化概率)，行为上一期、列为下一期
+    """
+    prev, nxt = buckets[:-1].ravel(), buckets[1:].ravel()
+    ok = (prev >= 0) & (nxt >= 0)
+    counts = np.bincount(prev[ok] * q + nxt[ok], minlength=q * q).reshape(q, q)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        probs = counts / counts.sum(axis=1, keepdims=True)
+    return counts, probs
+
+def top_streaks(buckets, q=QUANTILES):
+    """
+    截至最近一期，每个板块连续处于首位档的期数
+    """
+    top = buckets[::-1] == q - 1
+    # 从最近一期往前，遇到第一个非首位档为止
+    return np.cumprod(top, axis=0).sum(axis=0)
+
+class Rotation:
+    """
+    一次分析的结果 (板块顺序同 cache.sectors)
+    """
+    def __init__(self, cache, weeks=ROTATION_WEEKS):
+        self.weeks = weeks
+        self.sectors = cache.sectors
+        self.week_starts, weekly = weekly_returns(cache.dates, cache.matrix())
+        self.periods = period_returns(weekly, weeks)
+        self.buckets = quintiles(self.periods)
+        self.z = zscores(self.periods)
+        self.counts, self.probs = transition_matrix(self.buckets)
+        self.streaks = top_streaks(self.buckets)
+        if len(self.periods) >= 2:
+            prev, last = self.buckets[-2], self.buckets[-1]
+            self.risers = np.flatnonzero((prev == 0) & (last == QUANTILES - 1))
+            self.fallers = np.flatnonzero((prev == QUANTILES - 1) & (last == 0))
+        else:
+            self.risers = self.fallers = np.empty(0, dtype=np.intp)
+
+def analyze(cache, weeks=ROTATION_WEEKS):
+    return Rotation(cache, weeks)
+
+def report_lines(cache, weeks=ROTATION_WEEKS, top=TOP_MOVERS, top_streaks_n=TOP_STREAKS):
+    """
+    报告文本: 由弱转强 / 由强转弱的板块 (本期涨幅与 z 值)、首位档的延续概率与连续领先的板块
+    """
+    rot = analyze(cache, weeks)
+    if len(rot.periods) < 2:
+        return []
+    last = rot.periods[-1]
+    z = rot.z[-1]
+
+    def fmt(cols):
+        cols = sorted(cols, key=lambda c: -abs(z[c]))[:top]
+        return ", ".join(f"{rot.sectors[c]}({last[c]:+.1f}%, z {z[c]:+.1f})" for c in cols)
+
+    lines = [f"🔄 **板块轮动** (每{weeks}周一期，共 {len(rot.periods)} 期)"]
+    if rot.risers.size:
+        lines.append(f"• 由弱转强: {fmt(rot.risers)}")
+    if rot.fallers.size:
+        lines.append(f"• 由强转弱: {fmt(rot.fallers)}")
+    stay_top, stay_bottom = rot.probs[-1, -1], rot.probs[0, 0]
+    if len(rot.periods) >= MIN_PERIODS and stay_top == stay_top:
+        lines.append(f"• 领先延续: 首位档下一期仍居首位 {stay_top * 100:.0f}%，"
+                     f"末位档仍居末位 {stay_bottom * 100:.0f}% (随机约 {100 / QUANTILES:.0f}%)")
+    leaders = [c for c in np.argsort(-rot.streaks, kind="stable")[:top_streaks_n] if rot.streaks[c] >= 2]
+    if leaders:
+        lines.append("• 连续领先: " + ", ".join(f"{rot.sectors[c]}({rot.streaks[c]}期)" for c in leaders))
+    return lines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="行业板块轮动")
+    sub = parser.add_subparsers(dest="cmd")
+    sub.add_parser("rebuild", help="由 history_store 重建矩阵")
+    p_show = sub.add_parser("show", help="显示轮动分析与转移矩阵")
+    p_show.add_argument("--weeks", type=int, default=ROTATION_WEEKS)
+    args = parser.parse_args()
+
+    if args.cmd == "rebuild":
+        cache = rebuild()
+        save_cache(cache)
+        print(f"✅ 已重建: {len(cache.dates)} 行 × {len(cache.sectors)} 个板块")
+    elif args.cmd == "show":
+        cache = sync(load_cache())
+        print("\n".join(report_lines(cache, args.weeks)))
+        rot = analyze(cache, args.weeks)
+        print("五分位转移概率 (行: 上一期 末位→首位，列: 下一期):")
+        for row in rot.probs:
+            print("  " + " ".join(f"{p * 100:5.1f}%" for p in row))
+    else:
+        parser.print_help()
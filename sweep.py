@@ -0,0 +1,186 @@
+# 文件名: sweep.py
+# 规则区间参数扫描: 对每只股票的每个指标，在历史分位上取一组 buy/sell 候选值，
+# 逐个组合回测 (见 backtest.py)，按收益 / 回撤 / 胜率排序，给出可替换 watchlist.json 手工区间的建议
+# 历史估值矩阵放在共享内存中，进程池的各个进程直接映射同一块内存，不按任务或按进程序列化数据
+#   python sweep.py                                  # 全部股票，按收益排序
+#   python sweep.py --code 600519 --by drawdown --top 5
+#   python sweep.py --data history.csv --workers 8
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import rule_engine
+import watchlist
+import backtest
+
+# 候选阈值: 该指标历史值的 5%, 10%, ..., 95% 分位
+GRID_QUANTILES = np.linspace(0.05, 0.95, 19)
+MIN_TRADES = 2          # 交易次数不足的组合不参与排名
+TOP_N = 3               # 每个 (股票, 指标) 列出的最优组合数
+
+# 排序方式: 统计字段与方向 (越大越好)
+SORT_KEYS = {
+    "return": "total_ret",
+    "drawdown": "max_drawdown",
+    "hit": "win_rate",
+}
+SORT_NAMES = {"return": "收益", "drawdown": "回撤", "hit": "胜率"}
+STAT_FIELDS = ("n_trades", "win_rate", "avg_days", "total_ret", "hold_ret", "exposure", "max_drawdown")
+
+def grid_for(series, reverse, quantiles=GRID_QUANTILES):
+    """
+    由历史序列生成 (buys, sells): 正向指标 (PE/PB) buy < sell，反向指标 (股息率) buy > sell
+    """
+    series = series[~np.isnan(series)]
+    if series.size == 0:
+        return np.empty(0), np.empty(0)
+    levels = np.unique(np.round(np.quantile(series, quantiles), 6))
+    lo, hi = np.triu_indices(len(levels), k=1)
+    if reverse:
+        return levels[hi], levels[lo]
+    return levels[lo], levels[hi]
+
+def evaluate_grid(dates, values, metric, reverse, buys, sells):
+    """
+    单只股票 (values 为 [日期数, 指标数]) 在一组 buy/sell 组合下的回测统计，
+    返回 {统计字段: 数组}，数组顺序同 buys/sells
+    """
+    rules = [{"metric": metric, "buy": float(b), "sell": float(s), "reverse": reverse}
+             for b, s in zip(buys, sells)]
+    ruleset = rule_engine.RuleSet([{"code": "", "rules": rules}])
+    result = backtest.backtest(ruleset, dates, values[:, None, :])
+    return {name: getattr(result, name) for name in STAT_FIELDS}
+
+# ================= 共享内存 =================
+# 父进程把 dates / values 各放进一块共享内存，子进程启动时按名字映射为 NumPy 数组
+
+def _to_shared(arr):
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+    view[...] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+_WORKER = {}
+
+def _init_worker(dates_spec, values_spec):
+    for key, (name, shape, dtype) in (("dates", dates_spec), ("values", values_spec)):
+        shm = shared_memory.SharedMemory(name=name)
+        _WORKER[key + "_shm"] = shm  # 保持映射
+        _WORKER[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _run_task(task):
+    col, metric, reverse, buys, sells = task
+    return evaluate_grid(_WORKER["dates"], _WORKER["values"][:, col, :], metric, reverse, buys, sells)
+
+def sweep(dates, values, tasks, workers=None):
+    """
+    tasks 为 [(股票列号, 指标, reverse, buys, sells)]，返回与 tasks 对应的统计列表
+    workers=1 时在当前进程内计算
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        return [evaluate_grid(dates, values[:, col, :], metric, reverse, buys, sells)
+                for col, metric, reverse, buys, sells in tasks]
+
+    dates_shm, dates_spec = _to_shared(dates)
+    values_shm, values_spec = _to_shared(values)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(dates_spec, values_spec)) as pool:
+            return list(pool.map(_run_task, tasks))
+    finally:
+        for shm in (dates_shm, values_shm):
+            shm.close()
+            shm.unlink()
+
+def rank(stats, by="return", min_trades=MIN_TRADES, top=TOP_N):
+    """
+    按 by 排序 (交易次数不足或统计缺失的组合排除)，返回前 top 个组合的下标
+    """
+    score = np.asarray(stats[SORT_KEYS[by]], dtype=np.float64)
+    ok = (stats["n_trades"] >= min_trades) & ~np.isnan(score)
+    idx = np.nonzero(ok)[0]
+    # 分数相同时收益高的在前
+    order = np.lexsort((-stats["total_ret"][idx], -score[idx]))
+    return idx[order[:top]]
+
+def build_tasks(ruleset, values, quantiles=GRID_QUANTILES):
+    """
+    每个 (股票, 指标) 一个任务，方向沿用 watchlist.json 中该指标规则的 reverse；
+    返回 (tasks, keys)，keys[k] = (股票下标, 规则下标)
+    """
+    tasks, keys, seen = [], [], set()
+    for r, rule in enumerate(ruleset.rules):
+        col = int(ruleset.target_idx[r])
+        metric = rule["metric"]
+        if (col, metric) in seen:
+            continue
+        seen.add((col, metric))
+        reverse = bool(rule["reverse"])
+        buys, sells = grid_for(values[:, col, rule_engine.METRIC_INDEX[metric]], reverse, quantiles)
+        if buys.size == 0:
+            continue
+        tasks.append((col, metric, reverse, buys, sells))
+        keys.append((col, r))
+    return tasks, keys
+
+def _pct(x, sign=True):
+    if x != x:
+        return "-"
+    return f"{x * 100:+.1f}%" if sign else f"{x * 100:.0f}%"
+
+def report_lines(ruleset, dates, values, tasks, keys, results, by="return", top=TOP_N, min_trades=MIN_TRADES):
+    lines = [f"参数扫描 {dates[0]} ~ {dates[-1]} ({len(dates)} 个交易日)，按{SORT_NAMES[by]}排序"]
+    for (col, r), (_, metric, reverse, buys, sells), stats in zip(keys, tasks, results):
+        target = ruleset.targets[col]
+        rule = ruleset.rules[r]
+        lines.append(f"📌 {target['name']}({target['code']}) {rule.get('desc', metric)}"
+                     f" 当前区间 buy={rule['buy']} sell={rule['sell']}")
+        best = rank(stats, by, min_trades, top)
+        if best.size == 0:
+            lines.append(f"  交易次数均不足 {min_trades} 笔")
+            continue
+        for k in best:
+            lines.append(
+                f"  buy={buys[k]:g} sell={sells[k]:g}: {stats['n_trades'][k]} 笔 | "
+                f"胜率 {_pct(stats['win_rate'][k], False)} | 收益 {_pct(stats['total_ret'][k])} | "
+                f"最大回撤 {_pct(stats['max_drawdown'][k])} | 持仓 {_pct(stats['exposure'][k], False)}"
+            )
+        # 当前手工区间的表现 (只有完整区间可比)
+        if ruleset.kind[r] == rule_engine.KIND_RANGE:
+            current = evaluate_grid(np.asarray(dates, dtype="datetime64[D]"), values[:, col, :], metric, reverse,
+                                    [ruleset.buy[r]], [ruleset.sell[r]])
+            lines.append(f"  当前区间: {current['n_trades'][0]} 笔 | 收益 {_pct(current['total_ret'][0])} | "
+                         f"最大回撤 {_pct(current['max_drawdown'][0])}")
+    return lines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="规则区间参数扫描")
+    parser.add_argument("--data", help="历史快照 CSV (默认 data/valuation/snapshots.csv)")
+    parser.add_argument("--start", help="开始日期 YYYY-MM-DD")
+    parser.add_argument("--end", help="结束日期 YYYY-MM-DD")
+    parser.add_argument("--code", action="append", help="只扫描指定股票 (可多次指定)")
+    parser.add_argument("--by", choices=list(SORT_KEYS), default="return", help="排序方式")
+    parser.add_argument("--top", type=int, default=TOP_N)
+    parser.add_argument("--min-trades", type=int, default=MIN_TRADES)
+    parser.add_argument("--workers", type=int, help="进程数 (默认 CPU 核数)")
+    args = parser.parse_args()
+
+    index = watchlist.load()
+    targets = index.targets
+    if args.code:
+        wanted = set(args.code)
+        targets = [t for t in targets if str(t["code"]) in wanted]
+    ruleset = rule_engine.RuleSet(targets)
+    dates, values = backtest.load_panel(ruleset.codes, args.data, args.start, args.end)
+    if not dates:
+        print("没有可用的历史快照")
+    else:
+        tasks, keys = build_tasks(ruleset, values)
+        results = sweep(dates, values, tasks, args.workers)
+        print("\n".join(report_lines(ruleset, dates, values, tasks, keys, results,
+                                     args.by, args.top, args.min_trades)))
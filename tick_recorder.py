@@ -0,0 +1,229 @@
+# 文件名: tick_recorder.py
+# 盘中行情记录: 每个交易日一个定长二进制文件 (内存映射)，按股票分区预留槽位
+#   data/ticks/2024-01-02.bin
+#
+# 文件布局 (小端):
+#   头部   32 字节: magic "WSTK" | 版本 u32 | 股票数 u32 | 每只股票槽位数 u32 | 保留
+#   代码表 股票数 × 16 字节 (ASCII，右补 \0)
+#   计数   股票数 × int64，第 i 只股票已写入的条数
+#   数据   [股票数, 槽位数] × TICK_DTYPE，第 i 只股票的记录连续存放，按时间递增
+#
+# 写入只改动映射页，不在内存中累积；读取时按股票/时间段切出 NumPy 视图，不拷贝
+#   python tick_recorder.py stats [--date 2024-01-02]
+#   python tick_recorder.py show 600519 [--date ...] [--start 10:00] [--end 11:30]
+import os
+import struct
+import datetime
+import argparse
+import numpy as np
+
+TICK_DIR = os.path.join("data", "ticks")
+SUFFIX = ".bin"
+MAGIC = b"WSTK"
+VERSION = 1
+HEADER = struct.Struct("<4sIII16x")
+CODE_BYTES = 16
+DEFAULT_CAPACITY = 4096     # 每只股票的初始槽位数，写满时整体扩容一倍
+
+# 每条记录: 时间戳 (Unix 秒) + rule_engine.METRICS 四个指标
+TICK_DTYPE = np.dtype([
+    ("ts", "<f8"),
+    ("price", "<f8"),
+    ("pe_ttm", "<f8"),
+    ("pb", "<f8"),
+    ("dv_ratio", "<f8"),
+])
+VALUE_FIELDS = TICK_DTYPE.names[1:]
+
+def day_path(date_str, base_dir=None):
+    return os.path.join(base_dir or TICK_DIR, f"{date_str}{SUFFIX}")
+
+def list_days(base_dir=None):
+    base_dir = base_dir or TICK_DIR
+    if not os.path.isdir(base_dir):
+        return []
+    return sorted(f[:-len(SUFFIX)] for f in os.listdir(base_dir) if f.endswith(SUFFIX))
+
+def _layout(n_symbols):
+    codes_offset = HEADER.size
+    counts_offset = codes_offset + n_symbols * CODE_BYTES
+    data_offset = counts_offset + n_symbols * 8
+    return codes_offset, counts_offset, data_offset
+
+def _create(path, codes, capacity):
+    """
+    新建空文件 (数据区为稀疏文件，只有写过的页才真正占用磁盘)
+    """
+    n = len(codes)
+    _, _, data_offset = _layout(n)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, n, capacity))
+        f.write(b"".join(code.encode("ascii")[:CODE_BYTES].ljust(CODE_BYTES, b"\0") for code in codes))
+        f.write(bytes(n * 8))
+        f.truncate(data_offset + n * capacity * TICK_DTYPE.itemsize)
+
+class TickFile:
+    """
+    一个交易日的记录文件 (mode: "r" 只读，"r+" 读写)
+    """
+    def __init__(self, path, mode="r"):
+        self.path = path
+        self.mode = mode
+        with open(path, "rb") as f:
+            magic, version, n, capacity = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"不是有效的行情记录文件: {path}")
+            codes_raw = f.read(n * CODE_BYTES)
+        self.capacity = capacity
+        self.codes = [codes_raw[i * CODE_BYTES:(i + 1) * CODE_BYTES].rstrip(b"\0").decode("ascii")
+                      for i in range(n)]
+        self.row = {code: i for i, code in enumerate(self.codes)}
+        _, counts_offset, data_offset = _layout(n)
+        self.counts = np.memmap(path, dtype="<i8", mode=mode, offset=counts_offset, shape=(n,))
+        self.data = np.memmap(path, dtype=TICK_DTYPE, mode=mode, offset=data_offset, shape=(n, capacity))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def ticks(self, code, start=None, end=None):
+        """
+        某只股票 [start, end) 时间段内的记录 (结构化数组视图，不拷贝)；start/end 为 Unix 秒
+        """
+        i = self.row.get(code)
+        if i is None:
+            return self.data[:0, :0].reshape(0)
+        series = self.data[i, :int(self.counts[i])]
+        ts = series["ts"]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = len(series) if end is None else int(np.searchsorted(ts, end, side="left"))
+        return series[lo:hi]
+
+    def field(self, code, name, start=None, end=None):
+        """
+        单个字段的视图，如 field("600519", "pe_ttm")
+        """
+        return self.ticks(code, start, end)[name]
+
+    def flush(self):
+        if self.mode != "r":
+            self.data.flush()
+            self.counts.flush()
+
+    def close(self):
+        # 释放映射 (最后一个引用消失时关闭)
+        self.flush()
+        self.data = self.counts = None
+
+class TickRecorder:
+    """
+    追加写入当日记录: codes 为写入时 values 各行对应的代码 (通常是 WatchlistIndex.codes)
+    文件中已有的代码沿用原槽位；代码表或容量不够时整体重建一次
+    """
+    def __init__(self, codes, date_str=None, base_dir=None, capacity=DEFAULT_CAPACITY):
+        self.codes = list(codes)
+        self.date_str = date_str or datetime.date.today().isoformat()
+        self.path = day_path(self.date_str, base_dir)
+        if not os.path.exists(self.path):
+            _create(self.path, self.codes, capacity)
+        self.file = TickFile(self.path, "r+")
+        if any(code not in self.file.row for code in self.codes):
+            self._rebuild(self.file.capacity)
+        self._map_rows()
+
+    def _map_rows(self):
+        # values 第 k 行 -> 文件中的行号
+        self.rows = np.array([self.file.row[code] for code in self.codes], dtype=np.intp)
+
+    def _rebuild(self, capacity):
+        """
+        扩充代码表或容量: 写入新文件后原子替换，已记录的数据原样复制
+        """
+        old = self.file
+        codes = old.codes + [code for code in self.codes if code not in old.row]
+        tmp_path = self.path + ".tmp"
+        _create(tmp_path, codes, capacity)
+        new = TickFile(tmp_path, "r+")
+        n_old = len(old)
+        used = int(old.counts.max()) if n_old else 0
+        new.data[:n_old, :used] = old.data[:, :used]
+        new.counts[:n_old] = old.counts
+        new.close()
+        old.close()
+        os.replace(tmp_path, self.path)
+        self.file = TickFile(self.path, "r+")
+
+    def append(self, values, ts=None):
+        """
+        写入一轮行情: values 为 [len(codes), 4] 矩阵 (列顺序同 VALUE_FIELDS)，整行 NaN 的股票跳过
+        返回写入条数
+        """
+        values = np.asarray(values, dtype=np.float64)
+        ts = datetime.datetime.now().timestamp() if ts is None else ts
+        valid = ~np.isnan(values).all(axis=1)
+        rows = self.rows[valid]
+        if rows.size == 0:
+            return 0
+        if int(self.file.counts[rows].max()) >= self.file.capacity:
+            self._rebuild(self.file.capacity * 2)
+            self._map_rows()
+            rows = self.rows[valid]
+
+        f = self.file
+        slots = f.counts[rows]
+        records = np.empty(rows.size, dtype=TICK_DTYPE)
+        records["ts"] = ts
+        for k, name in enumerate(VALUE_FIELDS):
+            records[name] = values[valid, k]
+        # 先写数据再更新计数，中途中断不会读到半条记录
+        f.data[rows, slots] = records
+        f.counts[rows] = slots + 1
+        return int(rows.size)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def open_day(date_str=None, base_dir=None):
+    """
+    只读打开某一天 (默认今天) 的记录
+    """
+    return TickFile(day_path(date_str or datetime.date.today().isoformat(), base_dir), "r")
+
+def _parse_time(date_str, hhmm):
+    if not hhmm:
+        return None
+    return datetime.datetime.fromisoformat(f"{date_str} {hhmm}").timestamp()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="盘中行情记录")
+    sub = parser.add_subparsers(dest="cmd")
+    p_stats = sub.add_parser("stats", help="查看某天的记录概况")
+    p_stats.add_argument("--date")
+    p_stats.add_argument("--dir", default=TICK_DIR)
+    p_show = sub.add_parser("show", help="查看某只股票的记录")
+    p_show.add_argument("code")
+    p_show.add_argument("--date")
+    p_show.add_argument("--dir", default=TICK_DIR)
+    p_show.add_argument("--start", help="开始时间 HH:MM")
+    p_show.add_argument("--end", help="结束时间 HH:MM")
+    args = parser.parse_args()
+
+    if args.cmd in ("stats", "show"):
+        date_str = args.date or (list_days(args.dir) or [datetime.date.today().isoformat()])[-1]
+        tf = open_day(date_str, args.dir)
+        if args.cmd == "stats":
+            counts = np.asarray(tf.counts)
+            size = os.path.getsize(tf.path)
+            print(f"{date_str}: {len(tf)} 只股票，共 {int(counts.sum())} 条，"
+                  f"单只最多 {int(counts.max()) if len(tf) else 0} / {tf.capacity} 槽位，文件 {size / 1e6:.1f} MB")
+        else:
+            ticks = tf.ticks(args.code, _parse_time(date_str, args.start), _parse_time(date_str, args.end))
+            for rec in ticks:
+                t = datetime.datetime.fromtimestamp(rec["ts"]).strftime("%H:%M:%S")
+                print(f"{t}  " + "  ".join(f"{name} {rec[name]:g}" for name in VALUE_FIELDS))
+            print(f"共 {len(ticks)} 条")
+    else:
+        parser.print_help()
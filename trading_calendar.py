@@ -0,0 +1,81 @@
+# 文件名: trading_calendar.py
+# A 股交易日历 (上交所/深交所): 周末与法定节假日休市
+# 节假日按交易所每年 12 月发布的次年休市安排维护；调休的周末同样休市，无需单独列出
+# 未收录的年份只按周末判断，并提示更新
+#   python trading_calendar.py              # 今天是否交易日
+#   python trading_calendar.py 2025-10-08   # 指定日期
+import datetime
+import argparse
+
+# 工作日中的休市日 (周末本来就休市，不列出)
+HOLIDAYS = {
+    2024: [
+        "2024-01-01",
+        "2024-02-09", "2024-02-12", "2024-02-13", "2024-02-14", "2024-02-15", "2024-02-16",
+        "2024-04-04", "2024-04-05",
+        "2024-05-01", "2024-05-02", "2024-05-03",
+        "2024-06-10",
+        "2024-09-16", "2024-09-17",
+        "2024-10-01", "2024-10-02", "2024-10-03", "2024-10-04", "2024-10-07",
+    ],
+    2025: [
+        "2025-01-01",
+        "2025-01-28", "2025-01-29", "2025-01-30", "2025-01-31", "2025-02-03", "2025-02-04",
+        "2025-04-04",
+        "2025-05-01", "2025-05-02", "2025-05-05",
+        "2025-06-02",
+        "2025-10-01", "2025-10-02", "2025-10-03", "2025-10-06", "2025-10-07", "2025-10-08",
+    ],
+    2026: [
+        "2026-01-01", "2026-01-02",
+        "2026-02-16", "2026-02-17", "2026-02-18", "2026-02-19", "2026-02-20", "2026-02-23",
+        "2026-04-06",
+        "2026-05-01", "2026-05-04", "2026-05-05",
+        "2026-06-19",
+        "2026-09-25",
+        "2026-10-01", "2026-10-02", "2026-10-05", "2026-10-06", "2026-10-07",
+    ],
+}
+
+_HOLIDAY_SET = {datetime.date.fromisoformat(d) for days in HOLIDAYS.values() for d in days}
+_WARNED = set()
+
+def _to_date(day):
+    if day is None:
+        return datetime.date.today()
+    if isinstance(day, str):
+        return datetime.date.fromisoformat(day)
+    if isinstance(day, datetime.datetime):
+        return day.date()
+    return day
+
+def is_trading_day(day=None):
+    """
+    day 可以是 date / datetime / "YYYY-MM-DD"，默认今天
+    """
+    day = _to_date(day)
+    if day.weekday() >= 5:
+        return False
+    if day.year not in HOLIDAYS and day.year not in _WARNED:
+        _WARNED.add(day.year)
+        print(f"⚠️ 交易日历未收录 {day.year} 年的节假日，只按周末判断")
+    return day not in _HOLIDAY_SET
+
+def previous_trading_day(day=None):
+    """
+    day 之前 (不含) 最近的一个交易日
+    """
+    day = _to_date(day) - datetime.timedelta(days=1)
+    while not is_trading_day(day):
+        day -= datetime.timedelta(days=1)
+    return day
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="A 股交易日历")
+    parser.add_argument("date", nargs="?", help="YYYY-MM-DD，默认今天")
+    args = parser.parse_args()
+    day = _to_date(args.date)
+    if is_trading_day(day):
+        print(f"{day} 是交易日")
+    else:
+        print(f"{day} 休市，上一个交易日 {previous_trading_day(day)}")
@@ -0,0 +1,352 @@
+# 文件名: valuation_history.py
+# 估值历史分位: 每天的午间快照追加到 data/valuation/snapshots.csv，
+# 同时为每个 (股票, 指标) 维护 3/5/10 年滚动窗口内的有序数组，
+# 查询 "当前值处于过去 N 年的第几分位" 只需两次二分查找，不重新扫描历史
+# 只有快照文件纳入版本库；分位结构 quantiles.pkl 是本地缓存，缺失或与快照文件不一致时自动重建
+#   python valuation_history.py rebuild              # 由快照文件重建分位结构
+#   python valuation_history.py import history.csv   # 导入外部历史数据 (列同快照文件) 后重建
+#   python valuation_history.py show 600519          # 查看某只股票的样本数与最新分位
+import os
+import csv
+import pickle
+import datetime
+import argparse
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+DATA_DIR = os.path.join("data", "valuation")
+SNAPSHOT_PATH = os.path.join(DATA_DIR, "snapshots.csv")
+STATE_PATH = os.path.join(DATA_DIR, "quantiles.pkl")
+METRICS = ["price", "pe_ttm", "pb", "dv_ratio"]
+SNAPSHOT_COLUMNS = ["date", "code"] + METRICS
+
+WINDOW_YEARS = (3, 5, 10)
+MIN_SAMPLES = 20        # 样本数不足时不给出分位
+STATE_VERSION = 2
+
+class RollingQuantile:
+    """
+    单个 (股票, 指标) 的滚动分位结构:
+    dates / values 按日期升序保存原始序列，每个窗口一份有序数组 (只含窗口内的值)，
+    start[years] 为窗口内第一条记录在 dates 中的位置；窗口以该序列最新一天为终点
+    """
+    def __init__(self, windows=WINDOW_YEARS):
+        self.windows = tuple(windows)
+        self.dates = []
+        self.values = []
+        self.sorted = {w: [] for w in self.windows}
+        self.start = {w: 0 for w in self.windows}
+
+    def __len__(self):
+        return len(self.dates)
+
+    def add(self, day, value):
+        """
+        追加一个交易日的值 (day 为 date.toordinal())；与最后一天相同则替换 (同日重复运行)
+        早于最后一天的数据不能增量加入，返回 False (需 rebuild)
+        """
+        if value != value:
+            return True
+        if self.dates and day < self.dates[-1]:
+            return False
+        if self.dates and day == self.dates[-1]:
+            old = self.values[-1]
+            for w in self.windows:
+                s = self.sorted[w]
+                del s[bisect_left(s, old)]
+            self.values[-1] = value
+        else:
+            self.dates.append(day)
+            self.values.append(value)
+        for w in self.windows:
+            insort(self.sorted[w], value)
+        self._evict(day)
+        return True
+
+    def _evict(self, today):
+        dates = self.dates
+        for w in self.windows:
+            cutoff = today - int(w * 365.25)  # 窗口按自然日计
+            i = self.start[w]
+            if dates[i] > cutoff:
+                continue
+            s = self.sorted[w]
+            while dates[i] <= cutoff:
+                del s[bisect_left(s, self.values[i])]
+                i += 1
+            self.start[w] = i
+        # 已滑出最长窗口的记录成批丢弃
+        drop = min(self.start.values())
+        if drop > 1024:
+            del self.dates[:drop]
+            del self.values[:drop]
+            for w in self.windows:
+                self.start[w] -= drop
+
+    def percentile(self, value, years):
+        """
+        value 在最近 years 年中的分位 (0-100，相等的值按一半计)；样本不足返回 None
+        """
+        s = self.sorted[years]
+        n = len(s)
+        if n < MIN_SAMPLES or value is None or value != value:
+            return None
+        lo = bisect_left(s, value)
+        hi = bisect_right(s, value)
+        return (lo + (hi - lo) / 2) / n * 100
+
+def _from_bytes(typecode, raw):
+    buf = array(typecode)
+    buf.frombytes(raw)
+    return buf.tolist()
+
+class ValuationHistory:
+    """
+    所有 (股票, 指标) 的滚动分位结构，last_date 为已并入的最新快照日期
+    """
+    def __init__(self, windows=WINDOW_YEARS):
+        self.windows = tuple(windows)
+        self.series = {}
+        self.last_date = None
+
+    def add(self, date_str, code, metric, value):
+        return self._add(datetime.date.fromisoformat(date_str).toordinal(), str(code), metric, value)
+
+    def _add(self, day, code, metric, value):
+        key = (code, metric)
+        q = self.series.get(key)
+        if q is None:
+            q = self.series[key] = RollingQuantile(self.windows)
+        return q.add(day, value)
+
+    def add_row(self, date_str, code, values):
+        """
+        values 与 METRICS 对齐
+        """
+        day = datetime.date.fromisoformat(date_str).toordinal()
+        code = str(code)
+        ok = True
+        for metric, value in zip(METRICS, values):
+            ok = self._add(day, code, metric, value) and ok
+        if self.last_date is None or date_str > self.last_date:
+            self.last_date = date_str
+        return ok
+
+    # 持久化: 所有序列首尾相接成几条大数组 + 每个序列的长度 (与 rule_engine 的平铺方式相同)，
+    # 读写时整块转换，避免逐个对象、逐个浮点数序列化
+    def __getstate__(self):
+        keys = list(self.series)
+        qs = [self.series[k] for k in keys]
+        dates, values = array("l"), array("d")
+        sorted_cat = {w: array("d") for w in self.windows}
+        lengths = array("l")
+        starts = {w: array("l") for w in self.windows}
+        for q in qs:
+            dates.extend(q.dates)
+            values.extend(q.values)
+            lengths.append(len(q.dates))
+            for w in self.windows:
+                sorted_cat[w].extend(q.sorted[w])
+                starts[w].append(q.start[w])
+        return {
+            "windows": self.windows, "last_date": self.last_date, "keys": keys,
+            "lengths": lengths.tobytes(), "dates": dates.tobytes(), "values": values.tobytes(),
+            "starts": {w: a.tobytes() for w, a in starts.items()},
+            "sorted": {w: a.tobytes() for w, a in sorted_cat.items()},
+        }
+
+    def __setstate__(self, state):
+        self.windows = state["windows"]
+        self.last_date = state["last_date"]
+        lengths = _from_bytes("l", state["lengths"])
+        dates = _from_bytes("l", state["dates"])
+        values = _from_bytes("d", state["values"])
+        starts = {w: _from_bytes("l", b) for w, b in state["starts"].items()}
+        sorted_cat = {w: _from_bytes("d", b) for w, b in state["sorted"].items()}
+        self.series = {}
+        pos = 0
+        spos = {w: 0 for w in self.windows}
+        for i, key in enumerate(state["keys"]):
+            n = lengths[i]
+            q = RollingQuantile.__new__(RollingQuantile)
+            q.windows = self.windows
+            q.dates = dates[pos:pos + n]
+            q.values = values[pos:pos + n]
+            q.start = {}
+            q.sorted = {}
+            for w in self.windows:
+                start = starts[w][i]
+                q.start[w] = start
+                q.sorted[w] = sorted_cat[w][spos[w]:spos[w] + n - start]
+                spos[w] += n - start
+            pos += n
+            self.series[key] = q
+
+    def percentiles(self, code, metric, value):
+        """
+        {年数: 分位或 None}；没有历史时返回 {}
+        历史还不够长、与更短窗口样本完全相同的窗口不重复给出
+        """
+        q = self.series.get((str(code), metric))
+        if q is None:
+            return {}
+        result = {}
+        prev_n = -1
+        for w in self.windows:
+            n = len(q.sorted[w])
+            if n == prev_n:
+                break
+            result[w] = q.percentile(value, w)
+            prev_n = n
+        return result
+
+def _to_float(val):
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return float("nan")
+
+def read_snapshots(path=None):
+    """
+    逐行读取快照文件，产出 (date, code, [METRICS 各值])
+    """
+    path = path or SNAPSHOT_PATH
+    if not os.path.exists(path):
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield row["date"], row["code"], [_to_float(row.get(m)) for m in METRICS]
+
+def append_snapshots(date_str, codes, values, path=None):
+    """
+    追加当天快照 (values 为 [股票数, 指标数] 矩阵，整行 NaN 的股票不写)
+    """
+    path = path or SNAPSHOT_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    new_file = not os.path.exists(path)
+    rows = 0
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(SNAPSHOT_COLUMNS)
+        for code, row in zip(codes, values):
+            row = [float(v) for v in row]
+            if all(v != v for v in row):
+                continue
+            writer.writerow([date_str, code] + ["" if v != v else repr(v) for v in row])
+            rows += 1
+    return rows
+
+def rebuild(path=None):
+    """
+    由快照文件从头构建 (按日期排序；同一天同一只股票以最后一条为准)
+    """
+    rows = {}
+    for date_str, code, vals in read_snapshots(path):
+        rows[(date_str, code)] = vals
+    history = ValuationHistory()
+    for (date_str, code), vals in sorted(rows.items()):
+        history.add_row(date_str, code, vals)
+    return history
+
+def _snapshot_size(path=None):
+    path = path or SNAPSHOT_PATH
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def save(history, state_path=None, snapshot_path=None):
+    """
+    写入分位结构，同时记下对应的快照文件大小 (快照文件只追加，大小不同即说明不一致)
+    """
+    state_path = state_path or STATE_PATH
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    tmp_path = state_path + ".tmp"
+    state = {"version": STATE_VERSION, "snapshot_size": _snapshot_size(snapshot_path), "history": history}
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, state_path)
+
+def load(state_path=None, snapshot_path=None):
+    """
+    读取分位结构；状态文件缺失、损坏或与快照文件不一致 (如拉取了别处追加的快照) 时由快照文件重建
+    """
+    state_path = state_path or STATE_PATH
+    if os.path.exists(state_path):
+        try:
+            with open(state_path, "rb") as f:
+                state = pickle.load(f)
+            if state.get("version") == STATE_VERSION and state.get("snapshot_size") == _snapshot_size(snapshot_path):
+                return state["history"]
+        except Exception as e:
+            print(f"⚠️ 估值分位状态读取失败，将由快照重建: {e}")
+    return rebuild(snapshot_path)
+
+def record(date_str, codes, values, state_path=None, snapshot_path=None):
+    """
+    记录当天快照并增量更新分位结构，返回更新后的 ValuationHistory
+    """
+    history = load(state_path, snapshot_path)
+    append_snapshots(date_str, codes, values, snapshot_path)
+    if history.last_date is not None and date_str < history.last_date:
+        # 补录更早的日期: 无法增量插入，整体重建
+        history = rebuild(snapshot_path)
+    else:
+        for code, row in zip(codes, values):
+            history.add_row(date_str, code, [float(v) for v in row])
+    save(history, state_path, snapshot_path)
+    return history
+
+def format_percentiles(pcts):
+    """
+    渲染为 "3年 42% · 5年 30% · 10年 18%"，没有可用分位时返回空字符串
+    """
+    parts = [f"{w}年 {p:.0f}%" for w, p in pcts.items() if p is not None]
+    return " · ".join(parts)
+
+def import_csv(src, path=None):
+    """
+    合并外部历史数据 (列: date, code, price, pe_ttm, pb, dv_ratio；缺少的列留空)
+    """
+    path = path or SNAPSHOT_PATH
+    count = 0
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    new_file = not os.path.exists(path)
+    with open(src, newline="", encoding="utf-8") as fin, open(path, "a", newline="", encoding="utf-8") as fout:
+        writer = csv.writer(fout)
+        if new_file:
+            writer.writerow(SNAPSHOT_COLUMNS)
+        for row in csv.DictReader(fin):
+            writer.writerow([row["date"], row["code"]] + [row.get(m, "") for m in METRICS])
+            count += 1
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="估值历史分位")
+    sub = parser.add_subparsers(dest="cmd")
+    sub.add_parser("rebuild", help="由快照文件重建分位结构")
+    p_import = sub.add_parser("import", help="导入外部历史数据后重建")
+    p_import.add_argument("csv")
+    p_show = sub.add_parser("show", help="查看某只股票的样本数与最新分位")
+    p_show.add_argument("code")
+    args = parser.parse_args()
+
+    if args.cmd == "rebuild":
+        history = rebuild()
+        save(history)
+        print(f"✅ 已重建 {len(history.series)} 个序列，最新日期 {history.last_date}")
+    elif args.cmd == "import":
+        count = import_csv(args.csv)
+        history = rebuild()
+        save(history)
+        print(f"✅ 已导入 {count} 行，共 {len(history.series)} 个序列，最新日期 {history.last_date}")
+    elif args.cmd == "show":
+        history = load()
+        for metric in METRICS:
+            q = history.series.get((args.code, metric))
+            if q is None or not len(q):
+                continue
+            latest = q.values[-1]
+            pcts = format_percentiles(history.percentiles(args.code, metric, latest)) or "样本不足"
+            sizes = ", ".join(f"{w}年 {len(q.sorted[w])}" for w in q.windows)
+            print(f"{metric:<9} 最新 {latest:<10g} {pcts}  (样本: {sizes})")
+    else:
+        parser.print_help()
@@ -0,0 +1,158 @@
+# 文件名: watchlist.py
+# 股票池: 唯一配置 watchlist.json，编译为索引后缓存
+#   - API 代码 (sh/sz/r_hk) 与交易所在编译时一次算好
+#   - 代码 -> 行号 的字典，行情结果按行号直接落入矩阵，不再逐只 data_map.get
+#   - 规则数组 (rule_engine.RuleSet)
+# 编译结果按源文件内容的哈希缓存到 data/watchlist_index.pkl，文件不变时直接复用
+#   python watchlist.py          # 编译并显示概况
+import os
+import json
+import pickle
+import hashlib
+
+WATCHLIST_PATH = os.getenv("WESTOCK_WATCHLIST", "watchlist.json")
+INDEX_CACHE_PATH = os.path.join("data", "watchlist_index.pkl")
+INDEX_VERSION = 1   # 索引结构变化时加一，旧缓存作废
+
+def api_code(code, stype):
+    """
+    腾讯行情接口代码与交易所: A 股 6 开头为沪市 (sh)，其他为深市 (sz)；
+    港股用 r_hk 前缀获取更详细数据；未知类型返回 ("", "")
+    """
+    code = str(code)
+    if stype == 'A':
+        exchange = "sh" if code.startswith('6') else "sz"
+        return f"{exchange}{code}", exchange
+    if stype == 'H':
+        return f"r_hk{code}", "hk"
+    return "", ""
+
+def flatten(config):
+    """
+    watchlist.json 的分组结构展开为 targets 列表 (每项带上 group)
+    """
+    targets = []
+    for group in config.get("groups", []):
+        for item in group.get("targets", []):
+            targets.append(dict(item, group=group.get("name", "")))
+    return targets
+
+class WatchlistIndex:
+    """
+    编译后的股票池，第 i 行对应 targets[i]
+    """
+    def __init__(self, targets, source_hash=""):
+        import rule_engine
+        self.targets = targets
+        self.source_hash = source_hash
+        self.codes = [str(item['code']) for item in targets]
+        self.names = [item['name'] for item in targets]
+        self.api_codes = []
+        self.exchanges = []
+        self.row = {}
+        for i, item in enumerate(targets):
+            code, exchange = api_code(item['code'], item['type'])
+            self.api_codes.append(code)
+            self.exchanges.append(exchange)
+            if self.codes[i] in self.row:
+                raise ValueError(f"股票池中代码重复: {self.codes[i]}")
+            self.row[self.codes[i]] = i
+        self.ruleset = rule_engine.RuleSet(targets)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def request_codes(self):
+        """
+        需要请求的接口代码 (跳过未知类型)
+        """
+        return [code for code in self.api_codes if code]
+
+    def values_from_quotes(self, quotes):
+        """
+        把 QuoteColumns 排成 [股票数, 指标数] 矩阵 (列顺序同 rule_engine.METRICS)，
+        按代码 -> 行号直接定位，未取到的股票整行为 NaN
+        """
+        import numpy as np
+        values = np.full((len(self.targets), len(quotes.columns)), np.nan)
+        if not len(quotes):
+            return values
+        rows = np.fromiter((self.row.get(code, -1) for code in quotes.codes), dtype=np.intp, count=len(quotes))
+        found = rows >= 0
+        arrays = quotes.as_arrays()
+        matrix = np.column_stack([arrays[name] for name in arrays])
+        values[rows[found]] = matrix[found]
+        return values
+
+def source_hash(raw):
+    return hashlib.sha256(raw).hexdigest()
+
+def compile_index(raw, digest):
+    return WatchlistIndex(flatten(json.loads(raw.decode("utf-8"))), digest)
+
+_LOADED = {}
+
+def load(path=None, cache_path=INDEX_CACHE_PATH):
+    """
+    读取股票池索引: 源文件哈希与进程内 / 磁盘缓存一致时直接复用，否则重新编译并写回缓存
+    """
+    path = path or WATCHLIST_PATH
+    with open(path, "rb") as f:
+        raw = f.read()
+    digest = source_hash(raw)
+
+    cached = _LOADED.get(path)
+    if cached is not None and cached.source_hash == digest:
+        return cached
+
+    index = None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                entry = pickle.load(f)
+            if entry.get("version") == INDEX_VERSION and entry.get("hash") == digest:
+                index = entry["index"]
+        except Exception as e:
+            print(f"⚠️ 股票池索引缓存读取失败，将重新编译: {e}")
+
+    if index is None:
+        index = compile_index(raw, digest)
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"version": INDEX_VERSION, "hash": digest, "index": index}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+
+    _LOADED[path] = index
+    return index
+
+def load_targets(path=None):
+    """
+    只读取 targets 列表 (不编译索引)
+    """
+    with open(path or WATCHLIST_PATH, encoding="utf-8") as f:
+        return flatten(json.load(f))
+
+_FROM_TARGETS = {}
+
+def from_targets(targets):
+    """
+    由内存中的 targets 列表编译索引，同一个列表对象只编译一次
+    """
+    key = id(targets)
+    cached = _FROM_TARGETS.get(key)
+    if cached is None or cached.targets is not targets:
+        cached = WatchlistIndex(targets)
+        _FROM_TARGETS[key] = cached
+    return cached
+
+if __name__ == "__main__":
+    index = load()
+    exchanges = {}
+    for exchange in index.exchanges:
+        exchanges[exchange or "未知"] = exchanges.get(exchange or "未知", 0) + 1
+    print(f"股票池 {WATCHLIST_PATH}: {len(index)} 只，{len(index.ruleset)} 条规则")
+    print("交易所: " + ", ".join(f"{k} {v}" for k, v in exchanges.items()))
+    print(f"哈希: {index.source_hash[:12]}")
@@ -0,0 +1,120 @@
+# 文件名: wechat_push.py
+# Server酱 推送: 所有任务共用，多个 SendKey 并发推送
+#   - 共享连接池 (keep-alive)
+#   - 每个请求都有超时，失败按指数退避重试
+#   - 每个 Key 限速，避免短时间内重复推送被拒
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import run_metrics
+
+# 从环境变量获取 Key 字符串 (SCT_A,SCT_B,SCT_C)
+KEYS_STR = os.getenv("SERVERCHAN_KEY", "")
+
+# 推送地址，可用环境变量指向本地替身服务 (见 loadtest/)
+PUSH_URL = os.getenv("WESTOCK_PUSH_URL", "https://sctapi.ftqq.com/{key}.send")
+PUSH_TIMEOUT = 10        # 单次请求超时 (秒)
+PUSH_RETRIES = 2         # 失败后重试次数
+RETRY_BACKOFF = 1.0      # 重试退避基数 (秒)
+MIN_INTERVAL = 1.0       # 同一个 Key 两次推送的最小间隔 (秒)
+MAX_WORKERS = 64        # 并发推送数 (同时也是连接池大小)
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+_LAST_SENT = {}
+_RATE_LOCK = threading.Lock()
+
+def get_session():
+    global _SESSION
+    # 多个推送线程同时首次调用时只建一个会话
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            # 推送时才导入 requests，不拖慢各任务启动
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSION = session
+        return _SESSION
+
+def parse_keys(keys_str):
+    # 分割 Key 并去除可能误填的空格
+    return [key.strip() for key in keys_str.split(",") if key.strip()]
+
+def wait_rate_limit(key):
+    """
+    为该 Key 预约下一个可发送时间，必要时等待
+    """
+    with _RATE_LOCK:
+        now = time.monotonic()
+        send_at = max(now, _LAST_SENT.get(key, float("-inf")) + MIN_INTERVAL)
+        _LAST_SENT[key] = send_at
+    if send_at > now:
+        time.sleep(send_at - now)
+
+def send_one(key, title, content):
+    """
+    推送给一个 Key，返回结果 dict: ok / status / attempts / elapsed / error
+    """
+    url = PUSH_URL.format(key=key)
+    data = {"title": title, "desp": content}
+    start = time.monotonic()
+    result = {"ok": False, "status": None, "attempts": 0, "elapsed": 0.0, "error": ""}
+
+    for attempt in range(PUSH_RETRIES + 1):
+        wait_rate_limit(key)
+        result["attempts"] = attempt + 1
+        try:
+            resp = get_session().post(url, data=data, timeout=PUSH_TIMEOUT)
+            result["status"] = resp.status_code
+            # 429 / 5xx 可重试，其他 4xx 直接放弃
+            if resp.status_code == 429 or resp.status_code >= 500:
+                result["error"] = f"HTTP {resp.status_code}"
+            elif resp.status_code >= 400:
+                result["error"] = f"HTTP {resp.status_code}"
+                break
+            else:
+                try:
+                    body = resp.json()
+                except ValueError:
+                    body = {}
+                # Server酱 返回 {"code": 0, ...} 表示成功
+                if body.get("code", 0) == 0:
+                    result["ok"] = True
+                    result["error"] = ""
+                    break
+                result["error"] = str(body.get("message") or body.get("code"))
+                break
+        except Exception as e:
+            result["error"] = str(e)
+        if attempt < PUSH_RETRIES:
+            time.sleep(RETRY_BACKOFF * (2 ** attempt))
+
+    result["elapsed"] = time.monotonic() - start
+    return result
+
+def push_to_wechat(title, content, keys_str=None):
+    """
+    并发推送给所有 Key，返回 {Key 在列表中的序号: 结果} (后四位可能重复，不用作键)
+    """
+    keys = parse_keys(KEYS_STR if keys_str is None else keys_str)
+    if not keys:
+        print("⚠️ 未配置 Key")
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(keys))) as pool:
+        results = list(pool.map(lambda key: send_one(key, title, content), keys))
+
+    summary = {}
+    for i, (key, result) in enumerate(zip(keys, results)):
+        tag = key[-4:]
+        summary[i] = result
+        run_metrics.push(i, result["elapsed"], result["ok"])
+        if result["ok"]:
+            print(f"✅ 已推送给: ...{tag} ({result['elapsed']:.2f}s)")
+        else:
+            print(f"❌ 推送失败 ({tag}): {result['error']} (尝试 {result['attempts']} 次)")
+    return summary
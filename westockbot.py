@@ -0,0 +1,145 @@
+# 文件名: westockbot.py
+# 统一入口: 各任务模块在子命令被选中时才导入，较重的依赖 (pandas / akshare) 只在需要的任务中加载
+#   python westockbot.py morning                # 盘前早报
+#   python westockbot.py noon [--watch ...]     # 午间估值雷达 / 盘中盯盘
+#   python westockbot.py evening                # A股复盘
+#   python westockbot.py screen [--top 20 ...]  # Z 值选股
+#   python westockbot.py importtime             # 检查各任务的导入耗时是否超出预算
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+# 子命令 -> 任务模块
+JOBS = {
+    "morning": "main",
+    "noon": "noon_valuation",
+    "evening": "evening_push",
+    "screen": "z_screener",
+}
+
+# 各任务导入耗时预算 (毫秒，解释器启动后 import 入口及任务模块的累计耗时)；None 表示只报告不检查
+IMPORT_BUDGET_MS = {
+    "morning": 60,
+    "noon": 60,
+    "evening": None,
+    "screen": None,
+}
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def run_morning(args):
+    import main
+    main.run()
+
+def run_noon(args):
+    import noon_valuation
+    noon_valuation.run(args)
+
+def run_evening(args):
+    import evening_push
+    evening_push.run()
+
+def run_screen(args):
+    import z_screener
+    z_screener.run(args)
+
+# 每行: import time: self [us] | cumulative | imported package
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def measure_import(module):
+    """
+    在子进程中用 -X importtime 导入入口与任务模块，返回累计耗时 (毫秒) 与最慢的几个顶层模块
+    解释器自身启动阶段 (到 site 为止) 的导入不计入
+    """
+    code = f"import westockbot, {module}"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"导入 {module} 失败")
+
+    started = False
+    top_level = []
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if not m:
+            continue
+        cumulative, indent, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        if not started:
+            started = indent == 1 and name == "site"
+            continue
+        if indent == 1:
+            top_level.append((name, cumulative / 1000))
+    total = sum(ms for _, ms in top_level)
+    slowest = sorted(top_level, key=lambda x: -x[1])[:3]
+    return total, slowest
+
+def check_imports(args):
+    over = []
+    for job, module in JOBS.items():
+        if args.job and job not in args.job:
+            continue
+        try:
+            total, slowest = measure_import(module)
+        except RuntimeError as e:
+            # 该任务的依赖未安装 (如只装了早报依赖的环境)
+            print(f"{job:<8} 跳过: {e}")
+            continue
+        budget = IMPORT_BUDGET_MS.get(job)
+        flag = ""
+        if budget is not None and total > budget:
+            flag = f"  ⚠️ 超出预算 {budget} ms"
+            over.append(job)
+        detail = ", ".join(f"{name} {ms:.1f}" for name, ms in slowest)
+        limit = f"/ {budget} ms" if budget is not None else ""
+        print(f"{job:<8} {total:>8.1f} ms {limit:<10} ({detail}){flag}")
+    if over:
+        sys.exit(1)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="westockbot", description="WeStockBot 个人股票情报推送")
+    parser.add_argument("--force", action="store_true", help="忽略交易日历与内容去重，强制运行 (同 WESTOCK_FORCE=1)")
+    sub = parser.add_subparsers(dest="cmd")
+
+    p_morning = sub.add_parser("morning", help="盘前早报 (全球市场)")
+    p_morning.set_defaults(func=run_morning)
+
+    p_noon = sub.add_parser("noon", help="午间估值雷达")
+    # 子命令参数由任务模块定义，只在选中该子命令时导入
+    p_noon.set_defaults(func=run_noon, add_arguments=("noon_valuation", "add_arguments"))
+
+    p_evening = sub.add_parser("evening", help="A股复盘 (行业板块)")
+    p_evening.set_defaults(func=run_evening)
+
+    p_screen = sub.add_parser("screen", help="全市场 Z 值选股")
+    p_screen.set_defaults(func=run_screen, add_arguments=("z_screener", "add_arguments"))
+
+    p_import = sub.add_parser("importtime", help="检查各任务的导入耗时预算")
+    p_import.add_argument("--job", action="append", choices=list(JOBS), help="只检查指定任务")
+    p_import.set_defaults(func=check_imports)
+    return parser, sub
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser, sub = build_parser()
+
+    # 选中的子命令需要模块自带的参数时，先导入该模块补充参数再解析
+    cmd = next((a for a in argv if not a.startswith("-")), None)
+    sub_parser = sub.choices.get(cmd)
+    if sub_parser is not None:
+        hook = sub_parser.get_default("add_arguments")
+        if hook:
+            module_name, func_name = hook
+            getattr(__import__(module_name), func_name)(sub_parser)
+
+    args = parser.parse_args(argv)
+    if args.force:
+        os.environ["WESTOCK_FORCE"] = "1"
+    if not getattr(args, "func", None):
+        parser.print_help()
+        return
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# 文件名: z_screener.py
+# 全市场 Z 值选股 (公式见 "z 值选股.md")
+#
+#   Z = 赚钱真假 × 护城河 × 赚钱效率 × 安全性 × 价格 × ROIC
+#   赚钱真假 = 自由现金流 / 净利润 × (1 - 资本开支 / 营收)
+#   护城河   = 毛利率 × 总资产周转率
+#   赚钱效率 = 连续 5 年 ROE 中位数
+#   安全性   = 账上现金 / 营收 + (50% - 有息负债率)；银行直接用 ROA
+#   价格     = 净利润增长率 - PE' / k
+#              PE' = (市值 - 账上净现金) / 净利润 / 行业系数 J
+#              市占率第一 k=150，其余 k=100
+#   ROIC     = EBIT × (1 - 税率) / (有息负债 + 股东权益)
+#
+# 只有 "安全性、价格" 两个因子均为正时才参与 Z 值排名，避免负负得正
+#
+# 输入为一张基本面宽表 (列见 COLUMNS)，默认 data/fundamentals.parquet，由 build_input 生成:
+#   财务字段来自本地基本面缓存 (fundamentals_cache.py，增量刷新)，名称/总市值来自 A 股实时行情，
+#   行业来自行业板块成分，市占率排名按行业内营收排名近似
+#   python z_screener.py --build --no-push    # 刷新基本面缓存、重建输入文件后选股
+#   python z_screener.py --no-push            # 直接用已有的输入文件 (默认输入不存在时先自动重建)
+import pandas as pd
+import numpy as np
+import datetime
+import os
+import argparse
+from wechat_push import push_to_wechat
+
+DEFAULT_INPUT = os.path.join("data", "fundamentals.parquet")
+TOP_N = 20
+
+# 基本面表字段 (比率类均为小数，如 15% 写 0.15)
+COLUMNS = [
+    "code", "name", "industry",
+    "fcf",                  # 自由现金流
+    "net_profit",           # 净利润
+    "capex",                # 资本开支
+    "revenue",              # 营收
+    "gross_margin",         # 毛利率
+    "asset_turnover",       # 总资产周转率
+    "roe_median_5y",        # 连续 5 年 ROE 中位数
+    "cash",                 # 账上现金
+    "interest_debt_ratio",  # 有息负债率
+    "roa",                  # 总资产收益率 (银行安全性)
+    "profit_growth",        # 净利润增长率
+    "market_cap",           # 市值
+    "net_cash",             # 账上净现金
+    "market_rank",          # 行业市占率排名 (1 = 第一)
+    "ebit",                 # 息税前利润
+    "tax_rate",             # 税率
+    "interest_debt",        # 有息负债
+    "equity",               # 股东权益
+]
+
+# 行业系数 J: 按行业名称关键字匹配，未匹配到的行业 J=1.0
+INDUSTRY_J = [
+    (("银行",), 0.5),
+    (("公用事业", "电力", "水电", "核电"), 1.3),
+    (("消费", "食品", "饮料", "白酒", "家电", "医药", "医疗", "生物"), 1.5),
+    (("科技", "互联网", "软件", "电子", "半导体", "计算机", "通信"), 1.2),
+]
+BANK_KEYWORD = "银行"
+K_LEADER = 150
+K_OTHER = 100
+
+def industry_j(industry):
+    """
+    每个行业名称映射一个 J (按唯一值计算，再广播回全表)
+    """
+    industry = industry.fillna("").astype(str)
+    uniques = industry.unique()
+    table = {}
+    for name in uniques:
+        j = 1.0
+        for keywords, value in INDUSTRY_J:
+            if any(k in name for k in keywords):
+                j = value
+                break
+        table[name] = j
+    return industry.map(table).to_numpy(dtype=np.float64)
+
+def compute_factors(df):
+    """
+    向量化计算全表的各因子与 Z 值，返回新增因子列的 DataFrame
+    """
+    col = lambda name: pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64)
+
+    fcf, net_profit, capex, revenue = col("fcf"), col("net_profit"), col("capex"), col("revenue")
+    is_bank = df["industry"].fillna("").astype(str).str.contains(BANK_KEYWORD).to_numpy()
+    j = industry_j(df["industry"])
+    k = np.where(col("market_rank") == 1, K_LEADER, K_OTHER)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        quality = fcf / net_profit * (1 - capex / revenue)
+        moat = col("gross_margin") * col("asset_turnover")
+        roe = col("roe_median_5y")
+        safety = np.where(
+            is_bank,
+            col("roa"),
+            col("cash") / revenue + (0.5 - col("interest_debt_ratio")),
+        )
+        pe_adj = (col("market_cap") - col("net_cash")) / net_profit / j
+        price = col("profit_growth") - pe_adj / k
+        roic = col("ebit") * (1 - col("tax_rate")) / (col("interest_debt") + col("equity"))
+        z = quality * moat * roe * safety * price * roic
+
+    # 门槛: 安全性、价格均为正；净利润为负时 PE' 无意义，一并排除
+    passed = (safety > 0) & (price > 0) & (net_profit > 0) & np.isfinite(z)
+
+    out = df[["code", "name", "industry"]].copy()
+    out["quality"] = quality
+    out["moat"] = moat
+    out["roe"] = roe
+    out["safety"] = safety
+    out["pe_adj"] = pe_adj
+    out["price"] = price
+    out["roic"] = roic
+    out["z"] = z
+    out["passed"] = passed
+    return out
+
+def select_top(factors, top_n=TOP_N):
+    """
+    先过门槛再排名，返回 Z 值最高的 top_n 家公司
+    """
+    passed = factors[factors["passed"].to_numpy()]
+    if len(passed) > top_n:
+        z = passed["z"].to_numpy()
+        idx = np.argpartition(-z, top_n - 1)[:top_n]
+        passed = passed.iloc[idx]
+    return passed.sort_values("z", ascending=False).reset_index(drop=True)
+
+def screen(df, top_n=TOP_N):
+    return select_top(compute_factors(df), top_n)
+
+def from_cache(codes=None, cache=None):
+    """
+    由本地基本面缓存 (fundamentals_cache.py) 换算的因子输入，返回含 code 列的 DataFrame
+    (财务字段齐全；名称、行业、市值、市占率排名等行情字段不在其中)
+    """
+    import fundamentals_cache
+    cache = cache or fundamentals_cache.FundamentalsCache()
+    return cache.factor_inputs(codes).rename_axis("code").reset_index()
+
+def market_info():
+    """
+    全部 A 股的 名称、总市值 (实时行情) 与 行业 (行业板块成分)，返回 code, name, industry, market_cap
+    """
+    import akshare as ak
+    spot = ak.stock_zh_a_spot_em()
+    info = pd.DataFrame({
+        "code": spot["代码"].astype(str),
+        "name": spot["名称"],
+        "market_cap": pd.to_numeric(spot["总市值"], errors="coerce"),
+    })
+    industry = {}
+    for board in ak.stock_board_industry_name_em()["板块名称"]:
+        try:
+            members = ak.stock_board_industry_cons_em(symbol=board)
+        except Exception as e:
+            print(f"❌ 行业成分拉取失败 ({board}): {e}")
+            continue
+        for code in members["代码"].astype(str):
+            industry.setdefault(code, board)
+    info["industry"] = info["code"].map(industry)
+    return info
+
+def build_input(path=DEFAULT_INPUT, codes=None, cache=None):
+    """
+    刷新基本面缓存并生成选股输入文件 (列同 COLUMNS)，返回生成的 DataFrame
+    """
+    import fundamentals_cache
+    cache = cache or fundamentals_cache.FundamentalsCache()
+    info = market_info()
+    if codes is not None:
+        info = info[info["code"].isin(list(codes))]
+    codes = info["code"].tolist()
+    cache.refresh(codes)
+    df = info.merge(from_cache(codes, cache), on="code", how="inner")
+    cache.evict()
+    cache.save()
+
+    # 市占率排名: 行业内按营收从高到低 (1 = 第一)；没有行业的公司不排名
+    df["market_rank"] = df.groupby("industry")["revenue"].rank(ascending=False, method="min")
+    df = df[COLUMNS]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    print(f"✅ 选股输入已生成: {path} ({len(df)} 家)")
+    return df
+
+def load_fundamentals(path=DEFAULT_INPUT):
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, dtype={"code": str})
+    missing = [c for c in COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"基本面数据缺少字段: {', '.join(missing)}")
+    return df
+
+def generate_report(df, top_n=TOP_N):
+    factors = compute_factors(df)
+    top = select_top(factors, top_n)
+    lines = [f"全市场 {len(df)} 家，通过安全性/价格门槛 {int(factors['passed'].sum())} 家\n" + "-" * 30]
+    for rank, row in enumerate(top.itertuples(index=False), 1):
+        lines.append(
+            f"{rank}. **{row.name}**({row.code}) Z={row.z:.4f}\n"
+            f"   安全 {row.safety:.2f} | 价格 {row.price:.2f} | ROE {row.roe:.1%} | ROIC {row.roic:.1%}"
+        )
+    title = "Z值选股: " + datetime.datetime.now().strftime("%m-%d")
+    content = "\n\n".join(lines)
+    return title, content
+
+def add_arguments(parser):
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="基本面数据 (.parquet 或 .csv)")
+    parser.add_argument("--top", type=int, default=TOP_N)
+    parser.add_argument("--no-push", action="store_true", help="只打印不推送")
+    parser.add_argument("--build", action="store_true", help="先刷新基本面缓存并重建输入文件")
+
+def run(args):
+    if args.build or (args.input == DEFAULT_INPUT and not os.path.exists(args.input)):
+        build_input(args.input)
+    title, content = generate_report(load_fundamentals(args.input), args.top)
+    print("----------------")
+    print(title)
+    print(content)
+    print("----------------")
+    if not args.no_push:
+        push_to_wechat(title, content)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="全市场 Z 值选股")
+    add_arguments(parser)
+    run(parser.parse_args())